@@ -7,6 +7,7 @@ from datetime import datetime
 from core.config import Config
 from core.logger import Logger
 from core.db import Database
+from core.payload_codec import zstd_available
 from core.plugin_manager import PluginManager
 from core.event_manager import EventManager
 
@@ -27,9 +28,16 @@ class TwitterMonitorApp:
         db_path = self.config.get('DEFAULT', 'DB_PATH', 'data/twitter_monitor.db')
         self.db = Database(db_path)
         self.db.connect()
+        self.db.configure_group_commit(
+            self.config.getint('DEFAULT', 'GROUP_COMMIT_WRITES', 0),
+            self.config.getint('DEFAULT', 'GROUP_COMMIT_MS', 50)
+        )
+        self._configure_payload_codec()
+        self.db.configure_partitions(self.config.get('RETENTION', 'PARTITION_DIR', 'data/partitions'))
         
         # راه‌اندازی مدیر رویداد
         self.event_manager = EventManager(self.logger)
+        self._configure_async_events()
         
         # راه‌اندازی مدیر پلاگین
         self.plugin_manager = PluginManager(self)
@@ -67,12 +75,39 @@ class TwitterMonitorApp:
         # توقف پلاگین‌ها
         self.plugin_manager.shutdown_plugins()
         
+        # توقف تسک‌های صف رویدادها
+        self.event_manager.stop()
+        
         # بستن اتصال دیتابیس
         self.db.close()
         
         uptime = datetime.now() - self.start_time
         self.logger.info(f"App shutdown complete. Uptime: {uptime}")
     
+    def _configure_payload_codec(self):
+        """تنظیم فشرده‌سازی tweet_data و profile_data طبق تنظیمات"""
+        algorithm = self.config.get('DEFAULT', 'PAYLOAD_CODEC', 'zlib')
+        if algorithm == 'zstd' and not zstd_available():
+            self.logger.warning("zstd payload codec requested but the 'zstandard' package is not installed. Falling back to zlib")
+            algorithm = 'zlib'
+        
+        self.db.configure_payload_codec(
+            algorithm,
+            self.config.getint('DEFAULT', 'PAYLOAD_LEVEL', 6),
+            self.config.getboolean('DEFAULT', 'PAYLOAD_DICTIONARY', True)
+        )
+    
+    def _configure_async_events(self):
+        """فعال‌سازی ارسال صف‌دار برای رویدادهای پرحجم طبق تنظیمات"""
+        async_events = self.config.get('EVENTS', 'ASYNC_EVENTS', '')
+        queue_size = self.config.getint('EVENTS', 'QUEUE_SIZE', 1000)
+        consumers = self.config.getint('EVENTS', 'CONSUMERS', 1)
+        
+        for event_type in async_events.split(','):
+            event_type = event_type.strip()
+            if event_type:
+                self.event_manager.configure_async(event_type, queue_size, consumers)
+    
     def _handle_interrupt(self, signum, frame):
         """مدیریت سیگنال‌های پایان برنامه"""
         self.logger.info(f"Received signal {signum}. Initiating shutdown...")
@@ -0,0 +1,63 @@
+# core/async_db.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+class AsyncDatabase:
+    """لایه ناهمگام دیتابیس: اجرای کوئری‌ها در pool ترد تا event loop مسدود نشود"""
+    
+    def __init__(self, db, max_workers=4):
+        self.db = db
+        self.max_workers = max(1, max_workers)
+        # هر ترد worker اتصال خواننده WAL خودش را از Database می‌گیرد
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='db-reader'
+        )
+    
+    async def run(self, func, *args, **kwargs):
+        """اجرای یک تابع مسدودکننده (مثلاً متد مدل) در ترد worker"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+    
+    async def fetch_all(self, query, params=None):
+        """اجرای کوئری و دریافت همه ردیف‌ها به صورت دیکشنری"""
+        return await self.run(self._fetch_all, query, params)
+    
+    async def fetch_one(self, query, params=None):
+        """اجرای کوئری و دریافت یک ردیف به صورت دیکشنری"""
+        return await self.run(self._fetch_one, query, params)
+    
+    async def fetch_value(self, query, params=None):
+        """اجرای کوئری و دریافت مقدار اولین ستون اولین ردیف"""
+        row = await self.fetch_one(query, params)
+        return next(iter(row.values())) if row else None
+    
+    async def execute(self, query, params=None):
+        """اجرای یک دستور نوشتن و ثبت آن؛ تعداد ردیف‌های تغییر یافته برگردانده می‌شود"""
+        return await self.run(self._execute, query, params)
+    
+    def _fetch_all(self, query, params):
+        """خواندن همه ردیف‌ها در ترد worker"""
+        return [dict(row) for row in self.db.execute(query, params).fetchall()]
+    
+    def _fetch_one(self, query, params):
+        """خواندن یک ردیف در ترد worker"""
+        row = self.db.execute(query, params).fetchone()
+        return dict(row) if row else None
+    
+    def _execute(self, query, params):
+        """اجرا و ثبت دستور نوشتن در ترد worker"""
+        try:
+            cursor = self.db.execute(query, params)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return cursor.rowcount
+    
+    def close(self):
+        """توقف تردهای worker"""
+        self.executor.shutdown(wait=True)
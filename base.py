@@ -21,9 +21,14 @@ class BaseModel:
     def from_dict(cls, data, db=None):
         """ایجاد مدل از دیکشنری"""
         raise NotImplementedError("Subclasses must implement from_dict method")
+    
+    @classmethod
+    async def query_async(cls, async_db, method_name, *args, **kwargs):
+        """اجرای یک متد کوئری مدل (مثلاً get_all) در ترد worker لایه ناهمگام دیتابیس"""
+        return await async_db.run(getattr(cls, method_name), async_db.db, *args, **kwargs)
 
 # models/keyword.py
-from datetime import datetime
+from datetime import datetime, timezone
 from models.base import BaseModel
 
 class Keyword(BaseModel):
@@ -33,7 +38,8 @@ class Keyword(BaseModel):
     
     def __init__(self, db, id=None, text=None, is_active=True, priority=5,
                  max_tweets_per_day=1000, last_search_at=None, category=None,
-                 filter_rules=None, created_at=None):
+                 filter_rules=None, created_at=None, last_tweet_id=None, last_tweet_at=None,
+                 resume_cursor=None, pending_tweet_id=None, pending_tweet_at=None):
         super().__init__(db)
         self.id = id
         self.text = text
@@ -44,6 +50,13 @@ class Keyword(BaseModel):
         self.category = category
         self.filter_rules = filter_rules or {}
         self.created_at = created_at or datetime.now()
+        self.last_tweet_id = last_tweet_id
+        self.last_tweet_at = last_tweet_at
+        # جمع‌آوری ناتمام (سقف توییت یا صفحه) پیش از رسیدن به high-water mark:
+        # cursor ادامه فاصله و جدیدترین توییت دریافت شده که پس از پر شدن فاصله mark جدید می‌شود
+        self.resume_cursor = resume_cursor
+        self.pending_tweet_id = pending_tweet_id
+        self.pending_tweet_at = pending_tweet_at
     
     def save(self):
         """ذخیره کلمه کلیدی در دیتابیس"""
@@ -53,7 +66,10 @@ class Keyword(BaseModel):
                 UPDATE {self.TABLE_NAME}
                 SET text = :text, is_active = :is_active, priority = :priority,
                     max_tweets_per_day = :max_tweets_per_day, last_search_at = :last_search_at,
-                    category = :category, filter_rules = :filter_rules
+                    category = :category, filter_rules = :filter_rules,
+                    last_tweet_id = :last_tweet_id, last_tweet_at = :last_tweet_at,
+                    resume_cursor = :resume_cursor, pending_tweet_id = :pending_tweet_id,
+                    pending_tweet_at = :pending_tweet_at
                 WHERE id = :id
             """
         else:
@@ -61,10 +77,12 @@ class Keyword(BaseModel):
             query = f"""
                 INSERT INTO {self.TABLE_NAME}
                 (text, is_active, priority, max_tweets_per_day, last_search_at,
-                 category, filter_rules, created_at)
+                 category, filter_rules, created_at, last_tweet_id, last_tweet_at,
+                 resume_cursor, pending_tweet_id, pending_tweet_at)
                 VALUES
                 (:text, :is_active, :priority, :max_tweets_per_day, :last_search_at,
-                 :category, :filter_rules, :created_at)
+                 :category, :filter_rules, :created_at, :last_tweet_id, :last_tweet_at,
+                 :resume_cursor, :pending_tweet_id, :pending_tweet_at)
             """
         
         params = {
@@ -76,14 +94,19 @@ class Keyword(BaseModel):
             'last_search_at': self.last_search_at.isoformat() if self.last_search_at else None,
             'category': self.category,
             'filter_rules': self.filter_rules,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'last_tweet_id': self.last_tweet_id,
+            'last_tweet_at': self.last_tweet_at.isoformat() if self.last_tweet_at else None,
+            'resume_cursor': self.resume_cursor,
+            'pending_tweet_id': self.pending_tweet_id,
+            'pending_tweet_at': self.pending_tweet_at.isoformat() if self.pending_tweet_at else None
         }
         
-        self.db.execute(query, params)
+        cursor = self.db.execute(query, params)
         
         if not self.id:
-            # دریافت ID ایجاد شده
-            self.id = self.db.cursor.lastrowid
+            # دریافت ID ایجاد شده (از cursor همین دستور، نه cursor مشترک)
+            self.id = cursor.lastrowid
         
         self.db.commit()
         return self
@@ -103,6 +126,67 @@ class Keyword(BaseModel):
         self.db.commit()
         return self
     
+    def update_high_water_mark(self, last_tweet_id, last_tweet_at=None):
+        """به‌روزرسانی جدیدترین توییت دیده شده برای جمع‌آوری افزایشی (نقطه ادامه جمع‌آوری ناتمام پاک می‌شود)"""
+        self.last_tweet_id = last_tweet_id
+        self.last_tweet_at = last_tweet_at
+        self.resume_cursor = None
+        self.pending_tweet_id = None
+        self.pending_tweet_at = None
+        query = f"""
+            UPDATE {self.TABLE_NAME}
+            SET last_tweet_id = :last_tweet_id, last_tweet_at = :last_tweet_at,
+                resume_cursor = NULL, pending_tweet_id = NULL, pending_tweet_at = NULL
+            WHERE id = :id
+        """
+        self.db.execute(query, {
+            'id': self.id,
+            'last_tweet_id': self.last_tweet_id,
+            'last_tweet_at': self.last_tweet_at.isoformat() if self.last_tweet_at else None,
+            'resume_cursor': self.resume_cursor,
+            'pending_tweet_id': self.pending_tweet_id,
+            'pending_tweet_at': self.pending_tweet_at.isoformat() if self.pending_tweet_at else None
+        })
+        self.db.commit()
+        return self
+    
+    def update_resume_point(self, resume_cursor, pending_tweet_id=None, pending_tweet_at=None):
+        """ثبت نقطه ادامه جمع‌آوری ناتمام؛ high-water mark تا رسیدن به داده‌های قبلی تغییر نمی‌کند"""
+        self.resume_cursor = resume_cursor
+        self.pending_tweet_id = pending_tweet_id
+        self.pending_tweet_at = pending_tweet_at
+        query = f"""
+            UPDATE {self.TABLE_NAME}
+            SET resume_cursor = :resume_cursor, pending_tweet_id = :pending_tweet_id,
+                pending_tweet_at = :pending_tweet_at
+            WHERE id = :id
+        """
+        self.db.execute(query, {
+            'id': self.id,
+            'resume_cursor': self.resume_cursor,
+            'pending_tweet_id': self.pending_tweet_id,
+            'pending_tweet_at': self.pending_tweet_at.isoformat() if self.pending_tweet_at else None
+        })
+        self.db.commit()
+        return self
+    
+    def count_tweets_today(self):
+        """تعداد توییت‌های امروز (روز UTC بر اساس زمان توییت) مرتبط با این کلمه کلیدی"""
+        if not self.id:
+            return 0
+        
+        query = """
+            SELECT COUNT(*) FROM tweet_keywords
+            WHERE keyword_id = :keyword_id AND created_at >= :start_of_day
+        """
+        # زمان ارتباط همان زمان ایجاد توییت به UTC است
+        start_of_day = datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        result = self.db.execute(query, {
+            'keyword_id': self.id,
+            'start_of_day': start_of_day.isoformat()
+        }).fetchone()
+        return result[0]
+    
     @classmethod
     def get_by_id(cls, db, id):
         """دریافت کلمه کلیدی با ID"""
@@ -145,7 +229,12 @@ class Keyword(BaseModel):
             last_search_at=datetime.fromisoformat(data['last_search_at']) if data.get('last_search_at') else None,
             category=data.get('category'),
             filter_rules=data.get('filter_rules', {}),
-            created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else None
+            created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else None,
+            last_tweet_id=data.get('last_tweet_id'),
+            last_tweet_at=datetime.fromisoformat(data['last_tweet_at']) if data.get('last_tweet_at') else None,
+            resume_cursor=data.get('resume_cursor'),
+            pending_tweet_id=data.get('pending_tweet_id'),
+            pending_tweet_at=datetime.fromisoformat(data['pending_tweet_at']) if data.get('pending_tweet_at') else None
         )
     
     def to_dict(self):
@@ -159,5 +248,7 @@ class Keyword(BaseModel):
             'last_search_at': self.last_search_at.isoformat() if self.last_search_at else None,
             'category': self.category,
             'filter_rules': self.filter_rules,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'last_tweet_id': self.last_tweet_id,
+            'last_tweet_at': self.last_tweet_at.isoformat() if self.last_tweet_at else None
         }
\ No newline at end of file
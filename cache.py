@@ -0,0 +1,114 @@
+# plugins/dashboard/cache.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """کش درون‌پروسسی نتایج داشبورد با TTL، حذف LRU و باطل‌سازی بر اساس برچسب"""
+    
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        # کلید ← (زمان انقضا، مقدار، برچسب‌ها)؛ ترتیب OrderedDict همان ترتیب استفاده است
+        self.entries = OrderedDict()
+        # محاسبه‌های در جریان؛ درخواست‌های همزمان برای یک کلید منتظر همان محاسبه می‌مانند
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+    
+    @property
+    def enabled(self):
+        """کش با TTL صفر غیرفعال است"""
+        return self.ttl > 0
+    
+    def get(self, key):
+        """دریافت مقدار معتبر؛ (True, مقدار) در صورت وجود و (False, None) در غیر این صورت"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return True, value
+                del self.entries[key]
+                self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return False, None
+    
+    def set(self, key, value, tags=(), ttl=None, generation=None):
+        """ذخیره مقدار با برچسب‌های باطل‌سازی؛ نتیجه محاسبه‌ای که حین آن باطل‌سازی رخ داده ذخیره نمی‌شود"""
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic() + (ttl or self.ttl), value, frozenset(tags))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    async def get_or_compute(self, key, compute, tags=(), ttl=None):
+        """مقدار کش شده یا اجرای compute (تابع ناهمگام) یک بار برای همه درخواست‌های همزمان"""
+        if not self.enabled:
+            return await compute()
+        
+        hit, value = self.get(key)
+        if hit:
+            return value
+        
+        future = self.pending.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # لغو درخواست اجراکننده (قطع اتصال یا توقف): منتظرها خودشان دوباره محاسبه می‌کنند
+                if not future.cancelled():
+                    raise
+                return await self.get_or_compute(key, compute, tags, ttl)
+        
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        generation = self.generation
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # جلوگیری از هشدار exception بازیابی نشده در نبود منتظر دیگر
+            future.exception()
+            raise
+        else:
+            self.set(key, value, tags, ttl, generation)
+            future.set_result(value)
+            return value
+        finally:
+            self.pending.pop(key, None)
+    
+    def invalidate(self, *tags):
+        """حذف همه مقادیر دارای حداقل یکی از برچسب‌ها (بدون برچسب: حذف همه)"""
+        with self.lock:
+            self.generation += 1
+            if tags:
+                keys = [key for key, (_, _, entry_tags) in self.entries.items() if entry_tags & set(tags)]
+            else:
+                keys = list(self.entries)
+            for key in keys:
+                del self.entries[key]
+            self.stats['invalidations'] += 1
+            return len(keys)
+    
+    def get_stats(self):
+        """آمار کش"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hit_ratio': self.stats['hits'] / lookups if lookups else 0
+            }
@@ -1,9 +1,11 @@
 # plugins/collector/collector.py
 import asyncio
 import json
+import time
 from datetime import datetime, timedelta
 from plugins.base_plugin import BasePlugin
 from plugins.collector.twitter_api import TwitterAPI
+from plugins.collector.scheduler import CollectionScheduler
 from models.keyword import Keyword
 from models.tweet import Tweet
 from models.user import TwitterUser
@@ -14,8 +16,14 @@ class CollectorPlugin(BasePlugin):
     def __init__(self, app):
         super().__init__(app)
         self.twitter_api = None
+        self.scheduler = None
         self.is_collecting = False
         self.collection_task = None
+        self.close_task = None
+        # event loop مالک کلاینت HTTP و قفل‌های rate limiter؛ همه جمع‌آوری‌ها در همین loop اجرا می‌شوند
+        self.loop = None
+        self.collection_interval = 3600
+        self.max_pages_per_keyword = 10
     
     def initialize(self):
         """راه‌اندازی پلاگین"""
@@ -25,8 +33,27 @@ class CollectorPlugin(BasePlugin):
         api_key = self.config.get('TWITTER', 'API_KEY')
         timeout = self.config.getint('TWITTER', 'API_TIMEOUT', 30)
         
-        # ایجاد نمونه TwitterAPI
-        self.twitter_api = TwitterAPI(api_key, self.logger, timeout)
+        # ایجاد نمونه TwitterAPI با کلاینت HTTP ماندگار
+        self.twitter_api = TwitterAPI(
+            api_key, self.logger, timeout,
+            base_url=self.config.get('TWITTER', 'API_BASE_URL', None),
+            max_connections=self.config.getint('TWITTER', 'MAX_CONNECTIONS', 20),
+            max_keepalive_connections=self.config.getint('TWITTER', 'MAX_KEEPALIVE_CONNECTIONS', 10),
+            keepalive_expiry=self.config.getint('TWITTER', 'KEEPALIVE_EXPIRY', 30),
+            http2=self.config.getboolean('TWITTER', 'HTTP2', False),
+            requests_per_minute=self.config.getint('TWITTER', 'MAX_REQUESTS_PER_MINUTE', 60)
+        )
+        self.twitter_api.open()
+        try:
+            self.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+        
+        # ایجاد زمان‌بند جمع‌آوری همزمان
+        concurrency = self.config.getint('COLLECTOR', 'CONCURRENCY', 4)
+        self.collection_interval = self.config.getint('COLLECTOR', 'INTERVAL', 3600)
+        self.max_pages_per_keyword = self.config.getint('COLLECTOR', 'MAX_PAGES_PER_KEYWORD', 10)
+        self.scheduler = CollectionScheduler(self, self.logger, concurrency)
         
         # اشتراک در رویدادها
         self.event_manager.subscribe('app_started', self._on_app_started)
@@ -42,6 +69,18 @@ class CollectorPlugin(BasePlugin):
         """توقف پلاگین"""
         self.logger.info("Shutting down Tweet Collector Plugin")
         self._stop_collection_task()
+        self._close_twitter_api()
+    
+    def _close_twitter_api(self):
+        """بستن کلاینت HTTP ماندگار TwitterAPI"""
+        if self.twitter_api is None:
+            return
+        
+        try:
+            # بستن در event loop مالک اتصال‌ها؛ ارجاع تسک نگه داشته می‌شود تا پیش از اتمام جمع‌آوری نشود
+            self.close_task = self.twitter_api.close_soon()
+        except Exception as e:
+            self.logger.error(f"Error closing Twitter API client: {str(e)}")
     
     def _on_app_started(self, data):
         """رویداد راه‌اندازی اپلیکیشن"""
@@ -62,10 +101,25 @@ class CollectorPlugin(BasePlugin):
         
         if keyword:
             # جمع‌آوری برای یک کلمه کلیدی خاص
-            asyncio.create_task(self.collect_tweets_for_keyword(keyword, max_tweets))
-        else:
-            # جمع‌آوری برای همه کلمات کلیدی فعال
-            asyncio.create_task(self.collect_tweets_for_all_keywords(max_tweets))
+            return self._run_in_loop(self.collect_tweets_for_keyword(keyword, max_tweets))
+        # جمع‌آوری برای همه کلمات کلیدی فعال
+        return self._run_in_loop(self.collect_tweets_for_all_keywords(max_tweets))
+    
+    def _run_in_loop(self, coroutine):
+        """اجرای جمع‌آوری در event loop پلاگین؛ رویداد ارسال شده از loop دیگر (مثلاً سرور داشبورد) به آن سپرده می‌شود"""
+        owner = self.loop or (self.twitter_api.loop if self.twitter_api else None)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        
+        if owner is None or owner is running:
+            return asyncio.create_task(coroutine)
+        if owner.is_closed():
+            coroutine.close()
+            self.logger.warning("Event loop of the collector is closed. Collection request ignored")
+            return None
+        return asyncio.run_coroutine_threadsafe(coroutine, owner)
     
     def _start_collection_task(self):
         """شروع تسک جمع‌آوری اتوماتیک"""
@@ -83,12 +137,14 @@ class CollectorPlugin(BasePlugin):
         """تسک جمع‌آوری اتوماتیک"""
         try:
             while True:
+                cycle_start = time.monotonic()
                 if not self.is_collecting:
                     self.logger.info("Running automatic tweet collection")
                     await self.collect_tweets_for_all_keywords()
                 
-                # انتظار برای دور بعدی جمع‌آوری (هر ساعت)
-                await asyncio.sleep(3600)  # 1 ساعت
+                # انتظار برای دور بعدی جمع‌آوری (فاصله از شروع دور قبلی)
+                elapsed = time.monotonic() - cycle_start
+                await asyncio.sleep(max(0, self.collection_interval - elapsed))
         except asyncio.CancelledError:
             self.logger.info("Automatic collection task cancelled")
         except Exception as e:
@@ -111,35 +167,22 @@ class CollectorPlugin(BasePlugin):
                 self.logger.warning("No active keywords found for collection")
                 return collection_results
             
-            self.logger.info(f"Starting collection for {len(keywords)} active keywords")
+            self.logger.info(
+                f"Starting collection for {len(keywords)} active keywords "
+                f"with {self.scheduler.concurrency} workers"
+            )
             
-            # جمع‌آوری برای هر کلمه کلیدی
-            for keyword in keywords:
-                # تعیین حداکثر توییت برای جمع‌آوری
-                if max_tweets_per_keyword is None:
-                    keyword_max_tweets = keyword.max_tweets_per_day
-                else:
-                    keyword_max_tweets = min(keyword.max_tweets_per_day, max_tweets_per_keyword)
-                
-                try:
-                    # جمع‌آوری توییت‌ها
-                    count = await self.collect_tweets_for_keyword(keyword, keyword_max_tweets)
-                    collection_results[keyword.text] = count
-                    
-                    # بروزرسانی زمان آخرین جستجو
-                    keyword.update_last_search()
-                    
-                    # تاخیر کوتاه بین درخواست‌ها
-                    await asyncio.sleep(1)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error collecting tweets for keyword '{keyword.text}': {str(e)}")
-                    collection_results[keyword.text] = 0
+            # جمع‌آوری همزمان برای کلمات کلیدی
+            collection_results = await self.scheduler.run_cycle(keywords, max_tweets_per_keyword)
             
             self.logger.info("Tweet collection completed")
             
             # انتشار رویداد کامل شدن جمع‌آوری
-            self.event_manager.emit('tweets_collected', results=collection_results)
+            self.event_manager.emit(
+                'tweets_collected',
+                results=collection_results,
+                cycle_stats=self.scheduler.last_cycle_stats
+            )
             
             return collection_results
             
@@ -163,112 +206,139 @@ class CollectorPlugin(BasePlugin):
                 keyword_id = keyword_obj.id
         else:
             # استفاده از آبجکت Keyword موجود
+            keyword_obj = keyword
             keyword_text = keyword.text
             keyword_id = keyword.id
         
-        self.logger.info(f"Collecting tweets for keyword: '{keyword_text}', max: {max_tweets}")
+        # نقطه شروع جمع‌آوری افزایشی (جدیدترین توییت دیده شده)
+        last_tweet_id = keyword_obj.last_tweet_id if keyword_obj else None
+        since = keyword_obj.last_tweet_at if keyword_obj else None
+        
+        # ادامه دور ناتمام قبلی: پس از رسیدن به توییت‌های آن دور، پیمایش از cursor ذخیره شده ادامه می‌یابد
+        # (کوئری با since یکسان است چون mark تا پر شدن فاصله تغییر نمی‌کند)
+        resume_cursor = keyword_obj.resume_cursor if keyword_obj else None
+        pending = None
+        if keyword_obj and keyword_obj.pending_tweet_id:
+            pending = (keyword_obj.pending_tweet_id, keyword_obj.pending_tweet_at)
+        
+        self.logger.info(
+            f"Collecting tweets for keyword: '{keyword_text}', max: {max_tweets}, "
+            f"since: {since.isoformat() if since else 'beginning'}"
+        )
         
         try:
-            # اجرای جستجو در توییتر
-            search_result = await self.twitter_api.search_tweets(
-                query=keyword_text,
-                max_results=max_tweets
-            )
-            
-            # بررسی نتایج
-            if not search_result or 'tweets' not in search_result:
-                self.logger.warning(f"No tweets found for keyword: '{keyword_text}'")
-                return 0
+            saved_count = 0
+            fetched_count = 0
+            newest = pending
+            cursor = None
+            resumed = False
+            complete = False
             
-            tweets = search_result.get('tweets', [])
-            self.logger.info(f"Found {len(tweets)} tweets for keyword: '{keyword_text}'")
+            for page in range(self.max_pages_per_keyword):
+                # اجرای جستجو در توییتر
+                search_result = await self.twitter_api.search_tweets(
+                    query=keyword_text,
+                    max_results=max_tweets,
+                    since=since,
+                    cursor=cursor
+                )
+                
+                # بررسی نتایج
+                if not search_result or not search_result.get('tweets'):
+                    if page == 0:
+                        self.logger.warning(f"No tweets found for keyword: '{keyword_text}'")
+                    complete = search_result is not None
+                    break
+                
+                tweets = search_result.get('tweets', [])
+                fetched_count += len(tweets)
+                self.logger.info(f"Found {len(tweets)} tweets for keyword: '{keyword_text}' (page {page + 1})")
+                
+                # ذخیره دسته‌ای توییت‌ها در یک تراکنش
+                ingest_result = Tweet.bulk_ingest(self.db, tweets, keyword_id, logger=self.logger)
+                saved_count += ingest_result['new']
+                
+                # انتشار رویداد توییت جدید
+                for tweet_id in ingest_result['new_ids']:
+                    await self.event_manager.emit_async('new_tweet', tweet_id=tweet_id)
+                
+                self.logger.debug(
+                    f"Keyword '{keyword_text}': {ingest_result['updated']} tweets updated, "
+                    f"{ingest_result['linked']} new keyword links"
+                )
+                
+                newest = self._newest_tweet(tweets, newest)
+                
+                # توقف در صورت رسیدن به داده‌های قبلی، سقف روزانه یا انتهای نتایج
+                cursor = search_result.get('next_cursor')
+                if search_result.get('has_next_page') is False:
+                    cursor = None
+                if self._reached_known_tweets(tweets, last_tweet_id):
+                    complete = True
+                    break
+                if resume_cursor and not resumed and self._reached_known_tweets(tweets, pending[0]):
+                    # رسیدن به توییت‌های دور ناتمام قبلی: پرش به ادامه فاصله
+                    cursor = resume_cursor
+                    resumed = True
+                if not cursor:
+                    # پایان نتایج کوئری محدود به since: همه توییت‌های پس از mark دریافت شده‌اند
+                    complete = True
+                    break
+                if fetched_count >= max_tweets:
+                    break
             
-            # ذخیره توییت‌ها
-            saved_count = 0
-            for tweet_data in tweets:
-                try:
-                    # استخراج اطلاعات توییت
-                    tweet_id = tweet_data.get('id')
-                    content = tweet_data.get('text', '')
-                    
-                    # بررسی وجود توییت در دیتابیس
-                    existing_tweet = Tweet.get_by_twitter_id(self.db, tweet_id)
-                    if existing_tweet:
-                        # به‌روزرسانی آمار توییت موجود
-                        existing_tweet.update_stats(
-                            retweet_count=tweet_data.get('retweetCount', 0),
-                            like_count=tweet_data.get('likeCount', 0),
-                            reply_count=tweet_data.get('replyCount', 0),
-                            quote_count=tweet_data.get('quoteCount', 0),
-                            view_count=tweet_data.get('viewCount', 0)
-                        )
-                        
-                        # ایجاد ارتباط با کلمه کلیدی (اگر موجود نباشد)
-                        if keyword_id:
-                            existing_tweet.link_to_keyword(keyword_id)
-                        
-                        continue
-                    
-                    # استخراج اطلاعات کاربر
-                    author_data = tweet_data.get('author', {})
-                    author_id = author_data.get('id')
-                    
-                    # بررسی وجود کاربر در دیتابیس
-                    user = TwitterUser.get_by_twitter_id(self.db, author_id)
-                    if not user:
-                        # ایجاد کاربر جدید
-                        user = TwitterUser(
-                            db=self.db,
-                            twitter_id=author_id,
-                            username=author_data.get('userName'),
-                            display_name=author_data.get('name'),
-                            followers_count=author_data.get('followers', 0),
-                            following_count=author_data.get('following', 0),
-                            is_verified=author_data.get('isBlueVerified', False),
-                            profile_data=author_data
-                        ).save()
-                    
-                    # ایجاد توییت جدید
-                    created_at = datetime.strptime(
-                        tweet_data.get('createdAt', '').split('+')[0],
-                        '%a %b %d %H:%M:%S %Y'
-                    ) if 'createdAt' in tweet_data else datetime.now()
-                    
-                    tweet = Tweet(
-                        db=self.db,
-                        twitter_id=tweet_id,
-                        user_id=user.id,
-                        content=content,
-                        created_at=created_at,
-                        retweet_count=tweet_data.get('retweetCount', 0),
-                        like_count=tweet_data.get('likeCount', 0),
-                        reply_count=tweet_data.get('replyCount', 0),
-                        quote_count=tweet_data.get('quoteCount', 0),
-                        view_count=tweet_data.get('viewCount', 0),
-                        is_retweet='retweetedStatus' in tweet_data,
-                        is_reply='inReplyToId' in tweet_data and tweet_data['inReplyToId'],
-                        is_quote='quotedStatus' in tweet_data,
-                        in_reply_to_id=tweet_data.get('inReplyToId'),
-                        language=tweet_data.get('lang'),
-                        is_sensitive=tweet_data.get('possiblySensitive', False),
-                        tweet_data=tweet_data
-                    ).save()
-                    
-                    # ایجاد ارتباط با کلمه کلیدی
-                    if keyword_id:
-                        tweet.link_to_keyword(keyword_id)
-                    
-                    saved_count += 1
-                    
-                    # انتشار رویداد توییت جدید
-                    self.event_manager.emit('new_tweet', tweet_id=tweet.id)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error processing tweet {tweet_data.get('id', 'unknown')}: {str(e)}")
+            if keyword_obj and keyword_obj.id:
+                self._save_collection_point(
+                    keyword_obj, newest, last_tweet_id, complete, cursor, bool(resume_cursor) and not resumed
+                )
             
             self.logger.info(f"Saved {saved_count} new tweets for keyword: '{keyword_text}'")
             return saved_count
             
         except Exception as e:
             self.logger.error(f"Error collecting tweets for keyword '{keyword_text}': {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _save_collection_point(self, keyword, newest, last_tweet_id, complete, cursor, resume_pending):
+        """جابجایی high-water mark فقط پس از رسیدن به داده‌های قبلی؛ در غیر این صورت ثبت نقطه ادامه"""
+        if complete or not last_tweet_id:
+            # اولین جمع‌آوری: mark از جدیدترین توییت؛ توییت‌های قدیمی‌تر از آن هدف جمع‌آوری افزایشی نیستند
+            if newest and self._tweet_id_value(newest[0]) > self._tweet_id_value(last_tweet_id):
+                keyword.update_high_water_mark(*newest)
+            return
+        if resume_pending:
+            # هنوز به دور ناتمام قبلی نرسیده‌ایم؛ نقطه ادامه آن معتبر می‌ماند
+            return
+        
+        self.logger.info(
+            f"Collection for keyword '{keyword.text}' stopped before reaching known tweets. "
+            f"Resuming from the stored cursor next cycle"
+        )
+        keyword.update_resume_point(cursor, *(newest or (None, None)))
+    
+    @staticmethod
+    def _tweet_id_value(tweet_id):
+        """مقدار عددی ID توییت برای مقایسه ترتیب (snowflake)"""
+        try:
+            return int(tweet_id)
+        except (TypeError, ValueError):
+            return -1
+    
+    def _reached_known_tweets(self, tweets, last_tweet_id):
+        """بررسی رسیدن صفحه به توییت‌هایی که قبلاً جمع‌آوری شده‌اند"""
+        if not last_tweet_id:
+            return False
+        last_value = self._tweet_id_value(last_tweet_id)
+        return any(self._tweet_id_value(tweet_data.get('id')) <= last_value for tweet_data in tweets)
+    
+    def _newest_tweet(self, tweets, newest=None):
+        """یافتن جدیدترین توییت (ID و زمان) در یک صفحه"""
+        for tweet_data in tweets:
+            if newest and self._tweet_id_value(tweet_data.get('id')) <= self._tweet_id_value(newest[0]):
+                continue
+            try:
+                created_at = Tweet.parse_api_created_at(tweet_data)
+            except ValueError:
+                continue
+            newest = (tweet_data.get('id'), created_at)
+        return newest
\ No newline at end of file
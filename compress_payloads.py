@@ -0,0 +1,81 @@
+# migrations/compress_payloads.py
+from core.payload_codec import decode_payload
+from models.tweet import Tweet
+
+def compress_payloads(db, batch_size=500, logger=None):
+    """بازنویسی دسته‌ای profile_data و tweet_data ذخیره شده به صورت متن JSON با قالب فشرده"""
+    # ابتدا کاربران تا ارجاع author توییت‌ها به پروفایل موجود اشاره کند
+    users = _rewrite_table(db, 'twitter_users', 'profile_data', """
+        SELECT id, profile_data FROM twitter_users
+        WHERE id > :last_id AND typeof(profile_data) = 'text'
+        ORDER BY id LIMIT :limit
+    """, lambda row: row['profile_data'], batch_size, logger)
+    
+    tweets = _rewrite_table(db, 'tweets', 'tweet_data', """
+        SELECT t.id, t.user_id, t.tweet_data, u.twitter_id AS author_twitter_id
+        FROM tweets AS t LEFT JOIN twitter_users AS u ON u.id = t.user_id
+        WHERE t.id > :last_id AND typeof(t.tweet_data) = 'text'
+        ORDER BY t.id LIMIT :limit
+    """, _compact_tweet_data, batch_size, logger)
+    
+    if logger:
+        logger.info(f"Payload migration finished: {users} users, {tweets} tweets rewritten")
+    return {'users': users, 'tweets': tweets}
+
+def _compact_tweet_data(row):
+    """حذف author تکراری فقط وقتی همان کاربر توییت در twitter_users ذخیره شده باشد"""
+    tweet_data = row['tweet_data']
+    author = tweet_data.get('author')
+    if isinstance(author, dict) and author.get('id') == row['author_twitter_id']:
+        return Tweet.compact_tweet_data(tweet_data, row['user_id'])
+    return tweet_data
+
+def _rewrite_table(db, table_name, column, query, transform, batch_size, logger):
+    """پیمایش keyset روی id و بازنویسی ردیف‌های متنی؛ هر دسته در یک تراکنش جدا ثبت می‌شود"""
+    last_id = 0
+    rewritten = 0
+    
+    while True:
+        rows = [dict(row) for row in db.execute(query, {'last_id': last_id, 'limit': batch_size}).fetchall()]
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        
+        updates = []
+        for row in rows:
+            try:
+                row[column] = decode_payload(row[column])
+            except ValueError:
+                if logger:
+                    logger.warning(f"Skipping {table_name} {row['id']}: {column} is not valid JSON")
+                continue
+            if row[column] is None:
+                continue
+            encoded = db.payload_codec.encode(transform(row))
+            if isinstance(encoded, bytes):
+                updates.append({'id': row['id'], 'value': encoded})
+        
+        if updates:
+            with db.transaction():
+                db.execute_many(f"UPDATE {table_name} SET {column} = :value WHERE id = :id", updates)
+            rewritten += len(updates)
+        
+        if logger:
+            logger.info(f"Payload migration: {table_name} up to id {last_id} ({rewritten} rewritten)")
+    
+    return rewritten
+
+if __name__ == "__main__":
+    from core.config import Config
+    from core.db import Database
+    
+    config = Config()
+    db = Database(config.get('DEFAULT', 'DB_PATH', 'data/twitter_monitor.db'))
+    db.connect()
+    db.configure_payload_codec(
+        config.get('DEFAULT', 'PAYLOAD_CODEC', 'zlib'),
+        config.getint('DEFAULT', 'PAYLOAD_LEVEL', 6),
+        config.getboolean('DEFAULT', 'PAYLOAD_DICTIONARY', True)
+    )
+    print(compress_payloads(db))
+    db.close()
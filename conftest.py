@@ -0,0 +1,51 @@
+# tests/conftest.py
+import logging
+from types import SimpleNamespace
+import pytest
+from core.config import Config
+from core.db import Database
+from core.event_manager import EventManager
+from core.plugin_manager import PluginManager
+from migrations.create_tables import create_tables
+
+@pytest.fixture
+def logger():
+    """لاگر تست‌ها"""
+    return logging.getLogger('twitter_monitor.tests')
+
+@pytest.fixture
+def db(tmp_path):
+    """دیتابیس موقت با همه جداول"""
+    database = Database(str(tmp_path / 'data' / 'twitter_monitor.db'))
+    database.connect()
+    create_tables(database)
+    yield database
+    database.close()
+
+@pytest.fixture
+def config(tmp_path):
+    """تنظیمات پیش‌فرض (بدون فایل config.ini)"""
+    return Config(str(tmp_path / 'config.ini'))
+
+@pytest.fixture
+def app(db, config, logger):
+    """اپلیکیشن حداقلی برای راه‌اندازی پلاگین‌ها بدون سرور و سیگنال‌ها"""
+    app = SimpleNamespace(db=db, config=config, logger=logger, event_manager=EventManager(logger))
+    app.plugin_manager = PluginManager(app)
+    return app
+
+@pytest.fixture
+def api_tweet():
+    """ساخت داده یک توییت با قالب پاسخ API"""
+    def make(twitter_id, text='سلام دنیا', created_at='Tue Dec 10 07:00:30 +0000 2024',
+             author_id='1001', username='author', **fields):
+        tweet_data = {
+            'id': str(twitter_id),
+            'text': text,
+            'createdAt': created_at,
+            'lang': 'fa',
+            'author': {'id': author_id, 'userName': username} if author_id else {}
+        }
+        tweet_data.update(fields)
+        return tweet_data
+    return make
@@ -1,4 +1,12 @@
 # migrations/create_tables.py (continued)
+from models.search import TweetSearch
+
+def add_column_if_missing(db, table_name, column_name, definition):
+    """افزودن یک ستون به جدول موجود در صورت عدم وجود"""
+    columns = [row['name'] for row in db.execute(f"PRAGMA table_info({table_name})").fetchall()]
+    if column_name not in columns:
+        db.execute_script(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition};")
+
 def create_tables(db):
     """ایجاد جداول دیتابیس"""
     
@@ -13,10 +21,22 @@ def create_tables(db):
         last_search_at TIMESTAMP,
         category TEXT,
         filter_rules JSON,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_tweet_id TEXT,
+        last_tweet_at TIMESTAMP,
+        resume_cursor TEXT,
+        pending_tweet_id TEXT,
+        pending_tweet_at TIMESTAMP
     );
     """)
     
+    # ستون‌های جمع‌آوری افزایشی برای دیتابیس‌های قدیمی
+    add_column_if_missing(db, 'keywords', 'last_tweet_id', 'TEXT')
+    add_column_if_missing(db, 'keywords', 'last_tweet_at', 'TIMESTAMP')
+    add_column_if_missing(db, 'keywords', 'resume_cursor', 'TEXT')
+    add_column_if_missing(db, 'keywords', 'pending_tweet_id', 'TEXT')
+    add_column_if_missing(db, 'keywords', 'pending_tweet_at', 'TIMESTAMP')
+    
     # جدول کاربران توییتر
     db.execute_script("""
     CREATE TABLE IF NOT EXISTS twitter_users (
@@ -69,7 +89,9 @@ def create_tables(db):
     
     CREATE INDEX IF NOT EXISTS idx_tweets_twitter_id ON tweets(twitter_id);
     CREATE INDEX IF NOT EXISTS idx_tweets_created_at ON tweets(created_at);
+    CREATE INDEX IF NOT EXISTS idx_tweets_user_id ON tweets(user_id);
     CREATE INDEX IF NOT EXISTS idx_tweets_processing_status ON tweets(processing_status);
+    CREATE INDEX IF NOT EXISTS idx_tweets_status_created ON tweets(processing_status, created_at);
     CREATE INDEX IF NOT EXISTS idx_tweets_importance_score ON tweets(importance_score);
     """)
     
@@ -86,6 +108,7 @@ def create_tables(db):
     );
     
     CREATE INDEX IF NOT EXISTS idx_tweet_keywords_keyword_id ON tweet_keywords(keyword_id);
+    CREATE INDEX IF NOT EXISTS idx_tweet_keywords_keyword_created ON tweet_keywords(keyword_id, created_at);
     """)
     
     # جدول موجودیت‌های توییت (هشتگ‌ها، منشن‌ها، لینک‌ها)
@@ -106,6 +129,15 @@ def create_tables(db):
     CREATE INDEX IF NOT EXISTS idx_tweet_entities_tweet_id ON tweet_entities(tweet_id);
     """)
     
+    # پیشرفت مهاجرت‌های دسته‌ای قابل ادامه (آخرین ID پردازش شده)
+    db.execute_script("""
+    CREATE TABLE IF NOT EXISTS backfill_progress (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    );
+    """)
+    
     # جدول مدیریت API
     db.execute_script("""
     CREATE TABLE IF NOT EXISTS api_usage (
@@ -136,4 +168,275 @@ def create_tables(db):
     );
     
     CREATE INDEX IF NOT EXISTS idx_alerts_is_read ON alerts(is_read);
+    """)
+    
+    # شمارنده‌های تجمیعی داشبورد (به‌روزرسانی با trigger در هر درج/تغییر/حذف)
+    stats_table_exists = db.table_exists('stats_counters')
+    db.execute_script("""
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_counters_insert AFTER INSERT ON tweets
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('tweets_total', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        INSERT INTO stats_counters (name, value) VALUES ('status:' || COALESCE(NEW.processing_status, ''), 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        INSERT INTO stats_counters (name, value) VALUES ('filter:' || COALESCE(NEW.filter_result, ''), 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_counters_delete AFTER DELETE ON tweets
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'tweets_total';
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'status:' || COALESCE(OLD.processing_status, '');
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'filter:' || COALESCE(OLD.filter_result, '');
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_counters_status AFTER UPDATE OF processing_status ON tweets
+    WHEN OLD.processing_status IS NOT NEW.processing_status
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'status:' || COALESCE(OLD.processing_status, '');
+        INSERT INTO stats_counters (name, value) VALUES ('status:' || COALESCE(NEW.processing_status, ''), 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_counters_filter AFTER UPDATE OF filter_result ON tweets
+    WHEN OLD.filter_result IS NOT NEW.filter_result
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'filter:' || COALESCE(OLD.filter_result, '');
+        INSERT INTO stats_counters (name, value) VALUES ('filter:' || COALESCE(NEW.filter_result, ''), 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_keywords_counters_insert AFTER INSERT ON keywords
+    BEGIN
+        INSERT INTO stats_counters (name, value) VALUES ('keywords_total', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        INSERT INTO stats_counters (name, value) VALUES ('keywords_active', CASE WHEN NEW.is_active THEN 1 ELSE 0 END)
+            ON CONFLICT(name) DO UPDATE SET value = value + (CASE WHEN NEW.is_active THEN 1 ELSE 0 END);
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_keywords_counters_delete AFTER DELETE ON keywords
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'keywords_total';
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'keywords_active' AND OLD.is_active;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_keywords_counters_active AFTER UPDATE OF is_active ON keywords
+    WHEN OLD.is_active IS NOT NEW.is_active
+    BEGIN
+        UPDATE stats_counters
+        SET value = value + (CASE WHEN NEW.is_active THEN 1 ELSE -1 END)
+        WHERE name = 'keywords_active';
+    END;
+    """)
+    
+    # مقداردهی اولیه شمارنده‌ها برای دیتابیس‌های موجود
+    if not stats_table_exists:
+        rebuild_stats_counters(db)
+    
+    # جدول تجمیع حجم توییت‌ها در بازه‌های ساعتی و روزانه (به‌روزرسانی با trigger)
+    # dimension یکی از all، keyword (با ID کلمه کلیدی)، filter_result و language است
+    rollups_table_exists = db.table_exists('tweet_volume_rollups')
+    db.execute_script("""
+    CREATE TABLE IF NOT EXISTS tweet_volume_rollups (
+        granularity TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, dimension, value, bucket)
+    ) WITHOUT ROWID;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_rollups_insert AFTER INSERT ON tweets
+    BEGIN
+        INSERT INTO tweet_volume_rollups (granularity, dimension, value, bucket, count)
+        SELECT g.granularity, d.dimension, d.value, strftime(g.format, NEW.created_at), 1
+        FROM (SELECT 'hour' AS granularity, '%Y-%m-%d %H:00' AS format
+              UNION ALL SELECT 'day', '%Y-%m-%d') AS g,
+             (SELECT 'all' AS dimension, '' AS value
+              UNION ALL SELECT 'filter_result', COALESCE(NEW.filter_result, '')
+              UNION ALL SELECT 'language', COALESCE(NEW.language, '')) AS d
+        WHERE 1
+        ON CONFLICT(granularity, dimension, value, bucket) DO UPDATE SET count = count + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_rollups_delete AFTER DELETE ON tweets
+    BEGIN
+        UPDATE tweet_volume_rollups SET count = count - 1
+        WHERE (granularity, bucket) IN (VALUES ('hour', strftime('%Y-%m-%d %H:00', OLD.created_at)),
+                                               ('day', strftime('%Y-%m-%d', OLD.created_at)))
+          AND (dimension, value) IN (VALUES ('all', ''),
+                                            ('filter_result', COALESCE(OLD.filter_result, '')),
+                                            ('language', COALESCE(OLD.language, '')));
+        
+        UPDATE tweet_volume_rollups SET count = count - 1
+        WHERE (granularity, bucket) IN (VALUES ('hour', strftime('%Y-%m-%d %H:00', OLD.created_at)),
+                                               ('day', strftime('%Y-%m-%d', OLD.created_at)))
+          AND dimension = 'keyword'
+          AND value IN (SELECT CAST(keyword_id AS TEXT) FROM tweet_keywords WHERE tweet_id = OLD.id);
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_rollups_filter AFTER UPDATE OF filter_result ON tweets
+    WHEN OLD.filter_result IS NOT NEW.filter_result
+    BEGIN
+        UPDATE tweet_volume_rollups SET count = count - 1
+        WHERE (granularity, bucket) IN (VALUES ('hour', strftime('%Y-%m-%d %H:00', OLD.created_at)),
+                                               ('day', strftime('%Y-%m-%d', OLD.created_at)))
+          AND dimension = 'filter_result' AND value = COALESCE(OLD.filter_result, '');
+        
+        INSERT INTO tweet_volume_rollups (granularity, dimension, value, bucket, count)
+        SELECT g.granularity, 'filter_result', COALESCE(NEW.filter_result, ''),
+               strftime(g.format, NEW.created_at), 1
+        FROM (SELECT 'hour' AS granularity, '%Y-%m-%d %H:00' AS format
+              UNION ALL SELECT 'day', '%Y-%m-%d') AS g
+        WHERE 1
+        ON CONFLICT(granularity, dimension, value, bucket) DO UPDATE SET count = count + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweet_keywords_rollups_insert AFTER INSERT ON tweet_keywords
+    BEGIN
+        INSERT INTO tweet_volume_rollups (granularity, dimension, value, bucket, count)
+        SELECT g.granularity, 'keyword', CAST(NEW.keyword_id AS TEXT), strftime(g.format, t.created_at), 1
+        FROM (SELECT 'hour' AS granularity, '%Y-%m-%d %H:00' AS format
+              UNION ALL SELECT 'day', '%Y-%m-%d') AS g,
+             tweets AS t
+        WHERE t.id = NEW.tweet_id
+        ON CONFLICT(granularity, dimension, value, bucket) DO UPDATE SET count = count + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweet_keywords_rollups_delete AFTER DELETE ON tweet_keywords
+    BEGIN
+        UPDATE tweet_volume_rollups SET count = count - 1
+        WHERE dimension = 'keyword' AND value = CAST(OLD.keyword_id AS TEXT)
+          AND (granularity, bucket) IN (
+              SELECT 'hour', strftime('%Y-%m-%d %H:00', created_at) FROM tweets WHERE id = OLD.tweet_id
+              UNION ALL
+              SELECT 'day', strftime('%Y-%m-%d', created_at) FROM tweets WHERE id = OLD.tweet_id
+          );
+    END;
+    """)
+    
+    # مقداردهی اولیه تجمیع‌ها برای دیتابیس‌های موجود
+    if not rollups_table_exists:
+        rebuild_volume_rollups(db)
+    
+    # نمایه متن کامل توییت‌ها (FTS5 بدون محتوا؛ متن یکسان‌سازی شده فارسی با trigger نمایه می‌شود)
+    search_table_exists = db.table_exists(TweetSearch.TABLE_NAME)
+    new_content = TweetSearch.normalize_sql('NEW.content')
+    old_content = TweetSearch.normalize_sql('OLD.content')
+    fts = TweetSearch.TABLE_NAME
+    db.execute_script(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+        content,
+        content = '',
+        tokenize = '{TweetSearch.TOKENIZER}'
+    );
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_fts_insert AFTER INSERT ON tweets
+    BEGIN
+        INSERT INTO {fts} (rowid, content) SELECT NEW.id, content FROM ({new_content});
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_fts_delete AFTER DELETE ON tweets
+    BEGIN
+        INSERT INTO {fts} ({fts}, rowid, content) SELECT 'delete', OLD.id, content FROM ({old_content});
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_tweets_fts_update AFTER UPDATE OF content ON tweets
+    WHEN OLD.content IS NOT NEW.content
+    BEGIN
+        INSERT INTO {fts} ({fts}, rowid, content) SELECT 'delete', OLD.id, content FROM ({old_content});
+        INSERT INTO {fts} (rowid, content) SELECT NEW.id, content FROM ({new_content});
+    END;
+    """)
+    
+    # نمایه‌سازی توییت‌های موجود
+    if not search_table_exists:
+        rebuild_search_index(db)
+    
+    # ثبت پارتیشن‌های ماهانه توییت‌های قدیمی (فایل‌های SQLite جدا در PARTITION_DIR)
+    db.execute_script("""
+    CREATE TABLE IF NOT EXISTS tweet_partitions (
+        key TEXT PRIMARY KEY,
+        start_at TEXT NOT NULL,
+        end_at TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'attached',
+        tweet_count INTEGER NOT NULL DEFAULT 0,
+        min_id INTEGER,
+        max_id INTEGER,
+        counters JSON,
+        size_bytes INTEGER,
+        updated_at TIMESTAMP
+    );
+    """)
+    
+    # checkpoint sketchهای روند (Count-Min هر بازه و top-k بازه‌های پنجره فعلی)
+    db.execute_script("""
+    CREATE TABLE IF NOT EXISTS trend_sketches (
+        bucket_start INTEGER NOT NULL,
+        sketch TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        scope TEXT NOT NULL DEFAULT '',
+        data BLOB NOT NULL,
+        updated_at TIMESTAMP,
+        PRIMARY KEY (bucket_start, sketch, kind, scope)
+    );
+    """)
+
+def rebuild_stats_counters(db):
+    """محاسبه مجدد همه شمارنده‌های تجمیعی از روی جداول اصلی"""
+    db.execute_script("""
+    BEGIN;
+    DELETE FROM stats_counters;
+    
+    INSERT INTO stats_counters (name, value)
+    SELECT 'tweets_total', COUNT(*) FROM tweets;
+    
+    INSERT INTO stats_counters (name, value)
+    SELECT 'status:' || COALESCE(processing_status, ''), COUNT(*) FROM tweets
+    GROUP BY processing_status;
+    
+    INSERT INTO stats_counters (name, value)
+    SELECT 'filter:' || COALESCE(filter_result, ''), COUNT(*) FROM tweets
+    GROUP BY filter_result;
+    
+    INSERT INTO stats_counters (name, value)
+    SELECT 'keywords_total', COUNT(*) FROM keywords;
+    
+    INSERT INTO stats_counters (name, value)
+    SELECT 'keywords_active', COUNT(*) FROM keywords WHERE is_active;
+    COMMIT;
+    """)
+
+def rebuild_volume_rollups(db):
+    """محاسبه مجدد جدول تجمیع حجم توییت‌ها از روی جداول اصلی"""
+    db.execute_script("""
+    BEGIN;
+    DELETE FROM tweet_volume_rollups;
+    
+    INSERT INTO tweet_volume_rollups (granularity, dimension, value, bucket, count)
+    SELECT g.granularity, d.dimension, d.value, strftime(g.format, d.created_at), COUNT(*)
+    FROM (SELECT 'hour' AS granularity, '%Y-%m-%d %H:00' AS format
+          UNION ALL SELECT 'day', '%Y-%m-%d') AS g,
+         (SELECT 'all' AS dimension, '' AS value, created_at FROM tweets
+          UNION ALL SELECT 'filter_result', COALESCE(filter_result, ''), created_at FROM tweets
+          UNION ALL SELECT 'language', COALESCE(language, ''), created_at FROM tweets
+          UNION ALL SELECT 'keyword', CAST(tk.keyword_id AS TEXT), t.created_at
+                    FROM tweet_keywords AS tk JOIN tweets AS t ON t.id = tk.tweet_id) AS d
+    GROUP BY 1, 2, 3, 4;
+    COMMIT;
+    """)
+
+def rebuild_search_index(db):
+    """بازسازی نمایه متن کامل از روی جدول توییت‌ها"""
+    db.execute_script(f"""
+    BEGIN;
+    INSERT INTO {TweetSearch.TABLE_NAME} ({TweetSearch.TABLE_NAME}) VALUES ('delete-all');
+    INSERT INTO {TweetSearch.TABLE_NAME} (rowid, content)
+    SELECT id, content FROM ({TweetSearch.normalize_sql('content', key='id', source='tweets')});
+    COMMIT;
     """)
\ No newline at end of file
@@ -1,27 +1,49 @@
 # plugins/dashboard/dashboard.py
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 from fastapi import FastAPI, Request, Depends, HTTPException, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
 from pydantic import BaseModel
 import threading
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 from plugins.base_plugin import BasePlugin
+from core.async_db import AsyncDatabase
 from models.keyword import Keyword
 from models.tweet import Tweet
 from models.user import TwitterUser
+from models.stats import StatsCounter, VolumeRollup
+from models.search import TweetSearch
+from models.export import TweetExport
+from plugins.dashboard.cache import ResponseCache
+from plugins.dashboard.stream import StreamBroadcaster
 
 class DashboardPlugin(BasePlugin):
     """پلاگین داشبورد مدیریت"""
     
+    # رویدادهایی که داده‌های کش شده را کهنه می‌کنند
+    TWEET_EVENTS = ('tweets_collected', 'tweet_accepted', 'retention_applied')
+    KEYWORD_EVENTS = ('keyword_added', 'keyword_updated', 'keyword_deleted')
+    
+    # ستون‌های توییت در رویدادهای جریان زنده
+    STREAM_COLUMNS = (
+        'id', 'twitter_id', 'user_id', 'content', 'created_at', 'language',
+        'retweet_count', 'like_count', 'reply_count', 'importance_score',
+        'processing_status', 'filter_result'
+    )
+    
     def __init__(self, app):
         super().__init__(app)
         self.fastapi_app = None
         self.server_thread = None
+        self.async_db = None
+        self.cache = None
+        self.stream = None
         self.templates_dir = os.path.join(os.path.dirname(__file__), "templates")
         self.static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static")
         
@@ -29,6 +51,30 @@ class DashboardPlugin(BasePlugin):
         """راه‌اندازی پلاگین"""
         self.logger.info("Initializing Dashboard Plugin")
         
+        # کوئری‌های داشبورد در pool ترد اجرا می‌شوند تا event loop سرور مسدود نشود
+        self.async_db = AsyncDatabase(
+            self.db, max_workers=self.config.getint('DASHBOARD', 'DB_WORKERS', 4)
+        )
+        
+        # کش نتایج کوئری‌ها؛ با رویدادهای تغییر داده باطل می‌شود و TTL سقف کهنگی است
+        self.cache = ResponseCache(
+            max_entries=self.config.getint('DASHBOARD', 'CACHE_SIZE', 256),
+            ttl=self.config.getint('DASHBOARD', 'CACHE_TTL', 30)
+        )
+        for event_type in self.TWEET_EVENTS:
+            self.event_manager.subscribe(event_type, self._on_tweets_changed)
+        for event_type in self.KEYWORD_EVENTS:
+            self.event_manager.subscribe(event_type, self._on_keywords_changed)
+        
+        # جریان زنده: رویدادهای توییت دسته‌ای دریافت می‌شوند تا هر دسته با یک کوئری برای همه کلاینت‌ها خوانده شود
+        self.stream = StreamBroadcaster(
+            buffer_size=self.config.getint('DASHBOARD', 'STREAM_BUFFER', 100),
+            max_clients=self.config.getint('DASHBOARD', 'STREAM_MAX_CLIENTS', 500),
+            heartbeat=self.config.getint('DASHBOARD', 'STREAM_HEARTBEAT', 15)
+        )
+        self.event_manager.subscribe('new_tweet', self._on_stream_new_tweets, batch_size=100)
+        self.event_manager.subscribe('tweet_accepted', self._on_stream_accepted_tweets, batch_size=100)
+        
         # ایجاد برنامه FastAPI
         self.fastapi_app = FastAPI(title="Twitter Monitor Dashboard")
         
@@ -57,6 +103,8 @@ class DashboardPlugin(BasePlugin):
     def shutdown(self):
         """توقف پلاگین"""
         self.logger.info("Shutting down Dashboard Plugin")
+        if self.async_db:
+            self.async_db.close()
     
     def _register_routes(self):
         """ثبت مسیرهای FastAPI"""
@@ -64,17 +112,9 @@ class DashboardPlugin(BasePlugin):
         @self.fastapi_app.get("/", response_class=HTMLResponse)
         async def read_root(request: Request):
             """صفحه اصلی"""
-            tweet_count = len(Tweet.get_recent(self.db, limit=1000))
-            
-            # آمار کلی
-            stats = {
-                'total_tweets': tweet_count,
-                'active_keywords': len(Keyword.get_all(self.db, active_only=True)),
-                'recent_tweets': Tweet.get_recent(self.db, limit=10)
-            }
-            
-            # نمودار توییت‌ها در 7 روز گذشته
-            chart_data = await self._get_tweet_volume_data(days=7)
+            stats, chart_data = await self.cache.get_or_compute(
+                'dashboard', self._get_dashboard_data, tags=('tweets', 'keywords')
+            )
             
             return self.templates.TemplateResponse(
                 "dashboard.html",
@@ -84,7 +124,9 @@ class DashboardPlugin(BasePlugin):
         @self.fastapi_app.get("/keywords", response_class=HTMLResponse)
         async def keywords_page(request: Request):
             """صفحه مدیریت کلمات کلیدی"""
-            keywords = Keyword.get_all(self.db)
+            keywords = await self.cache.get_or_compute(
+                'keywords', lambda: Keyword.query_async(self.async_db, 'get_all'), tags=('keywords',)
+            )
             return self.templates.TemplateResponse(
                 "keywords.html",
                 {"request": request, "keywords": keywords}
@@ -99,7 +141,7 @@ class DashboardPlugin(BasePlugin):
         ):
             """افزودن کلمه کلیدی جدید"""
             # بررسی وجود کلمه کلیدی
-            existing = Keyword.get_by_text(self.db, text)
+            existing = await Keyword.query_async(self.async_db, 'get_by_text', text)
             if existing:
                 return {"status": "error", "message": "Keyword already exists"}
             
@@ -109,74 +151,72 @@ class DashboardPlugin(BasePlugin):
                 text=text,
                 priority=priority,
                 max_tweets_per_day=max_tweets_per_day
-            ).save()
+            )
+            await self.async_db.run(keyword.save)
             
+            # ارتباط توییت‌های ذخیره شده منطبق از طریق نمایه متن کامل
+            try:
+                await TweetSearch.query_async(self.async_db, 'backfill_keyword', keyword.id, keyword.text)
+            except ValueError as e:
+                self.logger.warning(f"Keyword '{keyword.text}' was not linked to stored tweets: {str(e)}")
+            
+            self.event_manager.emit('keyword_added', keyword_id=keyword.id, text=keyword.text)
             return RedirectResponse(url="/keywords", status_code=303)
         
         @self.fastapi_app.get("/keywords/{keyword_id}/toggle")
         async def toggle_keyword(request: Request, keyword_id: int):
             """تغییر وضعیت فعال/غیرفعال کلمه کلیدی"""
-            keyword = Keyword.get_by_id(self.db, keyword_id)
+            keyword = await Keyword.query_async(self.async_db, 'get_by_id', keyword_id)
             if not keyword:
                 raise HTTPException(status_code=404, detail="Keyword not found")
             
             keyword.is_active = not keyword.is_active
-            keyword.save()
+            await self.async_db.run(keyword.save)
             
+            self.event_manager.emit('keyword_updated', keyword_id=keyword.id, is_active=keyword.is_active)
             return RedirectResponse(url="/keywords", status_code=303)
         
         @self.fastapi_app.get("/keywords/{keyword_id}/delete")
         async def delete_keyword(request: Request, keyword_id: int):
             """حذف کلمه کلیدی"""
-            keyword = Keyword.get_by_id(self.db, keyword_id)
+            keyword = await Keyword.query_async(self.async_db, 'get_by_id', keyword_id)
             if not keyword:
                 raise HTTPException(status_code=404, detail="Keyword not found")
             
             # حذف کلمه کلیدی
-            self.db.execute(
-                "DELETE FROM keywords WHERE id = ?",
+            await self.async_db.execute(
+                "DELETE FROM keywords WHERE id = :id",
                 {"id": keyword_id}
             )
-            self.db.commit()
             
+            self.event_manager.emit('keyword_deleted', keyword_id=keyword_id)
             return RedirectResponse(url="/keywords", status_code=303)
         
         @self.fastapi_app.get("/tweets", response_class=HTMLResponse)
-        async def tweets_page(request: Request, limit: int = 50, offset: int = 0, status: str = None):
-            """صفحه مشاهده توییت‌ها"""
-            # ساخت کوئری
-            query = "SELECT * FROM tweets"
-            params = {}
-            
-            if status:
-                query += " WHERE processing_status = :status"
-                params["status"] = status
-            
-            query += " ORDER BY created_at DESC LIMIT :limit OFFSET :offset"
-            params["limit"] = limit
-            params["offset"] = offset
-            
-            # اجرای کوئری
-            results = self.db.execute(query, params).fetchall()
-            tweets = [Tweet.from_dict(dict(row), self.db) for row in results]
+        async def tweets_page(request: Request, limit: int = 50, status: str = None,
+                              before: str = None, after: str = None):
+            """صفحه مشاهده توییت‌ها (صفحه‌بندی keyset با cursor)"""
+            limit = max(1, min(limit, 200))
             
-            # دریافت تعداد کل
-            count_query = "SELECT COUNT(*) as count FROM tweets"
-            if status:
-                count_query += " WHERE processing_status = :status"
-            
-            count_result = self.db.execute(count_query, params).fetchone()
-            total_count = dict(count_result)["count"]
+            # تعداد کل از شمارنده‌های تجمیعی (بدون COUNT(*) در هر صفحه)
+            counter_name = f"status:{status}" if status else 'tweets_total'
+            try:
+                (tweets, has_more), total_count = await asyncio.gather(
+                    Tweet.query_async(self.async_db, 'get_page', limit=limit, status=status,
+                                      before=before, after=after),
+                    StatsCounter.query_async(self.async_db, 'get', counter_name)
+                )
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor")
             
             # محاسبه صفحه‌بندی
             pagination = {
-                "current_offset": offset,
                 "limit": limit,
                 "total_count": total_count,
-                "has_prev": offset > 0,
-                "has_next": offset + limit < total_count,
-                "prev_offset": max(0, offset - limit),
-                "next_offset": offset + limit
+                "has_prev": bool(tweets) and (bool(before) or (bool(after) and has_more)),
+                "has_next": bool(tweets) and (bool(after) or (not after and has_more)),
+                "prev_cursor": Tweet.encode_cursor(tweets[0]) if tweets else None,
+                "next_cursor": Tweet.encode_cursor(tweets[-1]) if tweets else None
             }
             
             return self.templates.TemplateResponse(
@@ -192,35 +232,130 @@ class DashboardPlugin(BasePlugin):
         @self.fastapi_app.get("/api/stats")
         async def get_stats():
             """API برای آمار کلی"""
-            tweet_count = len(Tweet.get_recent(self.db, limit=1000))
-            accepted_count = 0
-            rejected_count = 0
+            # شمارنده‌های تجمیعی؛ هزینه مستقل از حجم توییت‌ها
+            summary = await self.cache.get_or_compute(
+                'summary', lambda: StatsCounter.query_async(self.async_db, 'get_summary'),
+                tags=('tweets', 'keywords')
+            )
             
-            # محاسبه تعداد توییت‌های پذیرفته/رد شده
-            filter_stats = self.db.execute("""
-                SELECT filter_result, COUNT(*) as count
-                FROM tweets
-                GROUP BY filter_result
-            """).fetchall()
+            return {
+                "total_tweets": summary["total_tweets"],
+                "active_keywords": summary["active_keywords"],
+                "accepted_tweets": summary["by_filter_result"].get("accepted", 0),
+                "rejected_tweets": summary["by_filter_result"].get("rejected", 0),
+                "by_status": summary["by_status"]
+            }
+        
+        @self.fastapi_app.get("/api/search")
+        async def search_tweets(q: str, limit: int = 20, sort: str = 'rank', cursor: str = None,
+                                status: str = None, language: str = None):
+            """API جستجوی متن کامل توییت‌ها (رتبه‌بندی bm25 یا جدیدترین، صفحه‌بندی keyset)"""
+            if sort not in TweetSearch.SORTS:
+                raise HTTPException(status_code=400, detail="sort must be 'rank' or 'recent'")
+            limit = max(1, min(limit, 100))
             
-            for row in filter_stats:
-                stats_row = dict(row)
-                if stats_row["filter_result"] == "accepted":
-                    accepted_count = stats_row["count"]
-                elif stats_row["filter_result"] == "rejected":
-                    rejected_count = stats_row["count"]
+            try:
+                results, has_more = await TweetSearch.query_async(
+                    self.async_db, 'search', q, limit=limit, sort=sort, cursor=cursor,
+                    status=status, language=language
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
             return {
-                "total_tweets": tweet_count,
-                "active_keywords": len(Keyword.get_all(self.db, active_only=True)),
-                "accepted_tweets": accepted_count,
-                "rejected_tweets": rejected_count
+                "query": q,
+                "sort": sort,
+                "results": results,
+                "has_more": has_more,
+                "next_cursor": TweetSearch.encode_cursor(results[-1], sort) if has_more else None
+            }
+        
+        @self.fastapi_app.get("/api/export/{table}")
+        async def export_table(table: str, format: str = 'ndjson', keyword: str = None,
+                               start: str = None, end: str = None, filter_result: str = None,
+                               include_payload: bool = False):
+            """خروجی جریانی tweets، twitter_users یا tweet_keywords (ndjson، csv، columnar یا parquet)"""
+            # همه دسته‌های یک خروجی در یک ترد اختصاصی خوانده می‌شوند (یک اتصال خواننده و یک snapshot)
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+            try:
+                chunks = await asyncio.get_running_loop().run_in_executor(executor, functools.partial(
+                    TweetExport.export, self.db, table, format, keyword=keyword, start_at=start,
+                    end_at=end, filter_result=filter_result, include_payload=include_payload
+                ))
+            except ValueError as e:
+                executor.shutdown(wait=False)
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            # هر دسته پس از خواندن ارسال می‌شود
+            filename = f"{table}.{TweetExport.EXTENSIONS[format]}"
+            return StreamingResponse(
+                self._iterate_in_thread(chunks, executor),
+                media_type=TweetExport.MEDIA_TYPES[format],
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
+        
+        @self.fastapi_app.get("/api/trends")
+        async def get_trends(kind: str = 'hashtag', keyword_id: int = None, limit: int = 20,
+                             min_count: int = 2):
+            """API برای هشتگ‌ها و کلمات در حال جهش (کل توییت‌ها یا یک کلمه کلیدی)"""
+            trends_plugin = self.app.plugin_manager.get_plugin('trends')
+            if trends_plugin is None or trends_plugin.tracker is None:
+                raise HTTPException(status_code=503, detail="Trends plugin is not running")
+            limit = max(1, min(limit, 100))
+            
+            try:
+                trends = trends_plugin.get_trends(kind, keyword_id, limit=limit, min_count=max(1, min_count))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            return {
+                "kind": kind,
+                "keyword_id": keyword_id,
+                "bucket_seconds": trends_plugin.tracker.bucket_seconds,
+                "window_buckets": trends_plugin.tracker.window_buckets,
+                "trends": trends
             }
         
         @self.fastapi_app.get("/api/chart/volume")
-        async def get_tweet_volume():
-            """API برای داده‌های نمودار حجم توییت"""
-            return await self._get_tweet_volume_data()
+        async def get_tweet_volume(days: int = 7, granularity: str = 'day',
+                                   dimension: str = 'all', value: str = ''):
+            """API برای داده‌های نمودار حجم توییت (ساعتی/روزانه، کل یا به تفکیک کلمه کلیدی، نتیجه فیلتر یا زبان)"""
+            if granularity not in VolumeRollup.BUCKET_FORMATS:
+                raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+            if dimension not in VolumeRollup.DIMENSIONS:
+                raise HTTPException(status_code=400, detail=f"dimension must be one of {', '.join(VolumeRollup.DIMENSIONS)}")
+            max_days = self.config.getint('DASHBOARD', 'CHART_MAX_DAYS', 365)
+            if days < 1 or days > max_days:
+                raise HTTPException(status_code=400, detail=f"days must be between 1 and {max_days}")
+            
+            return await self.cache.get_or_compute(
+                ('volume', days, granularity, dimension, value),
+                lambda: self._get_tweet_volume_data(days, granularity, dimension, value),
+                tags=('tweets',)
+            )
+        
+        @self.fastapi_app.get("/api/stream")
+        async def stream_events():
+            """جریان SSE توییت‌های جدید (new_tweet) و پذیرفته شده (tweet_accepted)"""
+            queue = self.stream.connect()
+            if queue is None:
+                raise HTTPException(status_code=503, detail="Too many stream clients")
+            
+            return StreamingResponse(
+                self.stream.stream(queue),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        @self.fastapi_app.get("/api/stream/stats")
+        async def get_stream_stats():
+            """API برای آمار جریان زنده"""
+            return self.stream.get_stats()
+        
+        @self.fastapi_app.get("/api/cache")
+        async def get_cache_stats():
+            """API برای آمار کش داشبورد"""
+            return self.cache.get_stats()
         
         @self.fastapi_app.post("/api/collect")
         async def trigger_collection():
@@ -228,41 +363,104 @@ class DashboardPlugin(BasePlugin):
             self.event_manager.emit('collect_tweets')
             return {"status": "success", "message": "Collection started"}
     
+    def _on_tweets_changed(self, data):
+        """باطل کردن نتایج وابسته به توییت‌ها پس از جمع‌آوری، فیلتر یا انتقال به پارتیشن"""
+        self.cache.invalidate('tweets')
+    
+    def _on_keywords_changed(self, data):
+        """باطل کردن نتایج وابسته به کلمات کلیدی پس از افزودن، تغییر وضعیت یا حذف"""
+        self.cache.invalidate('keywords')
+    
+    def _on_stream_new_tweets(self, events):
+        """ارسال دسته توییت‌های جمع‌آوری شده به جریان زنده"""
+        self._schedule_stream('new_tweet', [event['tweet_id'] for event in events])
+    
+    def _on_stream_accepted_tweets(self, events):
+        """ارسال دسته توییت‌های پذیرفته شده به جریان زنده"""
+        self._schedule_stream('tweet_accepted', [event['tweet_id'] for event in events])
+    
+    def _schedule_stream(self, event, tweet_ids):
+        """انتقال انتشار به event loop سرور داشبورد؛ بدون کلاینت متصل کوئری اجرا نمی‌شود"""
+        if not tweet_ids or not self.stream.has_clients:
+            return
+        asyncio.run_coroutine_threadsafe(self._publish_tweets(event, tweet_ids), self.stream.loop)
+    
+    async def _publish_tweets(self, event, tweet_ids):
+        """خواندن توییت‌ها و ارسال هر کدام به همه کلاینت‌های جریان زنده"""
+        try:
+            tweets = await Tweet.query_async(self.async_db, 'get_by_ids', tweet_ids, columns=self.STREAM_COLUMNS)
+        except Exception as e:
+            self.logger.error(f"Error loading tweets for live stream: {str(e)}")
+            return
+        
+        for tweet in tweets:
+            data = {column: getattr(tweet, column) for column in self.STREAM_COLUMNS}
+            if data['created_at']:
+                data['created_at'] = data['created_at'].isoformat()
+            self.stream.publish(event, data)
+    
     def _run_server(self, host, port):
         """اجرای سرور FastAPI"""
         uvicorn.run(self.fastapi_app, host=host, port=port)
     
-    async def _get_tweet_volume_data(self, days=7):
-        """دریافت داده‌های حجم توییت برای نمودار"""
-        # محاسبه تاریخ شروع
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # اجرای کوئری
-        query = """
-            SELECT DATE(created_at) as date, COUNT(*) as count
-            FROM tweets
-            WHERE created_at >= :start_date
-            GROUP BY DATE(created_at)
-            ORDER BY date ASC
-        """
-        
-        results = self.db.execute(query, {"start_date": start_date.isoformat()}).fetchall()
-        
-        # ساخت داده‌های نمودار
-        chart_data = [{"date": dict(row)["date"], "count": dict(row)["count"]} for row in results]
-        
-        # تکمیل تاریخ‌های خالی
-        dates = set(item["date"] for item in chart_data)
-        current_date = start_date.date()
-        end_date = datetime.now().date()
-        
-        while current_date <= end_date:
-            date_str = current_date.isoformat()
-            if date_str not in dates:
-                chart_data.append({"date": date_str, "count": 0})
-            current_date += timedelta(days=1)
-        
-        # مرتب‌سازی بر اساس تاریخ
-        chart_data.sort(key=lambda x: x["date"])
+    async def _get_dashboard_data(self):
+        """داده‌های صفحه اصلی: آمار کلی، توییت‌های اخیر و نمودار 7 روز گذشته"""
+        # اجرای همزمان کوئری‌ها در تردهای worker
+        summary, recent_tweets, chart_data = await asyncio.gather(
+            StatsCounter.query_async(self.async_db, 'get_summary'),
+            Tweet.query_async(self.async_db, 'get_recent', limit=10),
+            self._get_tweet_volume_data(days=7)
+        )
+        
+        # آمار کلی (از شمارنده‌های تجمیعی)
+        stats = {
+            'total_tweets': summary['total_tweets'],
+            'active_keywords': summary['active_keywords'],
+            'recent_tweets': recent_tweets
+        }
+        return stats, chart_data
+    
+    @staticmethod
+    async def _iterate_in_thread(iterator, executor):
+        """پیمایش کامل یک generator همزمان در ترد تک‌کاره executor"""
+        loop = asyncio.get_running_loop()
+        done = object()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, next, iterator, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            # بستن generator در همان ترد تا تراکنش خواندن آن (حتی با قطع اتصال کلاینت) پایان یابد
+            executor.submit(iterator.close)
+            executor.shutdown(wait=False)
+    
+    async def _get_tweet_volume_data(self, days=7, granularity='day', dimension='all', value=''):
+        """دریافت داده‌های حجم توییت برای نمودار از جدول تجمیع"""
+        # محاسبه زمان شروع (بازه‌های تجمیع از created_at به UTC بدون منطقه زمانی ساخته می‌شوند)
+        end_date = datetime.now(timezone.utc).replace(tzinfo=None)
+        start_date = end_date - timedelta(days=days)
+        
+        results = await VolumeRollup.query_async(
+            self.async_db, 'get_series', start_date, end_date,
+            granularity=granularity, dimension=dimension, value=value
+        )
+        counts = {row["bucket"]: row["count"] for row in results}
+        
+        # ساخت داده‌های نمودار با تکمیل بازه‌های خالی
+        bucket_format = VolumeRollup.BUCKET_FORMATS[granularity]
+        if granularity == 'hour':
+            step = timedelta(hours=1)
+            current = start_date.replace(minute=0, second=0, microsecond=0)
+        else:
+            step = timedelta(days=1)
+            current = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        chart_data = []
+        while current <= end_date:
+            bucket = current.strftime(bucket_format)
+            chart_data.append({"date": bucket, "count": counts.get(bucket, 0)})
+            current += step
         
         return chart_data
\ No newline at end of file
@@ -2,22 +2,57 @@
 import sqlite3
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
 from datetime import datetime
+from core.payload_codec import PayloadCodec, decode_payload
+from core.partitions import PartitionManager
 
 class Database:
-    """کلاس مدیریت دیتابیس SQLite"""
+    """کلاس مدیریت دیتابیس SQLite (یک اتصال نویسنده و اتصال‌های خواننده WAL به ازای هر thread)"""
     
-    def __init__(self, db_path):
+    # دستوراتی که روی اتصال‌های فقط‌خواندنی اجرا می‌شوند
+    READ_STATEMENTS = ('SELECT', 'WITH', 'EXPLAIN')
+    
+    def __init__(self, db_path, busy_timeout=30):
         # اطمینان از وجود دایرکتوری دیتابیس
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
         self.conn = None
-        self.cursor = None
+        
+        # قفل نویسنده: از اولین دستور نوشتن تا commit/rollback در اختیار یک thread است
+        self.write_lock = threading.Lock()
+        self.writer_owner = None
+        
+        # واحد کار (unit of work): عمق savepointهای تو در توی thread مالک نویسنده
+        self.tx_depth = 0
+        
+        # ثبت گروهی: commitهای مدل‌ها تا N نوشتن یا T میلی‌ثانیه به تعویق می‌افتند (۰ = غیرفعال)
+        self.group_commit_writes = 0
+        self.group_commit_delay = 0.05
+        self.pending_commits = 0
+        self.pending_since = None
+        self.flush_timer = None
+        self.unit_savepoint = False
+        
+        # قالب ذخیره بلاب‌های JSON بزرگ (tweet_data و profile_data)
+        self.payload_codec = PayloadCodec()
+        
+        # پارتیشن‌های ماهانه توییت‌های قدیمی (None = بدون پارتیشن‌بندی)
+        self.partitions = None
+        
+        # اتصال‌های خواننده به تفکیک thread
+        self.readers = {}
+        self.readers_lock = threading.Lock()
+        self.local = threading.local()
     
     def connect(self):
         """اتصال به دیتابیس"""
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
         
         # تنظیم برای مدیریت تاریخ و JSON
         self.conn.row_factory = sqlite3.Row
@@ -25,7 +60,8 @@ class Database:
         # ثبت تابع تبدیل برای JSON
         sqlite3.register_adapter(dict, json.dumps)
         sqlite3.register_adapter(list, json.dumps)
-        sqlite3.register_converter("JSON", json.loads)
+        # مقادیر ستون‌های JSON ممکن است متن قدیمی یا بلاب فشرده باشند
+        sqlite3.register_converter("JSON", decode_payload)
         
         # بهینه‌سازی SQLite
         self.execute_pragma("PRAGMA journal_mode = WAL")
@@ -33,29 +69,190 @@ class Database:
         self.execute_pragma("PRAGMA cache_size = -50000")
         self.execute_pragma("PRAGMA temp_store = MEMORY")
         
-        self.cursor = self.conn.cursor()
         return self.conn
     
     def execute_pragma(self, pragma_statement):
         """اجرای یک دستور PRAGMA"""
-        self.conn.execute(pragma_statement)
+        self._execute_write(lambda: self.conn.execute(pragma_statement))
+    
+    def _open_reader(self):
+        """ایجاد یک اتصال فقط‌خواندنی WAL"""
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        reader = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout, check_same_thread=False)
+        reader.row_factory = sqlite3.Row
+        reader.execute("PRAGMA query_only = ON")
+        reader.execute("PRAGMA cache_size = -10000")
+        reader.execute("PRAGMA temp_store = MEMORY")
+        return reader
+    
+    def get_reader(self):
+        """دریافت اتصال خواننده thread جاری (در صورت نیاز ایجاد می‌شود)"""
+        reader = getattr(self.local, 'reader', None)
+        if reader is not None:
+            return reader
+        
+        reader = self._open_reader()
+        self.local.reader = reader
+        
+        with self.readers_lock:
+            # بستن اتصال threadهای پایان‌یافته
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident in [ident for ident in self.readers if ident not in alive]:
+                self.readers.pop(ident).close()
+            self.readers[threading.get_ident()] = reader
+        return reader
+    
+    def configure_group_commit(self, max_writes=0, max_delay_ms=50):
+        """فعال‌سازی ثبت گروهی (max_writes کمتر از ۲ یعنی commit فوری)"""
+        self.group_commit_writes = max_writes if max_writes > 1 else 0
+        self.group_commit_delay = max_delay_ms / 1000
+    
+    def configure_payload_codec(self, algorithm='zlib', level=6, use_dictionary=True):
+        """تنظیم قالب فشرده‌سازی بلاب‌های JSON ('none' یعنی متن JSON بدون فشرده‌سازی)"""
+        self.payload_codec = PayloadCodec(algorithm, level, use_dictionary)
+    
+    def configure_partitions(self, directory='data/partitions'):
+        """فعال‌سازی پارتیشن‌های ماهانه برای انتقال و کوئری توییت‌های قدیمی"""
+        self.partitions = PartitionManager(self, directory)
+    
+    def _acquire_writer(self):
+        """گرفتن قفل نویسنده برای thread جاری؛ در صورت گرفتن قفل جدید True برمی‌گرداند"""
+        if self.writer_owner == threading.get_ident():
+            return False
+        self.write_lock.acquire()
+        self.writer_owner = threading.get_ident()
+        
+        if self.pending_commits:
+            # تراکنش گروهی باز است؛ نوشتن‌های این thread در savepoint جدا تا rollback فقط آن‌ها را برگرداند
+            self.conn.execute("SAVEPOINT group_unit")
+            self.unit_savepoint = True
+        return True
+    
+    def _release_writer(self):
+        """آزاد کردن قفل نویسنده در صورت مالکیت thread جاری"""
+        if self.writer_owner == threading.get_ident():
+            self.writer_owner = None
+            self.write_lock.release()
+    
+    def owns_writer(self):
+        """آیا thread جاری تراکنش نوشتن باز دارد"""
+        return self.writer_owner == threading.get_ident()
+    
+    def is_read_query(self, query):
+        """تشخیص کوئری‌های فقط‌خواندنی"""
+        statement = query.lstrip().split(None, 1)
+        return bool(statement) and statement[0].upper() in self.READ_STATEMENTS
     
     def close(self):
         """بستن اتصال دیتابیس"""
+        if self.conn:
+            self.flush()
+        with self.readers_lock:
+            for reader in self.readers.values():
+                reader.close()
+            self.readers = {}
         if self.conn:
             self.conn.close()
     
     def execute(self, query, params=None):
-        """اجرای یک کوئری"""
+        """اجرای یک کوئری (خواندن روی اتصال خواننده، نوشتن روی اتصال نویسنده)"""
         if params is None:
             params = {}
-        self.cursor.execute(query, params)
-        return self.cursor
+        
+        # رها کردن cursor قبلی تا دستور نیمه‌تمام آن snapshot خواننده را نگه ندارد
+        self.local.cursor = None
+        
+        # خواندن داخل تراکنش باز همین thread باید تغییرات ثبت نشده را ببیند
+        if self.is_read_query(query) and not self.owns_writer():
+            cursor = self.get_reader().execute(query, params)
+        else:
+            cursor = self._execute_write(lambda: self.conn.execute(query, params))
+        
+        self.local.cursor = cursor
+        return cursor
+    
+    def read(self, query, params=None):
+        """اجرای یک کوئری خواندن و دریافت همه ردیف‌ها"""
+        return self.execute(query, params).fetchall()
     
     def execute_many(self, query, params_list):
         """اجرای یک کوئری با چندین مجموعه پارامتر"""
-        self.cursor.executemany(query, params_list)
-        return self.cursor
+        cursor = self._execute_write(lambda: self.conn.executemany(query, params_list))
+        self.local.cursor = cursor
+        return cursor
+    
+    def _execute_write(self, operation):
+        """اجرای یک دستور نوشتن با گرفتن قفل نویسنده تا پایان تراکنش"""
+        acquired = self._acquire_writer()
+        changes_before = self.conn.total_changes
+        try:
+            result = operation()
+        except Exception:
+            # دستوری که تراکنش را شروع کرده و شکست خورده، قفل را نگه نمی‌دارد
+            if acquired:
+                self.rollback()
+            raise
+        
+        if acquired and not self.conn.in_transaction:
+            # دستور بدون تراکنش (مثلاً PRAGMA یا DDL) بلافاصله قفل را آزاد می‌کند
+            self._release_writer()
+        elif acquired and self.unit_savepoint and self.conn.total_changes == changes_before:
+            # دستور بدون تغییر داخل تراکنش گروهی باز
+            self._end_group_unit()
+            self._release_writer()
+        return result
+    
+    @contextmanager
+    def transaction(self):
+        """واحد کار: همه نوشتن‌ها (و commitهای مدل‌ها) داخل بلوک با یک commit ثبت می‌شوند"""
+        # بلوک‌های تو در تو به صورت savepoint اجرا می‌شوند و خطا فقط همان سطح را برمی‌گرداند
+        acquired = self._acquire_writer()
+        self.tx_depth += 1
+        savepoint = f"uow_{self.tx_depth}"
+        succeeded = False
+        try:
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+            yield self
+            succeeded = True
+        finally:
+            try:
+                if not succeeded:
+                    self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+            finally:
+                self.tx_depth -= 1
+                if acquired:
+                    if succeeded:
+                        self._commit_now()
+                    else:
+                        self.rollback()
+    
+    @contextmanager
+    def read_snapshot(self):
+        """snapshot ثابت برای چند کوئری خواندن thread جاری (تراکنش خواندن روی اتصال خواننده WAL)"""
+        reader = self.get_reader()
+        if self.owns_writer() or reader.in_transaction:
+            # خواندن‌ها روی اتصال نویسنده یا داخل snapshot بیرونی انجام می‌شوند
+            yield self
+            return
+        
+        reader.execute("BEGIN")
+        try:
+            # شروع snapshot در همین لحظه (تراکنش deferred با اولین خواندن شروع می‌شود)
+            reader.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            yield self
+        finally:
+            self.local.cursor = None
+            reader.execute("COMMIT")
+    
+    def in_transaction(self):
+        """آیا thread جاری داخل یک واحد کار است"""
+        return self.owns_writer() and self.tx_depth > 0
+    
+    @property
+    def cursor(self):
+        """آخرین cursor اجرا شده در thread جاری"""
+        return getattr(self.local, 'cursor', None)
     
     def fetch_one(self):
         """دریافت یک ردیف نتیجه"""
@@ -66,17 +263,93 @@ class Database:
         return self.cursor.fetchall()
     
     def commit(self):
-        """ثبت تغییرات"""
-        self.conn.commit()
+        """ثبت تغییرات (داخل واحد کار به پایان بلوک بیرونی موکول می‌شود)"""
+        if not self.owns_writer() or self.tx_depth:
+            return
+        
+        if not self.group_commit_writes:
+            self._commit_now()
+            return
+        
+        try:
+            self._end_group_unit()
+            self.pending_commits += 1
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            
+            if (self.pending_commits >= self.group_commit_writes or
+                    time.monotonic() - self.pending_since >= self.group_commit_delay):
+                self._flush_pending()
+            elif self.flush_timer is None:
+                # ثبت نوشتن‌های معوق حداکثر پس از تأخیر تعیین شده
+                self.flush_timer = threading.Timer(self.group_commit_delay, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+        finally:
+            self._release_writer()
     
     def rollback(self):
-        """برگرداندن تغییرات"""
-        self.conn.rollback()
+        """برگرداندن تغییرات (داخل واحد کار فقط تا savepoint همان سطح)"""
+        if not self.owns_writer():
+            return
+        
+        if self.tx_depth:
+            self.conn.execute(f"ROLLBACK TO uow_{self.tx_depth}")
+            return
+        
+        try:
+            if self.unit_savepoint:
+                # نوشتن‌های ثبت شده گروهی سایر واحدها حفظ می‌شوند
+                self.conn.execute("ROLLBACK TO group_unit")
+                self._end_group_unit()
+            else:
+                self.conn.rollback()
+        finally:
+            self._release_writer()
+    
+    def flush(self):
+        """ثبت فوری commitهای گروهی معوق"""
+        acquired = self._acquire_writer()
+        try:
+            if acquired and self.pending_commits:
+                self._end_group_unit()
+                self._flush_pending()
+        finally:
+            if acquired:
+                self._release_writer()
+    
+    def _commit_now(self):
+        """ثبت فوری تراکنش thread جاری همراه با commitهای گروهی معوق"""
+        try:
+            self._end_group_unit()
+            self._flush_pending()
+        finally:
+            self._release_writer()
+    
+    def _end_group_unit(self):
+        """پایان savepoint نوشتن‌های thread جاری در تراکنش گروهی"""
+        if self.unit_savepoint:
+            self.conn.execute("RELEASE group_unit")
+            self.unit_savepoint = False
+    
+    def _flush_pending(self):
+        """commit تراکنش نویسنده و پاک کردن وضعیت ثبت گروهی"""
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        self.pending_commits = 0
+        self.pending_since = None
+        self.conn.commit()
     
     def execute_script(self, script):
         """اجرای یک اسکریپت SQL"""
-        self.conn.executescript(script)
-        self.commit()
+        self._acquire_writer()
+        try:
+            self._end_group_unit()
+            self.conn.executescript(script)
+            self._flush_pending()
+        finally:
+            self._release_writer()
     
     def table_exists(self, table_name):
         """بررسی وجود یک جدول"""
@@ -84,4 +357,4 @@ class Database:
             "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
             (table_name,)
         )
-        return self.fetch_one() is not None
\ No newline at end of file
+        return self.fetch_one() is not None
@@ -0,0 +1,231 @@
+# models/entity.py
+import re
+from models.base import BaseModel
+
+class TweetEntity(BaseModel):
+    """مدل موجودیت توییت (هشتگ، منشن، لینک و کش‌تگ)"""
+    
+    TABLE_NAME = 'tweet_entities'
+    
+    TYPES = ('hashtag', 'mention', 'url', 'cashtag')
+    
+    # کلید فهرست هر نوع در entities پاسخ API
+    API_KEYS = {'hashtag': 'hashtags', 'mention': 'user_mentions', 'url': 'urls', 'cashtag': 'symbols'}
+    
+    # الگوهای استخراج از متن وقتی پاسخ API فهرست آن نوع را ندارد
+    # (هشتگ فارسی ممکن است نیم‌فاصله داشته باشد و نباید فقط عدد باشد)
+    PATTERNS = {
+        'hashtag': re.compile(r'(?<![\w&#＃])[#＃]([\w\u200c]*[^\W\d][\w\u200c]*)'),
+        'mention': re.compile(r'(?<![\w@＠])[@＠]([A-Za-z0-9_]{1,15})(?![\w@])'),
+        'url': re.compile(r'https?://[^\s<>"\'«»]+'),
+        'cashtag': re.compile(r'(?<![\w$])\$([A-Za-z]{1,6}(?:[._][A-Za-z]{1,2})?)(?!\w)')
+    }
+    _url_trailing = '.,;:!?)]}\'"،؛؟'
+    
+    def __init__(self, db, id=None, tweet_id=None, entity_type=None, text=None,
+                 mentioned_user_id=None, start_index=None, end_index=None):
+        super().__init__(db)
+        self.id = id
+        self.tweet_id = tweet_id
+        self.entity_type = entity_type
+        self.text = text
+        self.mentioned_user_id = mentioned_user_id
+        self.start_index = start_index
+        self.end_index = end_index
+    
+    @classmethod
+    def normalize(cls, entity_type, text):
+        """شکل یکسان متن موجودیت برای جستجوی نمایه‌ای (بدون # و @ و بدون حساسیت به حروف)"""
+        text = (text or '').strip().lstrip('#＃@＠$').strip('\u200c')
+        if entity_type == 'cashtag':
+            return text.upper()
+        if entity_type == 'url':
+            return text
+        return text.casefold()
+    
+    @classmethod
+    def extract(cls, tweet_data=None, content=None):
+        """استخراج موجودیت‌ها از entities پاسخ API و در نبود آن از متن توییت (هر متن یک بار در هر توییت)"""
+        tweet_data = tweet_data if isinstance(tweet_data, dict) else {}
+        content = content if content is not None else tweet_data.get('text') or ''
+        api_entities = tweet_data.get('entities') if isinstance(tweet_data.get('entities'), dict) else {}
+        
+        entities = {}
+        for entity_type in cls.TYPES:
+            items = api_entities.get(cls.API_KEYS[entity_type])
+            if isinstance(items, list):
+                extracted = cls._from_api(entity_type, items)
+            else:
+                extracted = cls._from_text(entity_type, content)
+            for entity in extracted:
+                if entity['text']:
+                    entities.setdefault((entity_type, entity['text']), entity)
+        return list(entities.values())
+    
+    @classmethod
+    def _from_api(cls, entity_type, items):
+        """تبدیل فهرست یک نوع موجودیت در پاسخ API"""
+        entities = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if entity_type == 'mention':
+                text = item.get('screen_name')
+            elif entity_type == 'url':
+                text = item.get('expanded_url') or item.get('url')
+            else:
+                text = item.get('text')
+            indices = item.get('indices') or [None, None]
+            entities.append({
+                'entity_type': entity_type,
+                'text': cls.normalize(entity_type, text),
+                'start_index': indices[0],
+                'end_index': indices[1] if len(indices) > 1 else None,
+                'twitter_user_id': item.get('id_str') if entity_type == 'mention' else None,
+                'username': text if entity_type == 'mention' else None
+            })
+        return entities
+    
+    @classmethod
+    def _from_text(cls, entity_type, content):
+        """استخراج یک نوع موجودیت از متن با الگوی از پیش کامپایل شده"""
+        entities = []
+        for match in cls.PATTERNS[entity_type].finditer(content):
+            if entity_type == 'url':
+                text = match.group(0).rstrip(cls._url_trailing)
+                end = match.start() + len(text)
+            else:
+                text = match.group(1)
+                end = match.end()
+            entities.append({
+                'entity_type': entity_type,
+                'text': cls.normalize(entity_type, text),
+                'start_index': match.start(),
+                'end_index': end,
+                'twitter_user_id': None,
+                'username': text if entity_type == 'mention' else None
+            })
+        return entities
+    
+    @classmethod
+    def bulk_replace(cls, db, entities_by_tweet, chunk_size=500):
+        """جایگزینی موجودیت‌های چند توییت (در تراکنش فراخواننده)؛ منشن‌ها به کاربران ذخیره شده وصل می‌شوند"""
+        if not entities_by_tweet:
+            return 0
+        
+        user_ids = cls._resolve_mentions(db, [
+            entity for entities in entities_by_tweet.values() for entity in entities
+            if entity['entity_type'] == 'mention'
+        ], chunk_size)
+        
+        tweet_ids = list(entities_by_tweet)
+        for i in range(0, len(tweet_ids), chunk_size):
+            chunk = tweet_ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            db.execute(f"DELETE FROM {cls.TABLE_NAME} WHERE tweet_id IN ({placeholders})", chunk)
+        
+        rows = [
+            {
+                'tweet_id': tweet_id,
+                'entity_type': entity['entity_type'],
+                'text': entity['text'],
+                'mentioned_user_id': (
+                    user_ids.get(('id', entity['twitter_user_id'])) or user_ids.get(('username', entity['username']))
+                    if entity['entity_type'] == 'mention' else None
+                ),
+                'start_index': entity['start_index'],
+                'end_index': entity['end_index']
+            }
+            for tweet_id, entities in entities_by_tweet.items()
+            for entity in entities
+        ]
+        if rows:
+            db.execute_many(f"""
+                INSERT INTO {cls.TABLE_NAME}
+                (tweet_id, entity_type, text, mentioned_user_id, start_index, end_index)
+                VALUES
+                (:tweet_id, :entity_type, :text, :mentioned_user_id, :start_index, :end_index)
+            """, rows)
+        return len(rows)
+    
+    @staticmethod
+    def _resolve_mentions(db, mentions, chunk_size=500):
+        """نگاشت ID توییتر یا نام کاربری منشن‌ها به ID کاربران ذخیره شده (روی نمایه‌های twitter_id و username)"""
+        user_ids = {}
+        lookups = (
+            ('id', 'twitter_id', sorted({m['twitter_user_id'] for m in mentions if m['twitter_user_id']})),
+            ('username', 'username', sorted({m['username'] for m in mentions if m['username']}))
+        )
+        for kind, column, values in lookups:
+            for i in range(0, len(values), chunk_size):
+                chunk = values[i:i + chunk_size]
+                placeholders = ', '.join('?' for _ in chunk)
+                query = f"SELECT id, {column} AS value FROM twitter_users WHERE {column} IN ({placeholders})"
+                for row in db.execute(query, chunk).fetchall():
+                    user_ids[(kind, row['value'])] = row['id']
+        return user_ids
+    
+    @classmethod
+    def get_by_tweet_id(cls, db, tweet_id):
+        """دریافت موجودیت‌های یک توییت"""
+        query = f"SELECT * FROM {cls.TABLE_NAME} WHERE tweet_id = :tweet_id ORDER BY start_index, id"
+        results = db.execute(query, {'tweet_id': tweet_id}).fetchall()
+        return [cls.from_dict(dict(row), db) for row in results]
+    
+    @classmethod
+    def get_tweet_ids(cls, db, entity_type, text, limit=100):
+        """ID جدیدترین توییت‌های دارای یک موجودیت (جستجو روی نمایه (entity_type, text))"""
+        query = f"""
+            SELECT tweet_id FROM {cls.TABLE_NAME}
+            WHERE entity_type = :entity_type AND text = :text
+            ORDER BY tweet_id DESC
+            LIMIT :limit
+        """
+        params = {'entity_type': entity_type, 'text': cls.normalize(entity_type, text), 'limit': limit}
+        return [row['tweet_id'] for row in db.execute(query, params).fetchall()]
+    
+    @classmethod
+    def get_top(cls, db, entity_type, since=None, limit=20):
+        """پرتکرارترین موجودیت‌های یک نوع (تعداد توییت‌ها) از زمان since"""
+        conditions = ["e.entity_type = :entity_type"]
+        params = {'entity_type': entity_type, 'limit': limit}
+        source = f"{cls.TABLE_NAME} AS e"
+        if since:
+            source += " JOIN tweets AS t ON t.id = e.tweet_id"
+            conditions.append("t.created_at >= :since")
+            params['since'] = since.isoformat() if hasattr(since, 'isoformat') else since
+        query = f"""
+            SELECT e.text AS text, COUNT(DISTINCT e.tweet_id) AS count
+            FROM {source}
+            WHERE {' AND '.join(conditions)}
+            GROUP BY e.text
+            ORDER BY count DESC, e.text
+            LIMIT :limit
+        """
+        return [dict(row) for row in db.execute(query, params).fetchall()]
+    
+    @classmethod
+    def from_dict(cls, data, db):
+        """ایجاد مدل از دیکشنری"""
+        return cls(
+            db=db,
+            id=data.get('id'),
+            tweet_id=data.get('tweet_id'),
+            entity_type=data.get('entity_type'),
+            text=data.get('text'),
+            mentioned_user_id=data.get('mentioned_user_id'),
+            start_index=data.get('start_index'),
+            end_index=data.get('end_index')
+        )
+    
+    def to_dict(self):
+        """تبدیل مدل به دیکشنری"""
+        return {
+            'id': self.id,
+            'tweet_id': self.tweet_id,
+            'entity_type': self.entity_type,
+            'text': self.text,
+            'mentioned_user_id': self.mentioned_user_id,
+            'start_index': self.start_index,
+            'end_index': self.end_index
+        }
@@ -1,4 +1,8 @@
 # core/event_manager.py
+import asyncio
+import inspect
+import time
+
 class EventManager:
     """مدیریت رویدادهای سیستم"""
     
@@ -6,28 +10,268 @@ class EventManager:
         self.logger = logger
         self.subscribers = {}
         
-    def subscribe(self, event_type, callback):
-        """اشتراک در یک رویداد"""
+        # رویدادهای ناهمگام: صف محدود و تسک‌های مصرف‌کننده برای هر نوع رویداد
+        self.async_events = {}
+        self.queues = {}
+        self.consumer_tasks = {}
+        # event loop مالک صف هر رویداد (loop اولین انتشار)؛ انتشار از loopهای دیگر به آن سپرده می‌شود
+        self.queue_loops = {}
+        self.metrics = {}
+        self.dropped = {}
+        
+        # مشترکین دسته‌ای: بافر رویدادها تا رسیدن به اندازه دسته یا پایان زمان انتظار
+        self.batches = {}
+        
+    def subscribe(self, event_type, callback, batch_size=None, linger=0.5):
+        """اشتراک در یک رویداد (با batch_size، callback لیستی از داده‌های رویداد را دریافت می‌کند)"""
         if event_type not in self.subscribers:
             self.subscribers[event_type] = []
         self.subscribers[event_type].append(callback)
+        
+        if batch_size:
+            # دسته با رسیدن به batch_size یا گذشت linger ثانیه از اولین رویداد ارسال می‌شود
+            self.batches[(event_type, callback)] = {
+                'batch_size': max(1, batch_size),
+                'linger': linger,
+                'items': [],
+                'timer': None
+            }
         self.logger.debug(f"Subscribed to event: {event_type}")
         
     def unsubscribe(self, event_type, callback):
         """لغو اشتراک از یک رویداد"""
         if event_type in self.subscribers and callback in self.subscribers[event_type]:
             self.subscribers[event_type].remove(callback)
+            self._flush_batch(event_type, callback)
+            self.batches.pop((event_type, callback), None)
             self.logger.debug(f"Unsubscribed from event: {event_type}")
+    
+    def configure_async(self, event_type, queue_size=1000, consumers=1):
+        """فعال‌سازی ارسال ناهمگام (صف‌دار) برای یک نوع رویداد"""
+        self.async_events[event_type] = {
+            'queue_size': queue_size,
+            'consumers': max(1, consumers)
+        }
+        self.logger.debug(f"Async dispatch enabled for event: {event_type} "
+                          f"(queue={queue_size}, consumers={consumers})")
             
     def emit(self, event_type, **data):
-        """انتشار یک رویداد"""
+        """انتشار یک رویداد (رویداد صف‌دار در صورت پر بودن صف دور ریخته و شمرده می‌شود؛ کد ناهمگام از emit_async استفاده کند)"""
         self.logger.debug(f"Emitting event: {event_type}")
-        if event_type in self.subscribers:
-            for callback in self.subscribers[event_type]:
-                try:
-                    callback(data)
-                except Exception as e:
-                    self.logger.error(f"Error in event handler for {event_type}: {str(e)}")
+        if event_type in self.async_events:
+            queue = self._get_queue(event_type)
+            if queue is not None:
+                owner = self.queue_loops[event_type]
+                if owner is asyncio.get_running_loop():
+                    self._enqueue(event_type, queue, data)
+                else:
+                    owner.call_soon_threadsafe(self._enqueue, event_type, queue, data)
+                return
+        self._dispatch(event_type, data)
+    
+    async def emit_async(self, event_type, **data):
+        """انتشار رویداد از کد ناهمگام؛ در صورت پر بودن صف تا آزاد شدن جا منتظر می‌ماند"""
+        if event_type not in self.async_events:
+            self.emit(event_type, **data)
+            return
+        
+        self.logger.debug(f"Emitting event: {event_type}")
+        queue = self._get_queue(event_type)
+        owner = self.queue_loops[event_type]
+        item = (time.monotonic(), data)
+        if owner is asyncio.get_running_loop():
+            await queue.put(item)
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(queue.put(item), owner))
+    
+    def _enqueue(self, event_type, queue, data):
+        """افزودن رویداد به صف در loop مالک؛ با صف پر، رویداد به جای پردازش خارج از ترتیب دور ریخته می‌شود"""
+        try:
+            queue.put_nowait((time.monotonic(), data))
+        except asyncio.QueueFull:
+            self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+            self.logger.warning(f"Event queue full for {event_type}. Event dropped")
+    
+    def _get_queue(self, event_type):
+        """دریافت صف رویداد؛ صف و مصرف‌کننده‌ها یک بار روی loop اولین انتشار ساخته می‌شوند"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        
+        queue = self.queues.get(event_type)
+        owner = self.queue_loops.get(event_type)
+        if queue is not None and not owner.is_closed():
+            return queue
+        if queue is not None and queue.qsize():
+            self.logger.warning(
+                f"Event loop of the {event_type} queue is closed. {queue.qsize()} queued events were dropped"
+            )
+            self.dropped[event_type] = self.dropped.get(event_type, 0) + queue.qsize()
+        
+        settings = self.async_events[event_type]
+        queue = asyncio.Queue(maxsize=settings['queue_size'])
+        self.queues[event_type] = queue
+        self.queue_loops[event_type] = loop
+        self.consumer_tasks[event_type] = [
+            loop.create_task(self._consume(event_type, queue))
+            for _ in range(settings['consumers'])
+        ]
+        return queue
+    
+    async def _consume(self, event_type, queue):
+        """تسک مصرف‌کننده صف یک نوع رویداد"""
+        while True:
+            enqueued_at, data = await queue.get()
+            try:
+                self._record_metric(event_type, '__queue__', time.monotonic() - enqueued_at)
+                await self._dispatch_async(event_type, data)
+            except Exception as e:
+                self.logger.error(f"Error dispatching queued event {event_type}: {str(e)}")
+            finally:
+                queue.task_done()
+    
+    def _dispatch(self, event_type, data):
+        """فراخوانی همزمان همه مشترکین یک رویداد"""
+        for callback in list(self.subscribers.get(event_type, [])):
+            if (event_type, callback) in self.batches:
+                self._add_to_batch(event_type, callback, data)
+                continue
+            
+            started = time.monotonic()
+            try:
+                result = callback(data)
+                if inspect.isawaitable(result):
+                    self._schedule(result)
+            except Exception as e:
+                self._record_metric(event_type, callback, time.monotonic() - started, error=True)
+                self.logger.error(f"Error in event handler for {event_type}: {str(e)}")
+            else:
+                self._record_metric(event_type, callback, time.monotonic() - started)
+    
+    @staticmethod
+    def _schedule(awaitable):
+        """اجرای callback ناهمگام از مسیر همزمان"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # بدون event loop فعال، callback تا پایان اجرا می‌شود
+            return asyncio.run(awaitable)
+        return asyncio.ensure_future(awaitable)
+    
+    async def _dispatch_async(self, event_type, data):
+        """فراخوانی مشترکین در تسک مصرف‌کننده (پشتیبانی از callbackهای ناهمگام)"""
+        for callback in list(self.subscribers.get(event_type, [])):
+            if (event_type, callback) in self.batches:
+                self._add_to_batch(event_type, callback, data)
+                continue
+            
+            started = time.monotonic()
+            try:
+                result = callback(data)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self._record_metric(event_type, callback, time.monotonic() - started, error=True)
+                self.logger.error(f"Error in event handler for {event_type}: {str(e)}")
+            else:
+                self._record_metric(event_type, callback, time.monotonic() - started)
+    
+    def _add_to_batch(self, event_type, callback, data):
+        """افزودن رویداد به دسته یک مشترک و ارسال دسته در صورت تکمیل"""
+        batch = self.batches[(event_type, callback)]
+        batch['items'].append(data)
+        
+        if len(batch['items']) >= batch['batch_size']:
+            self._flush_batch(event_type, callback)
+            return
+        
+        if batch['timer'] is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # بدون event loop امکان انتظار نیست؛ دسته بلافاصله ارسال می‌شود
+                self._flush_batch(event_type, callback)
+                return
+            batch['timer'] = loop.call_later(
+                batch['linger'], self._flush_batch, event_type, callback
+            )
+    
+    def _flush_batch(self, event_type, callback):
+        """ارسال رویدادهای بافر شده یک مشترک دسته‌ای"""
+        batch = self.batches.get((event_type, callback))
+        if batch is None:
+            return
+        
+        if batch['timer'] is not None:
+            batch['timer'].cancel()
+            batch['timer'] = None
+        
+        items, batch['items'] = batch['items'], []
+        if not items:
+            return
+        
+        started = time.monotonic()
+        try:
+            result = callback(items)
+            if inspect.isawaitable(result):
+                self._schedule(result)
+        except Exception as e:
+            self._record_metric(event_type, callback, time.monotonic() - started, error=True)
+            self.logger.error(f"Error in batch event handler for {event_type}: {str(e)}")
+        else:
+            self._record_metric(event_type, callback, time.monotonic() - started)
+    
+    def flush_batches(self):
+        """ارسال فوری همه دسته‌های ناتمام"""
+        for event_type, callback in list(self.batches):
+            self._flush_batch(event_type, callback)
+    
+    def _record_metric(self, event_type, callback, latency, error=False):
+        """ثبت تأخیر و خطای هر مشترک"""
+        name = callback if isinstance(callback, str) else getattr(callback, '__qualname__', repr(callback))
+        metric = self.metrics.setdefault((event_type, name), {
+            'calls': 0, 'errors': 0, 'total_latency': 0.0, 'max_latency': 0.0
+        })
+        metric['calls'] += 1
+        metric['total_latency'] += latency
+        metric['max_latency'] = max(metric['max_latency'], latency)
+        if error:
+            metric['errors'] += 1
+    
+    def get_metrics(self):
+        """آمار تأخیر و خطای مشترکین به تفکیک رویداد"""
+        metrics = {}
+        for (event_type, name), metric in self.metrics.items():
+            metrics.setdefault(event_type, {})[name] = {
+                **metric,
+                'avg_latency': metric['total_latency'] / metric['calls'] if metric['calls'] else 0
+            }
+        for event_type, queue in self.queues.items():
+            metrics.setdefault(event_type, {})['__queue_size__'] = queue.qsize()
+        for event_type, dropped in self.dropped.items():
+            metrics.setdefault(event_type, {})['__dropped__'] = dropped
+        return metrics
+    
+    async def drain(self, event_type=None):
+        """انتظار تا پردازش کامل رویدادهای صف‌شده (در loop مالک صف‌ها)"""
+        event_types = [event_type] if event_type else list(self.queues)
+        for name in event_types:
+            queue = self.queues.get(name)
+            if queue is not None:
+                await queue.join()
+        self.flush_batches()
+    
+    def stop(self):
+        """توقف تسک‌های مصرف‌کننده صف‌ها و ارسال دسته‌های باقی‌مانده"""
+        self.flush_batches()
+        for tasks in self.consumer_tasks.values():
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        self.consumer_tasks = {}
+        self.queues = {}
+        self.queue_loops = {}
 
 # core/plugin_manager.py
 class PluginManager:
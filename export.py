@@ -0,0 +1,333 @@
+# models/export.py
+import csv
+import io
+import json
+from datetime import datetime
+from models.base import BaseModel
+from models.tweet import Tweet
+from models.keyword import Keyword
+from core.payload_codec import decode_payload
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+class TweetExport(BaseModel):
+    """خروجی حجیم جریانی توییت‌ها، کاربران و ارتباط کلمات کلیدی با حافظه ثابت (پیمایش keyset دسته‌ای)"""
+    
+    FORMATS = ('ndjson', 'csv', 'columnar', 'parquet')
+    MEDIA_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv; charset=utf-8',
+        'columnar': 'application/x-ndjson',
+        'parquet': 'application/vnd.apache.parquet'
+    }
+    EXTENSIONS = {'ndjson': 'ndjson', 'csv': 'csv', 'columnar': 'columnar.ndjson', 'parquet': 'parquet'}
+    
+    # منبع، ستون‌ها و کلید keyset هر جدول؛ شرط‌های فیلتر روی توییت با نام مستعار t نوشته می‌شوند
+    TABLES = {
+        'tweets': {
+            'table': 'tweets',
+            'source': 'tweets AS t',
+            'alias': 't',
+            'columns': Tweet.SUMMARY_COLUMNS,
+            'payload': 'tweet_data',
+            'keys': ('created_at', 'id'),
+            'partitioned': True
+        },
+        'tweet_keywords': {
+            'table': 'tweet_keywords',
+            'source': 'tweet_keywords AS tk JOIN tweets AS t ON t.id = tk.tweet_id',
+            'alias': 'tk',
+            'columns': ('tweet_id', 'keyword_id', 'relevance_score', 'created_at'),
+            'payload': None,
+            'keys': ('tweet_id', 'keyword_id'),
+            'partitioned': True
+        },
+        'twitter_users': {
+            'table': 'twitter_users',
+            'source': 'twitter_users AS u',
+            'alias': 'u',
+            'columns': (
+                'id', 'twitter_id', 'username', 'display_name', 'bio', 'followers_count',
+                'following_count', 'account_created_at', 'is_verified', 'importance_score',
+                'last_updated_at'
+            ),
+            'payload': 'profile_data',
+            'keys': ('id',),
+            'partitioned': False
+        }
+    }
+    
+    @classmethod
+    def export(cls, db, table, format='ndjson', keyword=None, start_at=None, end_at=None,
+               filter_result=None, include_payload=False, batch_size=1000):
+        """اعتبارسنجی پارامترها و برگرداندن generator قطعه‌های bytes خروجی"""
+        if format not in cls.FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        if format == 'parquet' and pyarrow is None:
+            raise ValueError("Parquet export requires the 'pyarrow' package")
+        
+        spec = cls._get_spec(table)
+        columns = list(spec['columns'])
+        if include_payload and spec['payload']:
+            columns.append(spec['payload'])
+        
+        conditions, params = cls._build_filters(db, spec, keyword, start_at, end_at, filter_result)
+        batches = cls.iter_batches(db, table, conditions, params, include_payload, batch_size)
+        
+        if format == 'ndjson':
+            return cls._write_ndjson(batches)
+        if format == 'csv':
+            return cls._write_csv(batches, columns)
+        if format == 'columnar':
+            return cls._write_columnar(batches, table, columns)
+        return cls._write_parquet(batches, cls._parquet_schema(db, spec, columns))
+    
+    @classmethod
+    def _get_spec(cls, table):
+        """مشخصات جدول قابل خروجی"""
+        if table not in cls.TABLES:
+            raise ValueError(f"Unknown export table: {table}")
+        return cls.TABLES[table]
+    
+    @classmethod
+    def _build_filters(cls, db, spec, keyword=None, start_at=None, end_at=None, filter_result=None):
+        """شرط‌های فیلتر کلمه کلیدی، بازه زمانی ایجاد توییت و نتیجه فیلتر"""
+        conditions = []
+        params = {}
+        
+        if keyword is not None:
+            params['keyword_id'] = cls.resolve_keyword(db, keyword)
+            if spec['table'] == 'tweet_keywords':
+                conditions.append("tk.keyword_id = :keyword_id")
+            else:
+                conditions.append(
+                    "EXISTS (SELECT 1 FROM tweet_keywords AS fk WHERE fk.tweet_id = t.id AND fk.keyword_id = :keyword_id)"
+                )
+        if start_at:
+            conditions.append("t.created_at >= :start_at")
+            params['start_at'] = cls._parse_datetime(start_at)
+        if end_at:
+            conditions.append("t.created_at < :end_at")
+            params['end_at'] = cls._parse_datetime(end_at)
+        if filter_result:
+            conditions.append("t.filter_result = :filter_result")
+            params['filter_result'] = filter_result
+        
+        # کاربران با شرط‌های توییت: فقط نویسندگان توییت‌های منطبق
+        if conditions and spec['table'] == 'twitter_users':
+            conditions = [f"EXISTS (SELECT 1 FROM tweets AS t WHERE t.user_id = u.id AND {' AND '.join(conditions)})"]
+        return conditions, params
+    
+    @classmethod
+    def resolve_keyword(cls, db, keyword):
+        """تبدیل ID یا متن کلمه کلیدی به ID"""
+        if isinstance(keyword, int) or str(keyword).isdigit():
+            return int(keyword)
+        found = Keyword.get_by_text(db, keyword)
+        if not found:
+            raise ValueError(f"Unknown keyword: {keyword}")
+        return found.id
+    
+    @staticmethod
+    def _parse_datetime(value):
+        """یکسان‌سازی تاریخ ورودی با قالب ذخیره created_at"""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f"Invalid date: {value}")
+    
+    @classmethod
+    def iter_batches(cls, db, table, conditions=(), params=None, include_payload=False, batch_size=1000):
+        """generator دسته‌های ردیف؛ ابتدا پارتیشن‌های قدیمی (به ترتیب ماه) و سپس جدول اصلی"""
+        spec = cls._get_spec(table)
+        params = params or {}
+        
+        # همه دسته‌ها از یک snapshot خوانده می‌شوند؛ generator باید به طور کامل در یک thread پیمایش شود
+        with db.read_snapshot():
+            if spec['partitioned'] and db.partitions is not None:
+                for partition in db.partitions.candidates(
+                    descending=False, before=params.get('end_at'), after=params.get('start_at')
+                ):
+                    yield from cls._walk(
+                        lambda query, query_params, key=partition['key']: db.partitions.read(key, query, query_params),
+                        db, spec, conditions, params, include_payload, batch_size
+                    )
+            
+            yield from cls._walk(
+                lambda query, query_params: db.execute(query, query_params).fetchall(),
+                db, spec, conditions, params, include_payload, batch_size
+            )
+    
+    @classmethod
+    def _walk(cls, fetch, db, spec, conditions, params, include_payload, batch_size):
+        """پیمایش keyset روی کلید جدول در یک منبع (فایل پارتیشن یا دیتابیس اصلی)"""
+        alias = spec['alias']
+        columns = [f"{alias}.{column}" for column in spec['columns']]
+        if include_payload and spec['payload']:
+            columns.append(f"{alias}.{spec['payload']}")
+        keys = [f"{alias}.{key}" for key in spec['keys']]
+        key_params = [f":last_{i}" for i in range(len(keys))]
+        
+        last = None
+        while True:
+            batch_conditions = list(conditions)
+            batch_params = {**params, 'limit': batch_size}
+            if last is not None:
+                batch_conditions.append(f"({', '.join(keys)}) > ({', '.join(key_params)})")
+                batch_params.update({f"last_{i}": value for i, value in enumerate(last)})
+            
+            query = f"""
+                SELECT {', '.join(columns)} FROM {spec['source']}
+                {'WHERE ' + ' AND '.join(batch_conditions) if batch_conditions else ''}
+                ORDER BY {', '.join(keys)}
+                LIMIT :limit
+            """
+            rows = [dict(row) for row in fetch(query, batch_params)]
+            if not rows:
+                return
+            last = [rows[-1][key] for key in spec['keys']]
+            
+            if include_payload and spec['payload']:
+                cls._decode_payloads(db, spec, rows)
+            yield rows
+            
+            if len(rows) < batch_size:
+                return
+    
+    @classmethod
+    def _decode_payloads(cls, db, spec, rows):
+        """باز کردن بلاب‌های JSON و جایگزینی ارجاع author با پروفایل (یک کوئری برای هر دسته)"""
+        column = spec['payload']
+        for row in rows:
+            row[column] = decode_payload(row[column])
+        if spec['table'] != 'tweets':
+            return
+        
+        user_ids = sorted({
+            row['user_id'] for row in rows
+            if isinstance(row[column], dict) and isinstance(row[column].get('author'), dict)
+            and row[column]['author'].get('$ref')
+        })
+        if not user_ids:
+            return
+        placeholders = ', '.join('?' for _ in user_ids)
+        profiles = {
+            profile['id']: decode_payload(profile['profile_data'])
+            for profile in db.execute(
+                f"SELECT id, profile_data FROM twitter_users WHERE id IN ({placeholders})", user_ids
+            ).fetchall()
+        }
+        for row in rows:
+            author = row[column].get('author') if isinstance(row[column], dict) else None
+            if isinstance(author, dict) and author.get('$ref'):
+                row[column]['author'] = profiles.get(row['user_id']) or {'id': author.get('id')}
+    
+    @staticmethod
+    def _write_ndjson(batches):
+        """یک شیء JSON در هر خط"""
+        for rows in batches:
+            yield ''.join(json.dumps(row, ensure_ascii=False, default=str) + '\n' for row in rows).encode('utf-8')
+    
+    @staticmethod
+    def _write_csv(batches, columns):
+        """CSV با سطر عنوان؛ مقادیر JSON به صورت رشته"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in batches:
+            for row in rows:
+                writer.writerow([
+                    json.dumps(row[column], ensure_ascii=False) if isinstance(row[column], (dict, list)) else row[column]
+                    for column in columns
+                ])
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        
+        # خروجی خالی: فقط سطر عنوان
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    
+    @staticmethod
+    def _write_columnar(batches, table, columns):
+        """قالب ستونی شبیه parquet بدون وابستگی: خط اول schema و هر خط بعدی یک row group از آرایه‌های ستون‌ها"""
+        yield (json.dumps({'table': table, 'columns': columns}) + '\n').encode('utf-8')
+        for rows in batches:
+            group = {
+                'rows': len(rows),
+                'data': {column: [row[column] for row in rows] for column in columns}
+            }
+            yield (json.dumps(group, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+    
+    @staticmethod
+    def _parquet_schema(db, spec, columns):
+        """schema پارکت از نوع ستون‌های جدول در SQLite"""
+        types = {
+            row['name']: (row['type'] or '').upper()
+            for row in db.execute(f"PRAGMA table_info({spec['table']})").fetchall()
+        }
+        fields = []
+        for column in columns:
+            declared = types.get(column, '')
+            if declared in ('INTEGER', 'BOOLEAN'):
+                field_type = pyarrow.int64()
+            elif declared == 'REAL':
+                field_type = pyarrow.float64()
+            else:
+                field_type = pyarrow.string()
+            fields.append(pyarrow.field(column, field_type))
+        return pyarrow.schema(fields)
+    
+    @staticmethod
+    def _write_parquet(batches, schema):
+        """فایل parquet که هر دسته یک row group آن است؛ بایت‌ها پس از هر row group ارسال می‌شوند"""
+        sink = _ChunkSink()
+        writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), schema)
+        try:
+            for rows in batches:
+                for row in rows:
+                    for field in schema:
+                        if isinstance(row[field.name], (dict, list)):
+                            row[field.name] = json.dumps(row[field.name], ensure_ascii=False)
+                writer.write_table(pyarrow.Table.from_pylist(rows, schema=schema))
+                if sink.chunks:
+                    yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+class _ChunkSink:
+    """مقصد نوشتن parquet که بایت‌های نوشته شده را تا ارسال بعدی نگه می‌دارد (موقعیت فایل حفظ می‌شود)"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def writable(self):
+        return True
+    
+    def drain(self):
+        """برگرداندن و پاک کردن بایت‌های بافر شده"""
+        data, self.chunks = b''.join(self.chunks), []
+        return data
@@ -0,0 +1,48 @@
+# export_tweets.py
+import argparse
+import sys
+from core.config import Config
+from core.db import Database
+from models.export import TweetExport
+
+def main():
+    """خروجی گرفتن از توییت‌ها، کاربران یا ارتباط کلمات کلیدی در خط فرمان"""
+    parser = argparse.ArgumentParser(description="Stream tweets, users or tweet/keyword links to a file")
+    parser.add_argument('table', choices=tuple(TweetExport.TABLES))
+    parser.add_argument('-f', '--format', choices=TweetExport.FORMATS, default='ndjson')
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('--keyword', help="keyword id or text")
+    parser.add_argument('--start', help="created_at lower bound (ISO date, inclusive)")
+    parser.add_argument('--end', help="created_at upper bound (ISO date, exclusive)")
+    parser.add_argument('--filter-result', help="filter result, e.g. accepted")
+    parser.add_argument('--include-payload', action='store_true', help="include raw tweet_data/profile_data")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    
+    config = Config()
+    db = Database(config.get('DEFAULT', 'DB_PATH', 'data/twitter_monitor.db'))
+    db.connect()
+    db.configure_partitions(config.get('RETENTION', 'PARTITION_DIR', 'data/partitions'))
+    
+    try:
+        try:
+            chunks = TweetExport.export(
+                db, args.table, args.format, keyword=args.keyword, start_at=args.start,
+                end_at=args.end, filter_result=args.filter_result,
+                include_payload=args.include_payload, batch_size=max(1, args.batch_size)
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# migrations/extract_entities.py
+from datetime import datetime
+from core.payload_codec import decode_payload
+from models.entity import TweetEntity
+
+BACKFILL_NAME = 'tweet_entities'
+
+def extract_entities(db, batch_size=500, restart=False, logger=None):
+    """استخراج دسته‌ای موجودیت‌های توییت‌های ذخیره شده؛ پس از هر دسته پیشرفت ثبت می‌شود و اجرای بعدی از همان‌جا ادامه می‌دهد"""
+    last_id = 0 if restart else _get_progress(db)
+    processed = 0
+    extracted = 0
+    
+    while True:
+        rows = db.execute("""
+            SELECT id, content, tweet_data FROM tweets
+            WHERE id > :last_id
+            ORDER BY id LIMIT :limit
+        """, {'last_id': last_id, 'limit': batch_size}).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        
+        entities = {}
+        for row in rows:
+            try:
+                tweet_data = decode_payload(row['tweet_data'])
+            except ValueError:
+                tweet_data = None
+            entities[row['id']] = TweetEntity.extract(tweet_data, row['content'])
+        
+        # موجودیت‌ها و پیشرفت در یک تراکنش؛ توقف در میانه باعث از دست رفتن یا تکرار دسته نمی‌شود
+        with db.transaction():
+            extracted += TweetEntity.bulk_replace(db, entities)
+            _set_progress(db, last_id)
+        processed += len(rows)
+        
+        if logger:
+            logger.info(f"Entity backfill: up to tweet {last_id} ({processed} tweets, {extracted} entities)")
+    
+    if logger:
+        logger.info(f"Entity backfill finished: {processed} tweets, {extracted} entities")
+    return {'tweets': processed, 'entities': extracted, 'last_id': last_id}
+
+def _get_progress(db):
+    """آخرین ID توییت پردازش شده در اجرای قبلی"""
+    row = db.execute(
+        "SELECT last_id FROM backfill_progress WHERE name = :name", {'name': BACKFILL_NAME}
+    ).fetchone()
+    return row['last_id'] if row else 0
+
+def _set_progress(db, last_id):
+    """ثبت آخرین ID توییت پردازش شده"""
+    db.execute("""
+        INSERT INTO backfill_progress (name, last_id, updated_at) VALUES (:name, :last_id, :updated_at)
+        ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at
+    """, {'name': BACKFILL_NAME, 'last_id': last_id, 'updated_at': datetime.now().isoformat()})
+
+if __name__ == "__main__":
+    import sys
+    from core.config import Config
+    from core.db import Database
+    
+    config = Config()
+    db = Database(config.get('DEFAULT', 'DB_PATH', 'data/twitter_monitor.db'))
+    db.connect()
+    print(extract_entities(db, restart='--restart' in sys.argv))
+    db.close()
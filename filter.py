@@ -1,34 +1,59 @@
 # plugins/filter/filter.py
 from plugins.base_plugin import BasePlugin
-from plugins.filter.rules import FilterRules
+import asyncio
+import math
+from concurrent.futures import ProcessPoolExecutor
+from plugins.filter.rules import FilterRules, classify_rows
 from models.tweet import Tweet
 
 class FilterPlugin(BasePlugin):
     """پلاگین فیلتر توییت‌ها"""
     
+    # وضعیت پردازش و دلیل رد برای هر دسته قواعد
+    REJECTION_STATUSES = {
+        'spam': ('filtered_spam', 'Spam'),
+        'offensive': ('filtered_offensive', 'Offensive language'),
+        'propaganda': ('filtered_propaganda', 'Propaganda'),
+        'low_quality': ('filtered_low_quality', 'Low quality'),
+    }
+    
     def __init__(self, app):
         super().__init__(app)
+        self.rule_engine = FilterRules.engine()
+        self.batch_size = 1000
+        self.workers = 0
+        self.executor = None
         
     def initialize(self):
         """راه‌اندازی پلاگین"""
         self.logger.info("Initializing Tweet Filter Plugin")
         
-        # اشتراک در رویدادها
-        self.event_manager.subscribe('new_tweet', self._on_new_tweet)
+        self.batch_size = self.config.getint('FILTER', 'BATCH_SIZE', 1000)
+        self.workers = self.config.getint('FILTER', 'WORKERS', 0)
+        event_batch_size = self.config.getint('FILTER', 'EVENT_BATCH_SIZE', 100)
+        event_linger_ms = self.config.getint('FILTER', 'EVENT_LINGER_MS', 500)
+        
+        # اشتراک در رویدادها (توییت‌های جدید به صورت دسته‌ای دریافت می‌شوند)
+        self.event_manager.subscribe('new_tweet', self._on_new_tweets,
+                                     batch_size=event_batch_size, linger=event_linger_ms / 1000)
         self.event_manager.subscribe('filter_tweet', self._on_filter_tweet)
+        self.event_manager.subscribe('filter_batch', self._on_filter_batch)
         
         self.logger.info("Tweet Filter Plugin initialized")
     
     def shutdown(self):
         """توقف پلاگین"""
         self.logger.info("Shutting down Tweet Filter Plugin")
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
     
-    def _on_new_tweet(self, data):
-        """رویداد توییت جدید"""
-        tweet_id = data.get('tweet_id')
-        if tweet_id:
-            self.logger.debug(f"Filter received new_tweet event for tweet {tweet_id}")
-            self.filter_tweet(tweet_id)
+    def _on_new_tweets(self, events):
+        """دسته رویدادهای توییت جدید"""
+        tweet_ids = [data['tweet_id'] for data in events if data.get('tweet_id')]
+        if tweet_ids:
+            self.logger.debug(f"Filter received {len(tweet_ids)} new_tweet events")
+            return self._run_batch(tweet_ids)
     
     def _on_filter_tweet(self, data):
         """رویداد درخواست فیلتر توییت"""
@@ -37,6 +62,12 @@ class FilterPlugin(BasePlugin):
             self.logger.debug(f"Filter received filter_tweet event for tweet {tweet_id}")
             self.filter_tweet(tweet_id)
     
+    def _on_filter_batch(self, data):
+        """رویداد درخواست فیلتر دسته‌ای"""
+        tweet_ids = data.get('tweet_ids')
+        self.logger.debug(f"Filter received filter_batch event ({len(tweet_ids) if tweet_ids else 'all'} tweets)")
+        return self._run_batch(tweet_ids)
+    
     def filter_tweet(self, tweet_id):
         """فیلتر یک توییت با ID"""
         tweet = Tweet.get_by_id(self.db, tweet_id)
@@ -51,46 +82,18 @@ class FilterPlugin(BasePlugin):
         try:
             self.logger.debug(f"Filtering tweet {tweet_id}")
             
-            # اعمال قواعد فیلتر
-            content = tweet.content
-            
-            # بررسی اسپم
-            if FilterRules.contains_spam_patterns(content):
-                self.logger.debug(f"Tweet {tweet_id} rejected: Spam")
-                tweet.update_processing_status('filtered_spam')
-                tweet.filter_result = 'rejected'
-                tweet.save()
-                return False
-            
-            # بررسی محتوای توهین‌آمیز
-            if FilterRules.contains_offensive_language(content, tweet.language):
-                self.logger.debug(f"Tweet {tweet_id} rejected: Offensive language")
-                tweet.update_processing_status('filtered_offensive')
-                tweet.filter_result = 'rejected'
-                tweet.save()
-                return False
+            # اعمال قواعد فیلتر در یک گذر (به ترتیب اولویت: اسپم، توهین‌آمیز، تبلیغات سیاسی، کم‌کیفیت)
+            status, filter_result, reason = self.classify(tweet.content, tweet.language)
             
-            # بررسی تبلیغات سیاسی
-            if FilterRules.is_propaganda(content):
-                self.logger.debug(f"Tweet {tweet_id} rejected: Propaganda")
-                tweet.update_processing_status('filtered_propaganda')
-                tweet.filter_result = 'rejected'
-                tweet.save()
-                return False
+            # ثبت وضعیت و نتیجه فیلتر با یک دستور
+            tweet.update_filter_result(status, filter_result)
             
-            # بررسی کیفیت محتوا
-            if FilterRules.is_low_quality(content):
-                self.logger.debug(f"Tweet {tweet_id} rejected: Low quality")
-                tweet.update_processing_status('filtered_low_quality')
-                tweet.filter_result = 'rejected'
-                tweet.save()
+            if filter_result == 'rejected':
+                self.logger.debug(f"Tweet {tweet_id} rejected: {reason}")
                 return False
             
             # قبول توییت
             self.logger.debug(f"Tweet {tweet_id} accepted")
-            tweet.update_processing_status('filtered_accepted')
-            tweet.filter_result = 'accepted'
-            tweet.save()
             
             # انتشار رویداد توییت قبول شده
             self.event_manager.emit('tweet_accepted', tweet_id=tweet_id)
@@ -100,5 +103,136 @@ class FilterPlugin(BasePlugin):
         except Exception as e:
             self.logger.error(f"Error filtering tweet {tweet_id}: {str(e)}")
             tweet.update_processing_status('filter_error')
-            tweet.save()
-            return False
\ No newline at end of file
+            return False
+    
+    def classify(self, content, language):
+        """تعیین وضعیت پردازش، نتیجه فیلتر و دلیل رد یک متن"""
+        return self._result_for_category(self.rule_engine.classify(content, language))
+    
+    def _result_for_category(self, category):
+        """تبدیل دسته قواعد به وضعیت پردازش، نتیجه فیلتر و دلیل رد"""
+        if category:
+            status, reason = self.REJECTION_STATUSES[category]
+            return status, 'rejected', reason
+        return 'filtered_accepted', 'accepted', None
+    
+    def filter_batch(self, tweet_ids=None, batch_size=None):
+        """فیلتر دسته‌ای توییت‌های در انتظار (همه یا لیست مشخص) با ثبت یکجای نتایج"""
+        summary = {}
+        for rows in self._pending_batches(tweet_ids, batch_size):
+            self._store_results(self._classify_rows(rows), summary)
+        
+        self.logger.info(f"Batch filtering completed: {summary}")
+        return summary
+    
+    async def filter_batch_async(self, tweet_ids=None, batch_size=None):
+        """فیلتر دسته‌ای از داخل event loop؛ انتظار برای پروسس‌های worker loop را مسدود نمی‌کند"""
+        summary = {}
+        for rows in self._pending_batches(tweet_ids, batch_size):
+            self._store_results(await self._classify_rows_async(rows), summary)
+        
+        self.logger.info(f"Batch filtering completed: {summary}")
+        return summary
+    
+    def _run_batch(self, tweet_ids):
+        """اجرای فیلتر دسته‌ای؛ با pool پروسس و event loop فعال، coroutine برای اجرا در loop برگردانده می‌شود"""
+        if self._get_executor() is None:
+            return self.filter_batch(tweet_ids)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self.filter_batch(tweet_ids)
+        return self.filter_batch_async(tweet_ids)
+    
+    def _pending_batches(self, tweet_ids=None, batch_size=None):
+        """دسته‌های ردیف (id, content, language) توییت‌های در انتظار فیلتر"""
+        batch_size = batch_size or self.batch_size
+        last_id = 0
+        
+        if tweet_ids is not None:
+            tweet_ids = list(tweet_ids)
+            if not tweet_ids:
+                return
+        
+        while True:
+            rows = Tweet.get_pending_for_filter(
+                self.db,
+                tweet_ids=tweet_ids[:batch_size] if tweet_ids is not None else None,
+                after_id=last_id,
+                limit=batch_size
+            )
+            if tweet_ids is not None:
+                tweet_ids = tweet_ids[batch_size:]
+            else:
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+            
+            yield [(row['id'], row['content'], row['language']) for row in rows]
+            
+            if tweet_ids is not None and not tweet_ids:
+                break
+    
+    def _store_results(self, classified, summary):
+        """ثبت نتایج طبقه‌بندی یک دسته و انتشار رویداد توییت‌های قبول شده"""
+        results = []
+        accepted_ids = []
+        for tweet_id, category, error in classified:
+            if error:
+                self.logger.error(f"Error filtering tweet {tweet_id}: {error}")
+                status, filter_result = 'filter_error', 'pending'
+            else:
+                status, filter_result, reason = self._result_for_category(category)
+            results.append((tweet_id, status, filter_result))
+            summary[status] = summary.get(status, 0) + 1
+            if filter_result == 'accepted':
+                accepted_ids.append(tweet_id)
+        
+        # ثبت همه نتایج این دسته در یک تراکنش
+        if results:
+            Tweet.bulk_update_filter_results(self.db, results)
+        
+        # انتشار رویداد توییت قبول شده پس از ثبت نتایج (مشترکین دسته‌ای آن را تجمیع می‌کنند)
+        for tweet_id in accepted_ids:
+            self.event_manager.emit('tweet_accepted', tweet_id=tweet_id)
+    
+    def _get_executor(self):
+        """ایجاد تنبل pool پروسس‌های فیلتر (فقط در صورت تنظیم WORKERS > 1)"""
+        if self.workers <= 1:
+            return None
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.logger.info(f"Filter process pool started with {self.workers} workers")
+        return self.executor
+    
+    def _split_rows(self, rows):
+        """تقسیم ردیف‌ها بین پروسس‌های worker (None یعنی طبقه‌بندی در پروسس اصلی)"""
+        executor = self._get_executor()
+        if executor is None or len(rows) < self.workers * 2:
+            return executor, None
+        chunk_size = math.ceil(len(rows) / self.workers)
+        return executor, [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    
+    def _classify_rows(self, rows):
+        """طبقه‌بندی ردیف‌ها؛ تقسیم بین پروسس‌ها و جمع‌آوری نتایج در پروسس اصلی"""
+        executor, chunks = self._split_rows(rows)
+        if chunks is None:
+            return classify_rows(rows)
+        
+        # فقط متن‌ها به workerها ارسال می‌شوند؛ نوشتن در SQLite فقط در پروسس اصلی انجام می‌شود
+        results = []
+        for chunk_results in executor.map(classify_rows, chunks):
+            results.extend(chunk_results)
+        return results
+    
+    async def _classify_rows_async(self, rows):
+        """طبقه‌بندی ردیف‌ها در پروسس‌های worker با انتظار ناهمگام برای نتایج هر بخش"""
+        executor, chunks = self._split_rows(rows)
+        if chunks is None:
+            return classify_rows(rows)
+        
+        loop = asyncio.get_running_loop()
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(executor, classify_rows, chunk) for chunk in chunks
+        ))
+        return [result for results in chunk_results for result in results]
@@ -8,6 +8,8 @@ from migrations.create_tables import create_tables
 from plugins.collector.collector import CollectorPlugin
 from plugins.filter.filter import FilterPlugin
 from plugins.dashboard.dashboard import DashboardPlugin
+from plugins.retention.retention import RetentionPlugin
+from plugins.trends.trends import TrendsPlugin
 
 def main():
     """نقطه ورود اصلی برنامه"""
@@ -27,6 +29,8 @@ def main():
     app.plugin_manager.register_plugin("collector", CollectorPlugin)
     app.plugin_manager.register_plugin("filter", FilterPlugin)
     app.plugin_manager.register_plugin("dashboard", DashboardPlugin)
+    app.plugin_manager.register_plugin("retention", RetentionPlugin)
+    app.plugin_manager.register_plugin("trends", TrendsPlugin)
     
     # اجرای اپلیکیشن
     app.run()
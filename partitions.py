@@ -0,0 +1,343 @@
+# core/partitions.py
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+class PartitionManager:
+    """پارتیشن‌های ماهانه توییت‌های قدیمی در فایل‌های SQLite جدا (انتقال، آرشیو و حذف طبق سیاست نگهداری)"""
+    
+    TABLE_NAME = 'tweet_partitions'
+    
+    # جداول منتقل شونده و ستون ارتباط با توییت
+    TABLES = (('tweets', 'id'), ('tweet_keywords', 'tweet_id'), ('tweet_entities', 'tweet_id'))
+    
+    # نمایه‌های لازم برای کوئری‌های مدل Tweet روی پارتیشن
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_tweets_created_at ON tweets(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tweets_status_created ON tweets(processing_status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tweet_keywords_keyword_id ON tweet_keywords(keyword_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tweet_entities_tweet_id ON tweet_entities(tweet_id)",
+    )
+    
+    def __init__(self, db, directory='data/partitions'):
+        self.db = db
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def month_key(value, shift=0):
+        """کلید ماه (YYYY-MM) یک تاریخ با جابجایی اختیاری به ماه‌های قبل/بعد"""
+        months = value.year * 12 + value.month - 1 + shift
+        return f"{months // 12:04d}-{months % 12 + 1:02d}"
+    
+    @classmethod
+    def month_bounds(cls, key):
+        """بازه [start, end) یک ماه به صورت رشته‌های قابل مقایسه با created_at"""
+        start = datetime.strptime(key, '%Y-%m')
+        return start.isoformat(), datetime.strptime(cls.month_key(start, 1), '%Y-%m').isoformat()
+    
+    def partition_path(self, key):
+        """مسیر فایل SQLite پارتیشن"""
+        return os.path.join(self.directory, f"tweets_{key}.db")
+    
+    def archive_path(self, key):
+        """مسیر فایل آرشیو فشرده پارتیشن"""
+        return self.partition_path(key) + '.gz'
+    
+    def get_partitions(self, status=None, descending=True):
+        """فهرست پارتیشن‌های ثبت شده"""
+        query = f"SELECT * FROM {self.TABLE_NAME}"
+        params = {}
+        if status:
+            query += " WHERE status = :status"
+            params['status'] = status
+        query += f" ORDER BY key {'DESC' if descending else 'ASC'}"
+        return [dict(row) for row in self.db.execute(query, params).fetchall()]
+    
+    def candidates(self, descending=True, before=None, after=None):
+        """پارتیشن‌های قابل کوئری که ممکن است ردیفی قبل از before یا بعد از after داشته باشند"""
+        conditions = ["status = 'attached'"]
+        params = {}
+        if before:
+            conditions.append("start_at < :before")
+            params['before'] = before
+        if after:
+            conditions.append("end_at > :after")
+            params['after'] = after
+        query = f"""
+            SELECT key, start_at, end_at FROM {self.TABLE_NAME}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY key {'DESC' if descending else 'ASC'}
+        """
+        return [dict(row) for row in self.db.execute(query, params).fetchall()]
+    
+    def keys_for_tweet_id(self, tweet_id):
+        """کلید پارتیشن‌های قابل کوئری که بازه ID ثبت شده‌شان شامل یک ID توییت است"""
+        query = f"""
+            SELECT key FROM {self.TABLE_NAME}
+            WHERE status = 'attached' AND min_id <= :id AND max_id >= :id
+            ORDER BY key DESC
+        """
+        return [row['key'] for row in self.db.execute(query, {'id': tweet_id}).fetchall()]
+    
+    def find_moved(self, created_at_by_twitter_id, chunk_size=500):
+        """ID توییتر توییت‌هایی که قبلاً به پارتیشن منتقل شده‌اند (در ماه آرشیو شده همه توییت‌های آن ماه)"""
+        statuses = {partition['key']: partition['status'] for partition in self.get_partitions()}
+        if not statuses:
+            return set()
+        
+        by_month = {}
+        for twitter_id, created_at in created_at_by_twitter_id.items():
+            key = self.month_key(created_at)
+            if key in statuses:
+                by_month.setdefault(key, []).append(twitter_id)
+        
+        moved = set()
+        for key, twitter_ids in by_month.items():
+            if statuses[key] != 'attached':
+                # پارتیشن آرشیو شده قابل کوئری نیست؛ توییت‌های آن ماه دوباره وارد جدول اصلی نمی‌شوند
+                moved.update(twitter_ids)
+                continue
+            for i in range(0, len(twitter_ids), chunk_size):
+                chunk = twitter_ids[i:i + chunk_size]
+                placeholders = ', '.join('?' for _ in chunk)
+                rows = self.read(key, f"SELECT twitter_id FROM tweets WHERE twitter_id IN ({placeholders})", chunk)
+                moved.update(row['twitter_id'] for row in rows)
+        return moved
+    
+    def read(self, key, query, params=None):
+        """اجرای کوئری فقط‌خواندنی روی فایل یک پارتیشن"""
+        uri = Path(self.partition_path(key)).resolve().as_uri() + '?mode=ro'
+        with closing(sqlite3.connect(uri, uri=True, timeout=self.db.busy_timeout)) as conn:
+            conn.row_factory = sqlite3.Row
+            return conn.execute(query, params or {}).fetchall()
+    
+    def _open_partition(self, key):
+        """باز کردن (و در صورت نیاز ایجاد) فایل پارتیشن با همان ساختار جداول اصلی"""
+        # پارتیشن‌ها به ندرت نوشته می‌شوند؛ journal پیش‌فرض بدون فایل‌های WAL باقی‌مانده از اتصال‌های فقط‌خواندنی
+        conn = sqlite3.connect(self.partition_path(key), timeout=self.db.busy_timeout)
+        for table, _ in self.TABLES:
+            row = self.db.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name", {'name': table}
+            ).fetchone()
+            conn.execute(row['sql'].replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+        for index in self.INDEXES:
+            conn.execute(index)
+        conn.commit()
+        return conn
+    
+    @staticmethod
+    def _columns(conn, table):
+        """نام ستون‌های یک جدول"""
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+    
+    @staticmethod
+    def _remove_files(path):
+        """حذف فایل SQLite همراه با فایل‌های WAL آن"""
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    
+    def move_month(self, key, batch_size=500):
+        """انتقال دسته‌ای توییت‌های یک ماه (و ارتباط‌هایشان) از جداول اصلی به فایل پارتیشن"""
+        start, end = self.month_bounds(key)
+        moved = 0
+        
+        with closing(self._open_partition(key)) as partition:
+            columns = {
+                table: [column for column in self._columns(partition, table)
+                        if column in self._columns(self.db, table)]
+                for table, _ in self.TABLES
+            }
+            
+            while True:
+                ids = [row['id'] for row in self.db.execute(
+                    "SELECT id FROM tweets WHERE created_at >= :start AND created_at < :end ORDER BY id LIMIT :limit",
+                    {'start': start, 'end': end, 'limit': batch_size}
+                ).fetchall()]
+                if not ids:
+                    break
+                
+                # ابتدا نوشتن در پارتیشن (تکرار پس از خطا با INSERT OR REPLACE بی‌خطر است)، سپس حذف از جداول اصلی
+                placeholders = ', '.join('?' for _ in ids)
+                for table, id_column in self.TABLES:
+                    column_list = ', '.join(columns[table])
+                    rows = self.db.execute(
+                        f"SELECT {column_list} FROM {table} WHERE {id_column} IN ({placeholders})", ids
+                    ).fetchall()
+                    partition.executemany(
+                        f"INSERT OR REPLACE INTO {table} ({column_list}) VALUES ({', '.join('?' for _ in columns[table])})",
+                        [tuple(row) for row in rows]
+                    )
+                partition.commit()
+                
+                self._remove_moved(key, start, end, ids, placeholders)
+                moved += len(ids)
+        
+        return moved
+    
+    def _remove_moved(self, key, start, end, ids, placeholders):
+        """حذف یک دسته منتقل شده از جداول اصلی بدون تغییر شمارنده‌ها و نمودارهای داشبورد"""
+        with self.db.transaction():
+            counters = {'tweets_total': len(ids)}
+            for row in self.db.execute(f"""
+                SELECT 'status:' || COALESCE(processing_status, '') AS name, COUNT(*) AS value
+                FROM tweets WHERE id IN ({placeholders}) GROUP BY 1
+                UNION ALL
+                SELECT 'filter:' || COALESCE(filter_result, ''), COUNT(*)
+                FROM tweets WHERE id IN ({placeholders}) GROUP BY 1
+            """, ids + ids).fetchall():
+                counters[row['name']] = row['value']
+            
+            # triggerهای حذف تجمیع‌ها را کم می‌کنند؛ تاریخچه نمودار با افزودن همان مقادیر حفظ می‌شود
+            self.db.execute(f"""
+                INSERT INTO tweet_volume_rollups (granularity, dimension, value, bucket, count)
+                SELECT g.granularity, d.dimension, d.value, strftime(g.format, d.created_at), COUNT(*)
+                FROM (SELECT 'hour' AS granularity, '%Y-%m-%d %H:00' AS format
+                      UNION ALL SELECT 'day', '%Y-%m-%d') AS g,
+                     (SELECT 'all' AS dimension, '' AS value, created_at FROM tweets WHERE id IN ({placeholders})
+                      UNION ALL SELECT 'filter_result', COALESCE(filter_result, ''), created_at
+                                FROM tweets WHERE id IN ({placeholders})
+                      UNION ALL SELECT 'language', COALESCE(language, ''), created_at
+                                FROM tweets WHERE id IN ({placeholders})
+                      UNION ALL SELECT 'keyword', CAST(tk.keyword_id AS TEXT), t.created_at
+                                FROM tweet_keywords AS tk JOIN tweets AS t ON t.id = tk.tweet_id
+                                WHERE t.id IN ({placeholders})) AS d
+                WHERE 1
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT(granularity, dimension, value, bucket) DO UPDATE SET count = count + excluded.count
+            """, ids * 4)
+            
+            for table, id_column in reversed(self.TABLES):
+                self.db.execute(f"DELETE FROM {table} WHERE {id_column} IN ({placeholders})", ids)
+            
+            # داده منتقل شده همچنان قابل کوئری است، پس شمارنده‌ها بازگردانده می‌شوند
+            self._apply_counters(counters)
+            
+            row = self.db.execute(
+                f"SELECT * FROM {self.TABLE_NAME} WHERE key = :key", {'key': key}
+            ).fetchone()
+            merged = json.loads(row['counters']) if row and row['counters'] else {}
+            for name, value in counters.items():
+                merged[name] = merged.get(name, 0) + value
+            
+            self.db.execute(f"""
+                INSERT INTO {self.TABLE_NAME}
+                (key, start_at, end_at, status, tweet_count, min_id, max_id, counters, updated_at)
+                VALUES (:key, :start_at, :end_at, 'attached', :count, :min_id, :max_id, :counters, :updated_at)
+                ON CONFLICT(key) DO UPDATE SET
+                    tweet_count = tweet_count + excluded.tweet_count,
+                    min_id = MIN(min_id, excluded.min_id),
+                    max_id = MAX(max_id, excluded.max_id),
+                    counters = excluded.counters,
+                    updated_at = excluded.updated_at
+            """, {
+                'key': key,
+                'start_at': start,
+                'end_at': end,
+                'count': len(ids),
+                'min_id': min(ids),
+                'max_id': max(ids),
+                'counters': json.dumps(merged),
+                'updated_at': datetime.now().isoformat()
+            })
+    
+    def _apply_counters(self, counters, sign=1):
+        """افزودن (یا کم کردن) شمارنده‌های یک پارتیشن به شمارنده‌های داشبورد"""
+        self.db.execute_many("""
+            INSERT INTO stats_counters (name, value) VALUES (:name, :value)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        """, [{'name': name, 'value': sign * value} for name, value in counters.items()])
+    
+    def _set_status(self, key, status, size_bytes=None):
+        """تغییر وضعیت پارتیشن؛ شمارنده‌ها فقط داده قابل کوئری را حساب می‌کنند"""
+        with self.db.transaction():
+            row = self.db.execute(
+                f"SELECT status, counters FROM {self.TABLE_NAME} WHERE key = :key", {'key': key}
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown partition: {key}")
+            
+            was_queryable = row['status'] == 'attached'
+            is_queryable = status == 'attached'
+            if was_queryable != is_queryable and row['counters']:
+                self._apply_counters(json.loads(row['counters']), 1 if is_queryable else -1)
+            
+            if status is None:
+                self.db.execute(f"DELETE FROM {self.TABLE_NAME} WHERE key = :key", {'key': key})
+            else:
+                self.db.execute(f"""
+                    UPDATE {self.TABLE_NAME}
+                    SET status = :status, size_bytes = COALESCE(:size_bytes, size_bytes), updated_at = :updated_at
+                    WHERE key = :key
+                """, {'key': key, 'status': status, 'size_bytes': size_bytes,
+                      'updated_at': datetime.now().isoformat()})
+    
+    def archive(self, key):
+        """جدا کردن پارتیشن و فشرده‌سازی آن (فایل SQLite فشرده شده با VACUUM و gzip)"""
+        path = self.partition_path(key)
+        archive_path = self.archive_path(key)
+        
+        with closing(sqlite3.connect(path, timeout=self.db.busy_timeout)) as conn:
+            conn.execute("VACUUM")
+        
+        with open(path, 'rb') as source, gzip.open(archive_path + '.tmp', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(archive_path + '.tmp', archive_path)
+        
+        self._set_status(key, 'archived', os.path.getsize(archive_path))
+        self._remove_files(path)
+        return archive_path
+    
+    def restore(self, key):
+        """بازگرداندن یک پارتیشن آرشیو شده به حالت قابل کوئری"""
+        path = self.partition_path(key)
+        with gzip.open(self.archive_path(key), 'rb') as source, open(path + '.tmp', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(path + '.tmp', path)
+        
+        self._set_status(key, 'attached', os.path.getsize(path))
+        os.remove(self.archive_path(key))
+        return path
+    
+    def drop(self, key):
+        """حذف کامل یک پارتیشن (فایل و آرشیو)"""
+        self._set_status(key, None)
+        self._remove_files(self.partition_path(key))
+        self._remove_files(self.archive_path(key))
+    
+    def apply_retention(self, hot_months=0, attached_months=0, delete_after_months=0,
+                        batch_size=500, now=None):
+        """اجرای سیاست نگهداری: انتقال ماه‌های قدیمی، آرشیو پارتیشن‌های قدیمی و حذف آرشیوهای منقضی (۰ = غیرفعال)"""
+        now = now or datetime.now()
+        result = {'moved': {}, 'archived': [], 'dropped': []}
+        
+        if hot_months > 0:
+            cutoff, _ = self.month_bounds(self.month_key(now, -hot_months))
+            months = [row['month'] for row in self.db.execute(
+                "SELECT DISTINCT substr(created_at, 1, 7) AS month FROM tweets WHERE created_at < :cutoff",
+                {'cutoff': cutoff}
+            ).fetchall()]
+            for key in sorted(months):
+                result['moved'][key] = self.move_month(key, batch_size)
+        
+        if attached_months > 0:
+            cutoff = self.month_key(now, -attached_months)
+            for partition in self.get_partitions('attached', descending=False):
+                if partition['key'] < cutoff:
+                    self.archive(partition['key'])
+                    result['archived'].append(partition['key'])
+        
+        if delete_after_months > 0:
+            cutoff = self.month_key(now, -delete_after_months)
+            for partition in self.get_partitions(descending=False):
+                if partition['key'] < cutoff:
+                    self.drop(partition['key'])
+                    result['dropped'].append(partition['key'])
+        
+        return result
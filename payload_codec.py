@@ -0,0 +1,127 @@
+# core/payload_codec.py
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# پیشوند بلاب‌های فشرده (متن JSON هرگز با بایت صفر شروع نمی‌شود)
+MAGIC = b'\x00TP'
+ZLIB = b'z'
+ZSTD = b's'
+
+# دیکشنری‌های مشترک بر اساس شناسه؛ محتوای یک شناسه پس از انتشار نباید تغییر کند
+# (رشته‌های پرتکرار پاسخ API در انتها قرار گرفته‌اند تا فاصله ارجاع کوتاه‌تر شود)
+SHARED_DICTIONARIES = {
+    1: json.dumps({
+        'type': 'tweet', 'id': '', 'url': 'https://x.com/i/status/', 'twitterUrl': 'https://twitter.com/',
+        'text': '', 'source': 'Twitter for iPhone', 'lang': 'fa', 'createdAt': 'Mon Jan 01 00:00:00 +0000 2024',
+        'retweetCount': 0, 'replyCount': 0, 'likeCount': 0, 'quoteCount': 0, 'viewCount': 0,
+        'bookmarkCount': 0, 'isReply': False, 'inReplyToId': None, 'conversationId': '',
+        'inReplyToUserId': None, 'inReplyToUsername': None, 'possiblySensitive': False,
+        'author': {
+            'type': 'user', 'userName': '', 'url': 'https://x.com/', 'id': '', 'name': '',
+            'isBlueVerified': False, 'verifiedType': None, 'profilePicture': 'https://pbs.twimg.com/profile_images/',
+            'coverPicture': 'https://pbs.twimg.com/profile_banners/', 'description': '', 'location': '',
+            'followers': 0, 'following': 0, 'canDm': False, 'createdAt': '', 'favouritesCount': 0,
+            'hasCustomTimelines': False, 'isTranslator': False, 'mediaCount': 0, 'statusesCount': 0,
+            'withheldInCountries': [], 'affiliatesHighlightedLabel': {}, 'possiblySensitive': False,
+            'pinnedTweetIds': [], 'isAutomated': False, 'automatedBy': None, 'unavailable': False
+        },
+        'entities': {
+            'hashtags': [{'indices': [0, 0], 'text': ''}],
+            'urls': [{'display_url': '', 'expanded_url': 'https://', 'indices': [0, 0], 'url': 'https://t.co/'}],
+            'user_mentions': [{'id_str': '', 'name': '', 'screen_name': ''}]
+        },
+        'quoted_tweet': None, 'retweeted_tweet': None, 'extendedEntities': {}
+    }, ensure_ascii=False).encode('utf-8')
+}
+DEFAULT_DICTIONARY = 1
+
+ALGORITHMS = ('none', 'zlib', 'zstd')
+
+
+def zstd_available():
+    """آیا پکیج zstandard نصب است"""
+    return zstandard is not None
+
+
+def decode_payload(value):
+    """تبدیل مقدار ذخیره شده (متن JSON قدیمی یا بلاب فشرده) به شیء پایتون"""
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, bytes) and value.startswith(MAGIC):
+        header = len(MAGIC)
+        algorithm = value[header:header + 1]
+        dictionary_id = value[header + 1]
+        body = value[header + 2:]
+        dictionary = SHARED_DICTIONARIES[dictionary_id] if dictionary_id else None
+        
+        if algorithm == ZLIB:
+            decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+            value = decompressor.decompress(body) + decompressor.flush()
+        elif algorithm == ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Payload is zstd-compressed but the 'zstandard' package is not installed")
+            dict_data = _zstd_dictionary(dictionary_id) if dictionary else None
+            value = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(body)
+        else:
+            raise ValueError(f"Unknown payload compression: {algorithm!r}")
+    if not value:
+        return None
+    return json.loads(value)
+
+
+def _zstd_dictionary(dictionary_id):
+    """دیکشنری zstd محتوای خام از دیکشنری مشترک"""
+    return zstandard.ZstdCompressionDict(
+        SHARED_DICTIONARIES[dictionary_id], dict_type=zstandard.DICT_TYPE_RAWCONTENT
+    )
+
+
+class PayloadCodec:
+    """قالب ذخیره بلاب‌های JSON (tweet_data و profile_data): فشرده با zlib/zstd و دیکشنری مشترک"""
+    
+    # بلاب‌های کوچک‌تر از این اندازه فشرده نمی‌شوند (سربار هدر بیشتر از سود است)
+    MIN_SIZE = 64
+    
+    def __init__(self, algorithm='zlib', level=6, use_dictionary=True):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown payload codec: {algorithm}")
+        if algorithm == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd payload codec requires the 'zstandard' package")
+        
+        self.algorithm = algorithm
+        self.level = level
+        self.dictionary_id = DEFAULT_DICTIONARY if use_dictionary else 0
+        self.zstd_compressor = None
+        if algorithm == 'zstd':
+            dict_data = _zstd_dictionary(self.dictionary_id) if self.dictionary_id else None
+            self.zstd_compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+    
+    def encode(self, value):
+        """تبدیل شیء پایتون به مقدار قابل ذخیره (بلاب فشرده یا متن JSON)"""
+        if value is None:
+            return None
+        if isinstance(value, (str, bytes)):
+            # مقدار از قبل کدگذاری شده است
+            return value
+        
+        text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        if self.algorithm == 'none' or len(text) < self.MIN_SIZE:
+            return text
+        
+        data = text.encode('utf-8')
+        if self.algorithm == 'zstd':
+            body = self.zstd_compressor.compress(data)
+            algorithm = ZSTD
+        else:
+            dictionary = SHARED_DICTIONARIES.get(self.dictionary_id)
+            compressor = zlib.compressobj(self.level, zdict=dictionary) if dictionary else zlib.compressobj(self.level)
+            body = compressor.compress(data) + compressor.flush()
+            algorithm = ZLIB
+        return MAGIC + algorithm + bytes([self.dictionary_id]) + body
@@ -0,0 +1,107 @@
+# plugins/collector/rate_limiter.py
+import asyncio
+import time
+
+class TokenBucket:
+    """سطل توکن ناهمگام برای یک گروه endpoint"""
+    
+    def __init__(self, limit, window=60):
+        self.limit = max(1, limit)
+        self.window = window
+        self.tokens = float(self.limit)
+        self.updated_at = time.monotonic()
+        self.reset_at = 0
+        self.blocked_until = 0
+        # قفل asyncio به loop اولین انتظار وابسته می‌شود؛ سطل فقط در loop جمع‌آوری استفاده می‌شود
+        self.lock = asyncio.Lock()
+        self.loop = None
+    
+    def _refill(self):
+        """پر کردن توکن‌ها بر اساس زمان سپری شده"""
+        if self.reset_at and time.time() >= self.reset_at:
+            # شروع پنجره جدید API: سهمیه کامل برمی‌گردد
+            self.tokens = float(self.limit)
+            self.reset_at = 0
+        now = time.monotonic()
+        rate = self.limit / self.window
+        self.tokens = min(self.limit, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+    
+    async def acquire(self):
+        """گرفتن یک توکن؛ فقط coroutine درخواست‌کننده منتظر می‌ماند"""
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("TokenBucket is bound to another event loop; submit requests to the collector's loop")
+        waited = 0
+        async with self.lock:
+            while True:
+                wait_time = self.blocked_until - time.time()
+                if wait_time <= 0:
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    wait_time = (1 - self.tokens) * self.window / self.limit
+                
+                await asyncio.sleep(wait_time)
+                waited += wait_time
+    
+    def sync(self, limit, remaining, reset):
+        """همگام‌سازی با هدرهای X-Rate-Limit پاسخ API"""
+        self._refill()
+        self.limit = max(1, limit)
+        self.tokens = float(min(remaining, self.limit))
+        self.reset_at = reset
+        if remaining <= 0:
+            # تا زمان ریست هیچ درخواستی ارسال نشود (یک ثانیه اضافه برای اطمینان)
+            self.blocked_until = max(self.blocked_until, reset + 1)
+    
+    def block_for(self, seconds):
+        """توقف این گروه برای مدت مشخص (مثلاً بر اساس Retry-After)"""
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+
+class RateLimiter:
+    """مدیریت سطل‌های توکن به تفکیک گروه endpoint"""
+    
+    def __init__(self, rate_limits, window=60):
+        self.rate_limits = rate_limits
+        self.window = window
+        self.buckets = {}
+    
+    def get_bucket(self, endpoint_key):
+        """دریافت (یا ایجاد) سطل توکن یک گروه"""
+        bucket = self.buckets.get(endpoint_key)
+        if bucket is None:
+            limit_data = self.rate_limits.setdefault(
+                endpoint_key, {'limit': 60, 'remaining': 60, 'reset': 0}
+            )
+            bucket = TokenBucket(limit_data['limit'], self.window)
+            self.buckets[endpoint_key] = bucket
+        return bucket
+    
+    async def acquire(self, endpoint_key):
+        """گرفتن سهمیه برای یک درخواست"""
+        bucket = self.get_bucket(endpoint_key)
+        waited = await bucket.acquire()
+        self.rate_limits[endpoint_key]['remaining'] = int(bucket.tokens)
+        return waited
+    
+    def sync_from_headers(self, endpoint_key, headers):
+        """به‌روزرسانی محدودیت نرخ از هدرهای پاسخ"""
+        if 'X-Rate-Limit-Limit' not in headers:
+            return
+        
+        limit_data = {
+            'limit': int(headers['X-Rate-Limit-Limit']),
+            'remaining': int(headers['X-Rate-Limit-Remaining']),
+            'reset': int(headers['X-Rate-Limit-Reset'])
+        }
+        self.rate_limits[endpoint_key] = limit_data
+        self.get_bucket(endpoint_key).sync(**limit_data)
+    
+    def block_for(self, endpoint_key, seconds):
+        """توقف موقت درخواست‌های یک گروه"""
+        self.get_bucket(endpoint_key).block_for(seconds)
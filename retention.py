@@ -0,0 +1,87 @@
+# plugins/retention/retention.py
+import threading
+from plugins.base_plugin import BasePlugin
+
+class RetentionPlugin(BasePlugin):
+    """پلاگین سیاست نگهداری: انتقال ماه‌های قدیمی به پارتیشن، آرشیو و حذف پارتیشن‌های منقضی"""
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self.interval = 86400
+        self.policy = {}
+        self.stop_event = threading.Event()
+        self.retention_thread = None
+        self.retention_lock = threading.Lock()
+        self.last_result = None
+    
+    def initialize(self):
+        """راه‌اندازی پلاگین"""
+        self.logger.info("Initializing Retention Plugin")
+        
+        if self.db.partitions is None:
+            self.db.configure_partitions(self.config.get('RETENTION', 'PARTITION_DIR', 'data/partitions'))
+        
+        self.interval = self.config.getint('RETENTION', 'INTERVAL', 86400)
+        self.policy = {
+            'hot_months': self.config.getint('RETENTION', 'HOT_MONTHS', 0),
+            'attached_months': self.config.getint('RETENTION', 'ATTACHED_MONTHS', 0),
+            'delete_after_months': self.config.getint('RETENTION', 'DELETE_AFTER_MONTHS', 0),
+            'batch_size': self.config.getint('RETENTION', 'BATCH_SIZE', 500)
+        }
+        
+        # اشتراک در رویدادها
+        self.event_manager.subscribe('apply_retention', self._on_apply_retention)
+        
+        # اجرای دوره‌ای در ترد پس‌زمینه فقط در صورت تنظیم سیاست (انتقال دسته‌ای ممکن است طولانی باشد)
+        if self.is_enabled():
+            self.retention_thread = threading.Thread(target=self._run_periodically, daemon=True)
+            self.retention_thread.start()
+        else:
+            self.logger.info("Retention policy is not configured. Periodic retention is disabled")
+        
+        self.logger.info(f"Retention Plugin initialized (policy={self.policy}, interval={self.interval}s)")
+    
+    def is_enabled(self):
+        """آیا حداقل یکی از مراحل سیاست نگهداری تنظیم شده است"""
+        return any(self.policy[name] > 0 for name in ('hot_months', 'attached_months', 'delete_after_months'))
+    
+    def shutdown(self):
+        """توقف پلاگین"""
+        self.logger.info("Shutting down Retention Plugin")
+        self.stop_event.set()
+    
+    def _on_apply_retention(self, data):
+        """رویداد درخواست اجرای دستی سیاست نگهداری"""
+        self.logger.info("Received apply_retention event")
+        threading.Thread(target=self.apply_retention, daemon=True).start()
+    
+    def _run_periodically(self):
+        """اجرای سیاست نگهداری در فواصل تعیین شده"""
+        while not self.stop_event.is_set():
+            self.apply_retention()
+            if self.stop_event.wait(self.interval):
+                break
+    
+    def apply_retention(self):
+        """اجرای یک دور سیاست نگهداری"""
+        if not self.retention_lock.acquire(blocking=False):
+            self.logger.info("Retention run already in progress")
+            return None
+        
+        try:
+            result = self.db.partitions.apply_retention(**self.policy)
+            self.last_result = result
+            
+            moved = sum(result['moved'].values())
+            if moved or result['archived'] or result['dropped']:
+                self.logger.info(
+                    f"Retention finished: {moved} tweets moved to {len(result['moved'])} partitions, "
+                    f"{len(result['archived'])} archived, {len(result['dropped'])} dropped"
+                )
+                self.event_manager.emit('retention_applied', **result)
+            return result
+        except Exception as e:
+            self.logger.error(f"Error applying retention policy: {str(e)}")
+            return None
+        finally:
+            self.retention_lock.release()
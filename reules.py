@@ -5,67 +5,72 @@ from collections import Counter
 class FilterRules:
     """قواعد فیلترینگ توییت‌ها"""
     
+    # الگوهای رایج اسپم
+    # همه قواعد روی متن کوچک‌شده بررسی می‌شوند، پس الگوها باید با حروف کوچک نوشته شوند
+    # (بدون پرچم IGNORECASE که جستجوی سریع پیشوندهای ثابت را در re غیرفعال می‌کند)
+    SPAM_PATTERNS = [
+        r'buy now|click here|free offer|limited time|discount code|special deal',
+        r'earn money online|work from home|make \$\d+ daily',
+        r'viagra|cialis|medication online|buy pills',
+        r'casino|betting|gambling|slot machine|poker',
+        r'subscribe to my|follow me at|check out my profile',
+        r'https?://\S+\s+https?://\S+\s+https?://\S+'  # چندین لینک در یک توییت
+    ]
+    
+    # لیست کلمات توهین‌آمیز (به صورت ساده)
+    OFFENSIVE_WORDS = {
+        'fa': [
+            # اینجا کلمات فارسی نامناسب قرار می‌گیرند
+            # این لیست باید به صورت واقعی تکمیل شود
+            'کلمه_نامناسب1', 'کلمه_نامناسب2'
+        ],
+        'default': [
+            # کلمات انگلیسی نامناسب
+            'offensive_word1', 'offensive_word2'
+        ]
+    }
+    
+    # نیازمند الگوریتم‌های پیشرفته‌تر NLP
+    # این یک تشخیص ساده است
+    PROPAGANDA_INDICATORS = [
+        'حمایت_کنید_از',
+        'رای_دهید_به',
+        'انتخاب_کنید',
+        'فقط_یک_انتخاب',
+        'بهترین_گزینه'
+    ]
+    
+    _spam_regex = re.compile('|'.join(SPAM_PATTERNS))
+    _word_regex = re.compile(r'\b\w+\b')
+    _engine = None
+    
+    @staticmethod
+    def offensive_pattern(language='fa'):
+        """الگوی کلمات توهین‌آمیز برای یک زبان"""
+        words = FilterRules.OFFENSIVE_WORDS['fa' if language == 'fa' else 'default']
+        return r'\b(?:' + '|'.join(re.escape(word.lower()) for word in words) + r')\b'
+    
+    @classmethod
+    def engine(cls):
+        """موتور قواعد کامپایل شده (یک بار ساخته می‌شود)"""
+        if cls._engine is None:
+            cls._engine = RuleEngine(cls)
+        return cls._engine
+    
     @staticmethod
     def contains_spam_patterns(text):
         """بررسی الگوهای اسپم"""
-        # الگوهای رایج اسپم
-        spam_patterns = [
-            r'(?i)(buy now|click here|free offer|limited time|discount code|special deal)',
-            r'(?i)(earn money online|work from home|make \$\d+ daily)',
-            r'(?i)(viagra|cialis|medication online|buy pills)',
-            r'(?i)(casino|betting|gambling|slot machine|poker)',
-            r'(?i)(subscribe to my|follow me at|check out my profile)',
-            r'https?://\S+\s+https?://\S+\s+https?://\S+'  # چندین لینک در یک توییت
-        ]
-        
-        for pattern in spam_patterns:
-            if re.search(pattern, text):
-                return True
-        
-        return False
+        return FilterRules._spam_regex.search(text.lower()) is not None
     
     @staticmethod
     def contains_offensive_language(text, language='fa'):
         """بررسی محتوای توهین‌آمیز"""
-        # لیست کلمات توهین‌آمیز (به صورت ساده)
-        if language == 'fa':
-            offensive_words = [
-                # اینجا کلمات فارسی نامناسب قرار می‌گیرند
-                # این لیست باید به صورت واقعی تکمیل شود
-                'کلمه_نامناسب1', 'کلمه_نامناسب2'
-            ]
-        else:
-            offensive_words = [
-                # کلمات انگلیسی نامناسب
-                'offensive_word1', 'offensive_word2'
-            ]
-        
-        # تبدیل به الگو برای جستجوی دقیق‌تر
-        pattern = r'\b(' + '|'.join(offensive_words) + r')\b'
-        
-        if re.search(pattern, text, re.IGNORECASE):
-            return True
-        
-        return False
+        return FilterRules.engine().offensive_regex(language).search(text.lower()) is not None
     
     @staticmethod
     def is_propaganda(text):
         """تشخیص تبلیغات سیاسی"""
-        # نیازمند الگوریتم‌های پیشرفته‌تر NLP
-        # این یک تشخیص ساده است
-        propaganda_indicators = [
-            'حمایت_کنید_از',
-            'رای_دهید_به',
-            'انتخاب_کنید',
-            'فقط_یک_انتخاب',
-            'بهترین_گزینه'
-        ]
-        
-        for indicator in propaganda_indicators:
-            if indicator in text:
-                return True
-        
-        return False
+        return FilterRules.engine().propaganda_regex.search(text.lower()) is not None
     
     @staticmethod
     def is_low_quality(text):
@@ -75,13 +80,14 @@ class FilterRules:
             return True
         
         # تکرار زیاد یک کاراکتر
-        char_counts = Counter(text)
-        most_common_char, count = char_counts.most_common(1)[0]
-        if count > len(text) * 0.5 and len(text) > 15:
-            return True
+        if len(text) > 15:
+            char_counts = Counter(text)
+            most_common_char, count = char_counts.most_common(1)[0]
+            if count > len(text) * 0.5:
+                return True
         
         # تکرار کلمات
-        words = re.findall(r'\b\w+\b', text)
+        words = FilterRules._word_regex.findall(text)
         if words:
             word_counts = Counter(words)
             most_common_word, count = word_counts.most_common(1)[0]
@@ -112,4 +118,71 @@ class FilterRules:
             if keyword.lower() in text.lower():
                 return True
                 
-        return False
\ No newline at end of file
+        return False
+
+class RuleEngine:
+    """موتور قواعد کامپایل شده برای طبقه‌بندی تک‌گذره توییت‌ها"""
+    
+    # ترتیب اولویت دسته‌ها (مطابق ترتیب بررسی در FilterPlugin)
+    CATEGORIES = ('spam', 'offensive', 'propaganda')
+    
+    def __init__(self, rules=FilterRules):
+        self.rules = rules
+        self.propaganda_regex = re.compile(
+            '|'.join(re.escape(indicator.lower()) for indicator in rules.PROPAGANDA_INDICATORS)
+        )
+        self._offensive_regexes = {}
+        self._combined_regexes = {}
+        for language in rules.OFFENSIVE_WORDS:
+            self._offensive_regexes[language] = re.compile(rules.offensive_pattern(language))
+            self._combined_regexes[language] = self._compile_combined(language)
+    
+    def _compile_combined(self, language):
+        """ساخت یک regex ترکیبی از همه قواعد متنی"""
+        patterns = {
+            'spam': '|'.join(self.rules.SPAM_PATTERNS),
+            'offensive': self.rules.offensive_pattern(language),
+            'propaganda': self.propaganda_regex.pattern
+        }
+        # lookahead بدون مصرف متن: در هر موقعیت دسته با بالاترین اولویت گزارش می‌شود
+        # و تطابق‌های دسته‌های مختلف روی هم‌پوشانی یکدیگر را از دست نمی‌دهند
+        alternatives = '|'.join(f'(?P<{name}>{patterns[name]})' for name in self.CATEGORIES)
+        return re.compile(f'(?=(?:{alternatives}))')
+    
+    def offensive_regex(self, language='fa'):
+        """regex کامپایل شده کلمات توهین‌آمیز یک زبان"""
+        return self._offensive_regexes['fa' if language == 'fa' else 'default']
+    
+    def match_category(self, text, language='fa'):
+        """یافتن دسته متنی با بالاترین اولویت در یک گذر روی متن"""
+        regex = self._combined_regexes['fa' if language == 'fa' else 'default']
+        best_rank = None
+        for match in regex.finditer(text.lower()):
+            for rank, name in enumerate(self.CATEGORIES):
+                if match.group(name) is not None:
+                    break
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                if rank == 0:
+                    break
+        return self.CATEGORIES[best_rank] if best_rank is not None else None
+    
+    def classify(self, text, language='fa'):
+        """طبقه‌بندی توییت؛ اولین دسته منطبق یا None برای توییت قابل قبول"""
+        category = self.match_category(text, language)
+        if category:
+            return category
+        if self.rules.is_low_quality(text):
+            return 'low_quality'
+        return None
+
+def classify_rows(rows):
+    """طبقه‌بندی دسته‌ای ردیف‌های (id, content, language)؛ قابل اجرا در پروسس جداگانه"""
+    engine = FilterRules.engine()
+    results = []
+    for tweet_id, content, language in rows:
+        try:
+            results.append((tweet_id, engine.classify(content, language), None))
+        except Exception as e:
+            results.append((tweet_id, None, str(e)))
+    return results
@@ -0,0 +1,108 @@
+# plugins/collector/scheduler.py
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+
+class CollectionScheduler:
+    """زمان‌بند جمع‌آوری همزمان توییت برای چند کلمه کلیدی"""
+    
+    def __init__(self, collector, logger, concurrency=4, history_size=24):
+        self.collector = collector
+        self.logger = logger
+        self.concurrency = max(1, concurrency)
+        self.last_cycle_stats = None
+        self.cycle_history = deque(maxlen=history_size)
+    
+    @staticmethod
+    def order_keywords(keywords):
+        """مرتب‌سازی کلمات کلیدی بر اساس اولویت و قدیمی‌ترین جستجو"""
+        return sorted(
+            keywords,
+            key=lambda keyword: (-keyword.priority, keyword.last_search_at or datetime.min)
+        )
+    
+    async def run_cycle(self, keywords, max_tweets_per_keyword=None):
+        """اجرای یک دور جمع‌آوری با چند worker همزمان"""
+        queue = asyncio.Queue()
+        for keyword in self.order_keywords(keywords):
+            queue.put_nowait(keyword)
+        
+        results = {}
+        stats = {
+            'started_at': datetime.now().isoformat(),
+            'concurrency': self.concurrency,
+            'keywords': len(keywords),
+            'skipped': 0,
+            'errors': 0,
+            'keyword_durations': {}
+        }
+        
+        cycle_start = time.monotonic()
+        workers = [
+            asyncio.create_task(self._worker(queue, results, stats, max_tweets_per_keyword))
+            for _ in range(min(self.concurrency, len(keywords)))
+        ]
+        
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            for worker in workers:
+                worker.cancel()
+            raise
+        
+        stats['duration'] = time.monotonic() - cycle_start
+        durations = stats['keyword_durations'].values()
+        stats['busy_time'] = sum(durations)
+        # نسبت زمان مشغول بودن workerها به کل ظرفیت (برای تنظیم اندازه pool)
+        stats['utilization'] = (
+            stats['busy_time'] / (stats['duration'] * self.concurrency)
+            if stats['duration'] > 0 else 0
+        )
+        
+        self.last_cycle_stats = stats
+        self.cycle_history.append(stats)
+        self.logger.info(
+            f"Collection cycle finished in {stats['duration']:.1f}s "
+            f"({stats['keywords']} keywords, {self.concurrency} workers, "
+            f"utilization {stats['utilization']:.0%})"
+        )
+        
+        return results
+    
+    async def _worker(self, queue, results, stats, max_tweets_per_keyword):
+        """worker برداشت کلمه کلیدی از صف و جمع‌آوری آن"""
+        while True:
+            try:
+                keyword = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            
+            # بودجه روزانه باقی‌مانده کلمه کلیدی
+            remaining = keyword.max_tweets_per_day - keyword.count_tweets_today()
+            if remaining <= 0:
+                self.logger.info(f"Daily limit reached for keyword '{keyword.text}'. Skipping...")
+                results[keyword.text] = 0
+                stats['skipped'] += 1
+                continue
+            
+            if max_tweets_per_keyword is None:
+                keyword_max_tweets = remaining
+            else:
+                keyword_max_tweets = min(remaining, max_tweets_per_keyword)
+            
+            keyword_start = time.monotonic()
+            try:
+                results[keyword.text] = await self.collector.collect_tweets_for_keyword(
+                    keyword, keyword_max_tweets
+                )
+                
+                # بروزرسانی زمان آخرین جستجو
+                keyword.update_last_search()
+            
+            except Exception as e:
+                self.logger.error(f"Error collecting tweets for keyword '{keyword.text}': {str(e)}")
+                results[keyword.text] = 0
+                stats['errors'] += 1
+            finally:
+                stats['keyword_durations'][keyword.text] = time.monotonic() - keyword_start
@@ -0,0 +1,161 @@
+# models/search.py
+import re
+from models.base import BaseModel
+
+class TweetSearch(BaseModel):
+    """جستجوی متن کامل توییت‌ها روی جدول FTS5 (به‌روزرسانی با triggerهای دیتابیس)"""
+    
+    TABLE_NAME = 'tweets_fts'
+    
+    # توکنایزر: حروف فارسی/عربی و لاتین توکن هستند؛ حروف بزرگ/کوچک و اعراب لاتین یکسان می‌شوند
+    TOKENIZER = 'unicode61 remove_diacritics 2'
+    
+    # یکسان‌سازی متن فارسی پیش از نمایه‌سازی و جستجو (در trigger با replace و در پایتون با translate)
+    NORMALIZATION = {
+        '\u064a': '\u06cc', '\u0649': '\u06cc',                    # ي ى → ی
+        '\u0643': '\u06a9',                                          # ك → ک
+        '\u0629': '\u0647', '\u06c0': '\u0647',                    # ة ۀ → ه
+        '\u0623': '\u0627', '\u0625': '\u0627', '\u0671': '\u0627',  # أ إ ٱ → ا
+        '\u0624': '\u0648',                                          # ؤ → و
+        '\u200c': ' ',                                               # نیم‌فاصله: اجزای کلمه توکن جدا هستند
+        '\u200e': '', '\u200f': '', '\u0640': '',                     # علائم جهت و کشیده
+        **{chr(code): '' for code in range(0x064b, 0x0653)},          # اعراب (فتحه، کسره، تنوین، تشدید، ...)
+        '\u0670': '',                                                # الف خنجری
+        **{chr(0x06f0 + digit): str(digit) for digit in range(10)},   # ارقام فارسی
+        **{chr(0x0660 + digit): str(digit) for digit in range(10)},   # ارقام عربی
+    }
+    _translation = str.maketrans(NORMALIZATION)
+    _token_regex = re.compile(r'(\w+)(\*?)')
+    
+    SORTS = ('rank', 'recent')
+    RESULT_COLUMNS = (
+        'id', 'twitter_id', 'user_id', 'content', 'created_at', 'language',
+        'retweet_count', 'like_count', 'reply_count', 'quote_count', 'view_count',
+        'importance_score', 'processing_status', 'filter_result'
+    )
+    
+    @classmethod
+    def normalize(cls, text):
+        """یکسان‌سازی متن برای نمایه FTS"""
+        return (text or '').translate(cls._translation)
+    
+    @classmethod
+    def normalize_sql(cls, expression, key=None, source=None, chunk_size=14):
+        """زیرکوئری SQL معادل normalize با ستون content (و ستون key در صورت نیاز) برای triggerها"""
+        # replaceهای تو در تو در چند زیرکوئری تقسیم می‌شوند تا از عمق مجاز parser بیشتر نشوند
+        carry = f"{key}, " if key else ''
+        query = f"SELECT {carry}COALESCE({expression}, '') AS content"
+        if source:
+            query += f" FROM {source}"
+        
+        items = list(cls.NORMALIZATION.items())
+        for i in range(0, len(items), chunk_size):
+            value = 'content'
+            for source_char, target in items[i:i + chunk_size]:
+                replacement = ''.join(f"char({ord(char)})" for char in target) or "''"
+                value = f"replace({value}, char({ord(source_char)}), {replacement})"
+            query = f"SELECT {carry}{value} AS content FROM ({query})"
+        return query
+    
+    @classmethod
+    def build_match_query(cls, text):
+        """تبدیل متن جستجوی کاربر به عبارت MATCH امن (AND همه کلمات؛ * در انتهای کلمه برای پیشوند)"""
+        terms = [
+            f'"{token}"{prefix}'
+            for token, prefix in cls._token_regex.findall(cls.normalize(text))
+        ]
+        if not terms:
+            raise ValueError("Search query has no searchable terms")
+        return ' '.join(terms)
+    
+    @classmethod
+    def search(cls, db, text, limit=20, sort='rank', cursor=None, status=None, language=None):
+        """جستجو با رتبه‌بندی bm25 یا جدیدترین؛ صفحه‌بندی keyset با cursor صفحه قبلی"""
+        if sort not in cls.SORTS:
+            raise ValueError(f"Unknown search sort: {sort}")
+        
+        conditions = [f"f.{cls.TABLE_NAME} MATCH :query"]
+        params = {'query': cls.build_match_query(text), 'limit': limit + 1}
+        
+        if status:
+            conditions.append("t.processing_status = :status")
+            params['status'] = status
+        if language:
+            conditions.append("t.language = :language")
+            params['language'] = language
+        
+        if sort == 'rank':
+            # rank کوچک‌تر یعنی تطابق بهتر
+            order = "f.rank ASC, t.id ASC"
+            if cursor:
+                params['cursor_rank'], params['cursor_id'] = cls.decode_cursor(cursor, sort)
+                conditions.append("(f.rank, t.id) > (:cursor_rank, :cursor_id)")
+        else:
+            order = "t.created_at DESC, t.id DESC"
+            if cursor:
+                params['cursor_created_at'], params['cursor_id'] = cls.decode_cursor(cursor, sort)
+                conditions.append("(t.created_at, t.id) < (:cursor_created_at, :cursor_id)")
+        
+        columns = ', '.join(f"t.{column}" for column in cls.RESULT_COLUMNS)
+        query = f"""
+            SELECT {columns}, f.rank AS rank
+            FROM {cls.TABLE_NAME} AS f JOIN tweets AS t ON t.id = f.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order}
+            LIMIT :limit
+        """
+        rows = [dict(row) for row in db.execute(query, params).fetchall()]
+        has_more = len(rows) > limit
+        return rows[:limit], has_more
+    
+    @staticmethod
+    def encode_cursor(row, sort='rank'):
+        """ساخت cursor صفحه بعد از آخرین ردیف نتایج"""
+        if sort == 'rank':
+            return f"{row['rank']!r}|{row['id']}"
+        return f"{row['created_at']}|{row['id']}"
+    
+    @staticmethod
+    def decode_cursor(cursor, sort='rank'):
+        """تبدیل cursor به (rank یا created_at, id)"""
+        value, separator, tweet_id = cursor.rpartition('|')
+        if not separator or not value:
+            raise ValueError(f"Invalid search cursor: {cursor}")
+        return (float(value) if sort == 'rank' else value), int(tweet_id)
+    
+    @classmethod
+    def match_ids(cls, db, terms, tweet_ids=None, chunk_size=500):
+        """ID توییت‌هایی که حداقل یکی از عبارت‌ها را دارند (معادل نمایه‌ای contains_required_keywords)"""
+        terms = [term for term in terms or [] if cls._token_regex.search(cls.normalize(term))]
+        if not terms:
+            return set()
+        
+        match = ' OR '.join(f"({cls.build_match_query(term)})" for term in terms)
+        query = f"SELECT rowid FROM {cls.TABLE_NAME} WHERE {cls.TABLE_NAME} MATCH ?"
+        if tweet_ids is None:
+            return {row[0] for row in db.execute(query, [match]).fetchall()}
+        
+        tweet_ids = list(tweet_ids)
+        ids = set()
+        for i in range(0, len(tweet_ids), chunk_size):
+            chunk = tweet_ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            chunk_query = f"{query} AND rowid IN ({placeholders})"
+            ids.update(row[0] for row in db.execute(chunk_query, [match] + chunk).fetchall())
+        return ids
+    
+    @classmethod
+    def backfill_keyword(cls, db, keyword_id, text):
+        """ارتباط توییت‌های ذخیره شده منطبق با یک کلمه کلیدی از طریق نمایه (بدون پیمایش کامل)"""
+        # زمان ارتباط همان زمان توییت است تا سهمیه روزانه کلمه کلیدی و تجمیع‌های امروز تغییر نکند
+        with db.transaction():
+            cursor = db.execute(f"""
+                INSERT OR IGNORE INTO tweet_keywords (tweet_id, keyword_id, relevance_score, created_at)
+                SELECT t.id, :keyword_id, 1.0, t.created_at
+                FROM {cls.TABLE_NAME} AS f JOIN tweets AS t ON t.id = f.rowid
+                WHERE f.{cls.TABLE_NAME} MATCH :query
+            """, {
+                'keyword_id': keyword_id,
+                'query': cls.build_match_query(text)
+            })
+        return cursor.rowcount
@@ -0,0 +1,209 @@
+# plugins/trends/sketches.py
+import hashlib
+import heapq
+import math
+import time
+import zlib
+from array import array
+
+class CountMinSketch:
+    """Count-Min Sketch: تخمین فراوانی هر مورد با حافظه ثابت (تخمین هرگز کمتر از مقدار واقعی نیست)"""
+    
+    def __init__(self, width=8192, depth=4, counts=None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array('I', bytes(4 * width * depth))
+    
+    def _indexes(self, item):
+        """خانه‌های هر ردیف با double hashing روی blake2b (پایدار بین اجراها برای checkpoint)"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+    
+    def add(self, item, count=1):
+        """افزودن با به‌روزرسانی محافظه‌کارانه (فقط خانه‌های کمینه افزایش می‌یابند)"""
+        indexes = self._indexes(item)
+        target = min(self.counts[index] for index in indexes) + count
+        for index in indexes:
+            if self.counts[index] < target:
+                self.counts[index] = target
+    
+    def estimate(self, item):
+        """تخمین فراوانی"""
+        return min(self.counts[index] for index in self._indexes(item))
+    
+    def to_bytes(self):
+        """سریال‌سازی فشرده (بیشتر خانه‌ها صفر هستند)"""
+        return zlib.compress(self.counts.tobytes())
+    
+    @classmethod
+    def from_bytes(cls, data, width=8192, depth=4):
+        """بازسازی از checkpoint؛ None اگر ابعاد با تنظیمات فعلی یکسان نباشد"""
+        counts = array('I')
+        counts.frombytes(zlib.decompress(data))
+        if len(counts) != width * depth:
+            return None
+        return cls(width, depth, counts)
+
+class SpaceSaving:
+    """الگوریتم Space-Saving: پرتکرارترین موارد با حداکثر capacity شمارنده (شمارش هر مورد حداکثر error بیش‌برآورد دارد)"""
+    
+    def __init__(self, capacity=100, counters=None):
+        self.capacity = capacity
+        # مورد ← [شمارش، خطا]
+        self.counters = counters if counters is not None else {}
+        # min-heap از (شمارش، مورد) با یک ورودی برای هر شمارنده؛ افزایش شمارش ورودی را به‌روز نمی‌کند
+        # (ورودی کهنه کمتر از مقدار واقعی است و فقط هنگام رسیدن به ریشه اصلاح می‌شود)
+        self.heap = [(counter[0], item) for item, counter in self.counters.items()]
+        heapq.heapify(self.heap)
+    
+    def add(self, item, count=1):
+        """افزودن؛ در صورت پر بودن، مورد با کمترین شمارش جایگزین می‌شود (O(log capacity) سرشکن)"""
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+            heapq.heappush(self.heap, (count, item))
+        else:
+            victim = self._minimum()
+            minimum = self.counters.pop(victim)[0]
+            self.counters[item] = [minimum + count, minimum]
+            heapq.heapreplace(self.heap, (minimum + count, item))
+    
+    def _minimum(self):
+        """مورد با کمترین شمارش در ریشه heap (ورودی‌های کهنه با شمارش فعلی دوباره درج می‌شوند)"""
+        while True:
+            count, item = self.heap[0]
+            current = self.counters[item][0]
+            if count == current:
+                return item
+            heapq.heapreplace(self.heap, (current, item))
+    
+    def items(self):
+        """(مورد، شمارش، خطا) همه شمارنده‌ها"""
+        return [(item, count, error) for item, (count, error) in self.counters.items()]
+    
+    def to_dict(self):
+        """سریال‌سازی برای checkpoint"""
+        return self.counters
+    
+    @classmethod
+    def from_dict(cls, data, capacity=100):
+        """بازسازی از checkpoint"""
+        return cls(capacity, {item: list(counter) for item, counter in data.items()})
+
+class TrendTracker:
+    """شمارش موارد در بازه‌های زمانی ثابت و تشخیص جهش نسبت به میانگین بازه‌های قبلی"""
+    
+    def __init__(self, bucket_seconds=3600, window_buckets=1, baseline_buckets=24,
+                 top_k=100, cms_width=8192, cms_depth=4):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = max(1, window_buckets)
+        self.baseline_buckets = max(1, baseline_buckets)
+        self.top_k = top_k
+        self.cms_width = cms_width
+        self.cms_depth = cms_depth
+        # شروع بازه ← {'cms': {kind: CountMinSketch}, 'topk': {(kind, scope): SpaceSaving}}
+        # top-k فقط برای بازه‌های پنجره فعلی و Count-Min برای همه بازه‌های پنجره و مبنا نگه داشته می‌شود
+        self.buckets = {}
+        self.dirty = set()
+    
+    def bucket_start(self, timestamp):
+        """شروع بازه شامل یک زمان"""
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+    
+    def window_start(self, now):
+        """شروع پنجره فعلی"""
+        return self.bucket_start(now) - (self.window_buckets - 1) * self.bucket_seconds
+    
+    def horizon(self, now):
+        """قدیمی‌ترین بازه نگه داشته شده (ابتدای بازه‌های مبنا)"""
+        return self.window_start(now) - self.baseline_buckets * self.bucket_seconds
+    
+    @staticmethod
+    def cms_key(scope, item):
+        """کلید Count-Min (یک sketch مشترک برای همه دامنه‌ها)"""
+        return f"{scope}\x1f{item}"
+    
+    def add(self, timestamp, kind, items, scopes=('',), now=None):
+        """ثبت موارد یک توییت در بازه زمان ایجاد آن (توییت‌های قدیمی‌تر از مبنا نادیده گرفته می‌شوند)"""
+        if not items:
+            return
+        now = time.time() if now is None else now
+        current = self.bucket_start(now)
+        bucket = min(self.bucket_start(timestamp), current)
+        if bucket < self.horizon(now):
+            return
+        
+        state = self.buckets.setdefault(bucket, {'cms': {}, 'topk': {}})
+        cms = state['cms'].get(kind)
+        if cms is None:
+            cms = state['cms'][kind] = CountMinSketch(self.cms_width, self.cms_depth)
+        in_window = bucket >= self.window_start(now)
+        
+        for scope in scopes:
+            topk = None
+            if in_window:
+                topk = state['topk'].get((kind, scope))
+                if topk is None:
+                    topk = state['topk'][(kind, scope)] = SpaceSaving(self.top_k)
+            for item in items:
+                cms.add(self.cms_key(scope, item))
+                if topk is not None:
+                    topk.add(item)
+        self.dirty.add(bucket)
+    
+    def expire(self, now=None):
+        """حذف بازه‌های خارج از مبنا و top-k بازه‌های خارج از پنجره"""
+        now = time.time() if now is None else now
+        horizon = self.horizon(now)
+        window_start = self.window_start(now)
+        for bucket in list(self.buckets):
+            if bucket < horizon:
+                del self.buckets[bucket]
+                self.dirty.discard(bucket)
+            elif bucket < window_start and self.buckets[bucket]['topk']:
+                self.buckets[bucket]['topk'] = {}
+    
+    def trends(self, kind, scope='', limit=20, min_count=2, now=None):
+        """موارد در حال جهش: شمارش پنجره فعلی در برابر میانگین بازه‌های مبنا (امتیاز شبیه z-score)"""
+        now = time.time() if now is None else now
+        window_start = self.window_start(now)
+        horizon = self.horizon(now)
+        current = {}
+        for bucket, state in self.buckets.items():
+            topk = state['topk'].get((kind, scope)) if bucket >= window_start else None
+            if topk is None:
+                continue
+            for item, count, error in topk.items():
+                total = current.setdefault(item, [0, 0])
+                total[0] += count
+                total[1] += error
+        
+        baseline_sketches = [
+            state['cms'][kind] for bucket, state in self.buckets.items()
+            if horizon <= bucket < window_start and kind in state['cms']
+        ]
+        
+        results = []
+        for item, (count, error) in current.items():
+            if count < min_count:
+                continue
+            key = self.cms_key(scope, item)
+            baseline = 0.0
+            if baseline_sketches:
+                # میانگین هر بازه مبنا (فقط بازه‌های دارای داده تا پس از راه‌اندازی مبنا صفر فرض نشود)
+                per_bucket = sum(cms.estimate(key) for cms in baseline_sketches) / len(baseline_sketches)
+                baseline = per_bucket * self.window_buckets
+            results.append({
+                'item': item,
+                'count': count,
+                'error': error,
+                'baseline': round(baseline, 2),
+                'score': round((count - baseline) / math.sqrt(baseline + 1), 3)
+            })
+        
+        results.sort(key=lambda result: (-result['score'], -result['count'], result['item']))
+        return results[:limit]
@@ -0,0 +1,122 @@
+# models/stats.py
+from datetime import datetime
+from models.base import BaseModel
+
+class StatsCounter(BaseModel):
+    """مدل شمارنده‌های تجمیعی (نگهداری شده توسط triggerهای دیتابیس)"""
+    
+    TABLE_NAME = 'stats_counters'
+    
+    def __init__(self, db, name=None, value=0):
+        super().__init__(db)
+        self.name = name
+        self.value = value
+    
+    @classmethod
+    def get(cls, db, name, default=0):
+        """دریافت مقدار یک شمارنده"""
+        query = f"SELECT value FROM {cls.TABLE_NAME} WHERE name = :name"
+        result = db.execute(query, {'name': name}).fetchone()
+        return result['value'] if result else default
+    
+    @classmethod
+    def get_all(cls, db):
+        """دریافت همه شمارنده‌ها به صورت دیکشنری نام به مقدار"""
+        query = f"SELECT name, value FROM {cls.TABLE_NAME}"
+        return {row['name']: row['value'] for row in db.execute(query).fetchall()}
+    
+    @classmethod
+    def get_summary(cls, db):
+        """آمار کلی داشبورد با یک کوئری روی جدول شمارنده‌ها"""
+        counters = cls.get_all(db)
+        by_status = {}
+        by_filter_result = {}
+        for name, value in counters.items():
+            if name.startswith('status:') and value:
+                by_status[name[len('status:'):]] = value
+            elif name.startswith('filter:') and value:
+                by_filter_result[name[len('filter:'):]] = value
+        
+        return {
+            'total_tweets': counters.get('tweets_total', 0),
+            'total_keywords': counters.get('keywords_total', 0),
+            'active_keywords': counters.get('keywords_active', 0),
+            'by_status': by_status,
+            'by_filter_result': by_filter_result
+        }
+    
+    @classmethod
+    def from_dict(cls, data, db):
+        """ایجاد مدل از دیکشنری"""
+        return cls(db=db, name=data.get('name'), value=data.get('value', 0))
+    
+    def to_dict(self):
+        """تبدیل مدل به دیکشنری"""
+        return {'name': self.name, 'value': self.value}
+
+
+class VolumeRollup(BaseModel):
+    """مدل تجمیع ساعتی/روزانه حجم توییت‌ها (نگهداری شده توسط triggerهای دیتابیس)"""
+    
+    TABLE_NAME = 'tweet_volume_rollups'
+    
+    # قالب برچسب بازه‌ها (سازگار با strftime در triggerها)
+    BUCKET_FORMATS = {
+        'hour': '%Y-%m-%d %H:00',
+        'day': '%Y-%m-%d',
+    }
+    DIMENSIONS = ('all', 'keyword', 'filter_result', 'language')
+    
+    def __init__(self, db, granularity=None, dimension=None, value=None, bucket=None, count=0):
+        super().__init__(db)
+        self.granularity = granularity
+        self.dimension = dimension
+        self.value = value
+        self.bucket = bucket
+        self.count = count
+    
+    @classmethod
+    def get_series(cls, db, start, end=None, granularity='day', dimension='all', value=''):
+        """سری زمانی تعداد توییت‌ها در بازه [start, end] برای یک بعد و مقدار"""
+        if granularity not in cls.BUCKET_FORMATS:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if dimension not in cls.DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        
+        bucket_format = cls.BUCKET_FORMATS[granularity]
+        query = f"""
+            SELECT bucket, count FROM {cls.TABLE_NAME}
+            WHERE granularity = :granularity AND dimension = :dimension AND value = :value
+              AND bucket >= :start_bucket AND bucket <= :end_bucket
+            ORDER BY bucket ASC
+        """
+        results = db.execute(query, {
+            'granularity': granularity,
+            'dimension': dimension,
+            'value': str(value) if value is not None else '',
+            'start_bucket': start.strftime(bucket_format),
+            'end_bucket': (end or datetime.now()).strftime(bucket_format)
+        }).fetchall()
+        return [{'bucket': row['bucket'], 'count': row['count']} for row in results]
+    
+    @classmethod
+    def from_dict(cls, data, db):
+        """ایجاد مدل از دیکشنری"""
+        return cls(
+            db=db,
+            granularity=data.get('granularity'),
+            dimension=data.get('dimension'),
+            value=data.get('value'),
+            bucket=data.get('bucket'),
+            count=data.get('count', 0)
+        )
+    
+    def to_dict(self):
+        """تبدیل مدل به دیکشنری"""
+        return {
+            'granularity': self.granularity,
+            'dimension': self.dimension,
+            'value': self.value,
+            'bucket': self.bucket,
+            'count': self.count
+        }
@@ -0,0 +1,84 @@
+# plugins/dashboard/stream.py
+import asyncio
+import json
+
+class StreamBroadcaster:
+    """پخش رویدادهای زنده به کلاینت‌های SSE با بافر محدود برای هر کلاینت"""
+    
+    def __init__(self, buffer_size=100, max_clients=500, heartbeat=15):
+        self.buffer_size = max(1, buffer_size)
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        # همه عملیات روی event loop سرور داشبورد انجام می‌شود (بدون قفل)
+        self.loop = None
+        self.clients = set()
+        self.sequence = 0
+        self.stats = {'published': 0, 'delivered': 0, 'dropped': 0, 'rejected': 0}
+    
+    @property
+    def has_clients(self):
+        """آیا کلاینت متصلی وجود دارد"""
+        return bool(self.clients) and self.loop is not None
+    
+    def connect(self):
+        """ثبت کلاینت جدید و برگرداندن صف آن؛ None در صورت رسیدن به سقف کلاینت‌ها"""
+        if len(self.clients) >= self.max_clients:
+            self.stats['rejected'] += 1
+            return None
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.buffer_size)
+        self.clients.add(queue)
+        return queue
+    
+    def disconnect(self, queue):
+        """حذف کلاینت"""
+        self.clients.discard(queue)
+    
+    def publish(self, event, data):
+        """ارسال یک رویداد به همه کلاینت‌ها؛ پیام یک بار سریال می‌شود"""
+        self.sequence += 1
+        message = f"id: {self.sequence}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self.stats['published'] += 1
+        
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(message)
+                self.stats['delivered'] += 1
+            except asyncio.QueueFull:
+                self._drop(queue)
+    
+    def _drop(self, queue):
+        """قطع کلاینت کند: بافر پر یعنی کلاینت از جریان رویدادها عقب مانده است"""
+        self.clients.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        # نشانگر پایان جریان برای تولیدکننده پاسخ همان کلاینت
+        queue.put_nowait(None)
+        self.stats['dropped'] += 1
+    
+    async def stream(self, queue):
+        """تولید بدنه پاسخ SSE یک کلاینت تا قطع اتصال یا حذف به دلیل کندی"""
+        try:
+            yield f"retry: {self.heartbeat * 1000}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # کامنت SSE برای باز نگه داشتن اتصال از پشت پراکسی‌ها
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                yield message
+        finally:
+            self.disconnect(queue)
+    
+    def get_stats(self):
+        """آمار پخش زنده"""
+        return {
+            **self.stats,
+            'clients': len(self.clients),
+            'buffer_size': self.buffer_size,
+            'max_clients': self.max_clients
+        }
@@ -0,0 +1,73 @@
+# tests/test_async_db.py
+import asyncio
+import sqlite3
+import threading
+import time
+import pytest
+from core.async_db import AsyncDatabase
+from models.keyword import Keyword
+
+@pytest.fixture
+def async_db(db):
+    """لایه ناهمگام روی دیتابیس موقت"""
+    async_db = AsyncDatabase(db, max_workers=2)
+    yield async_db
+    async_db.close()
+
+def test_fetch_and_execute(async_db):
+    async def run():
+        changed = await async_db.execute("INSERT INTO keywords (text) VALUES (?)", ('سلام',))
+        rows = await async_db.fetch_all("SELECT text FROM keywords")
+        row = await async_db.fetch_one("SELECT id, text FROM keywords WHERE text = ?", ('سلام',))
+        missing = await async_db.fetch_one("SELECT id FROM keywords WHERE text = 'x'")
+        count = await async_db.fetch_value("SELECT COUNT(*) FROM keywords")
+        return changed, rows, row, missing, count
+    
+    changed, rows, row, missing, count = asyncio.run(run())
+    assert changed == 1
+    assert rows == [{'text': 'سلام'}]
+    assert row == {'id': 1, 'text': 'سلام'}
+    assert missing is None
+    assert count == 1
+
+def test_queries_run_off_event_loop_thread(async_db):
+    async def run():
+        return threading.get_ident(), await async_db.run(threading.get_ident)
+    
+    loop_thread, worker_thread = asyncio.run(run())
+    assert worker_thread != loop_thread
+
+def test_slow_query_does_not_block_event_loop(async_db):
+    ticks = []
+    
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+    
+    async def run():
+        task = asyncio.create_task(ticker())
+        await async_db.run(time.sleep, 0.1)
+        task.cancel()
+    
+    asyncio.run(run())
+    assert len(ticks) > 5
+
+def test_model_query_async(async_db, db):
+    Keyword(db=db, text='سلام').save()
+    
+    async def run():
+        return await Keyword.query_async(async_db, 'get_by_text', 'سلام')
+    
+    keyword = asyncio.run(run())
+    assert keyword.text == 'سلام'
+
+def test_failed_execute_rolls_back_and_releases_writer(async_db, db):
+    async def run():
+        with pytest.raises(sqlite3.IntegrityError):
+            await async_db.execute("INSERT INTO keywords (id, text) VALUES (1, 'a'), (1, 'b')")
+        return await async_db.execute("INSERT INTO keywords (text) VALUES ('c')")
+    
+    assert asyncio.run(run()) == 1
+    assert not db.owns_writer()
+    assert [row['text'] for row in db.read("SELECT text FROM keywords")] == ['c']
@@ -0,0 +1,116 @@
+# tests/test_cache.py
+import asyncio
+import pytest
+from plugins.dashboard.cache import ResponseCache
+
+def counting_compute(calls, delay=0.01):
+    """تابع محاسبه ناهمگام که تعداد اجرا را می‌شمارد"""
+    async def compute():
+        calls.append(None)
+        await asyncio.sleep(delay)
+        return len(calls)
+    return compute
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResponseCache()
+    calls = []
+    
+    async def run():
+        return await asyncio.gather(*(
+            cache.get_or_compute('summary', counting_compute(calls)) for _ in range(5)
+        ))
+    
+    assert asyncio.run(run()) == [1] * 5
+    assert len(calls) == 1
+    assert cache.get('summary') == (True, 1)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.get_stats()['evictions'] == 1
+
+def test_expired_entry_is_recomputed(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('plugins.dashboard.cache.time.monotonic', lambda: clock[0])
+    cache = ResponseCache(ttl=30)
+    cache.set('a', 1)
+    clock[0] += 29
+    assert cache.get('a') == (True, 1)
+    clock[0] += 2
+    assert cache.get('a') == (False, None)
+    assert cache.get_stats()['expirations'] == 1
+
+def test_invalidate_by_tag():
+    cache = ResponseCache()
+    cache.set('summary', 1, tags=('tweets', 'keywords'))
+    cache.set('keywords', 2, tags=('keywords',))
+    cache.set('chart', 3, tags=('tweets',))
+    
+    assert cache.invalidate('keywords') == 2
+    assert list(cache.entries) == ['chart']
+    assert cache.invalidate() == 1
+    assert not cache.entries
+
+def test_result_computed_across_invalidation_is_not_stored():
+    cache = ResponseCache()
+    
+    async def compute():
+        cache.invalidate('tweets')
+        return 'stale'
+    
+    async def run():
+        return await cache.get_or_compute('summary', compute, tags=('tweets',))
+    
+    assert asyncio.run(run()) == 'stale'
+    assert cache.get('summary') == (False, None)
+
+def test_errors_propagate_and_are_not_cached():
+    cache = ResponseCache()
+    calls = []
+    
+    async def failing():
+        calls.append(None)
+        raise RuntimeError('database error')
+    
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.get_or_compute('summary', failing)
+    
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert not cache.pending
+
+def test_zero_ttl_disables_cache():
+    cache = ResponseCache(ttl=0)
+    calls = []
+    
+    async def run():
+        for _ in range(3):
+            await cache.get_or_compute('summary', counting_compute(calls, delay=0))
+    
+    asyncio.run(run())
+    assert len(calls) == 3
+    assert not cache.entries
+
+def test_cancelled_leader_does_not_strand_waiters():
+    cache = ResponseCache()
+    calls = []
+    
+    async def run():
+        leader = asyncio.create_task(cache.get_or_compute('summary', counting_compute(calls, delay=1)))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute('summary', counting_compute(calls, delay=0)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(follower, timeout=1)
+    
+    assert asyncio.run(run()) == 2
+    assert not cache.pending
+    assert cache.get('summary') == (True, 2)
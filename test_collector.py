@@ -0,0 +1,130 @@
+# tests/test_collector.py
+import asyncio
+import threading
+import httpx
+from models.keyword import Keyword
+from plugins.collector.collector import CollectorPlugin
+from plugins.collector.twitter_api import TwitterAPI
+
+def make_collector(app, pages):
+    """پلاگین جمع‌آوری با TwitterAPI روی transport ساختگی (صفحه‌ها به ترتیب cursor)"""
+    queries = []
+    
+    def handler(request):
+        queries.append(dict(request.url.params))
+        page = pages[int(request.url.params.get('cursor', 0))]
+        return httpx.Response(200, json=page)
+    
+    collector = CollectorPlugin(app)
+    collector.twitter_api = TwitterAPI('key', app.logger, transport=httpx.MockTransport(handler))
+    collector.max_pages_per_keyword = 5
+    return collector, queries
+
+def page(tweets, next_cursor=None):
+    return {'tweets': tweets, 'next_cursor': next_cursor, 'has_next_page': next_cursor is not None}
+
+def test_first_collection_follows_cursors_and_sets_high_water_mark(app, api_tweet):
+    keyword = Keyword(db=app.db, text='سلام').save()
+    pages = [
+        page([api_tweet(105, created_at='Tue Dec 10 09:00:00 +0000 2024'), api_tweet(104)], '1'),
+        page([api_tweet(103), api_tweet(102)], '2'),
+        page([api_tweet(101)])
+    ]
+    collector, queries = make_collector(app, pages)
+    
+    saved = asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=100))
+    assert saved == 5
+    assert len(queries) == 3
+    assert 'since:' not in queries[0]['query']
+    
+    keyword = Keyword.get_by_id(app.db, keyword.id)
+    assert keyword.last_tweet_id == '105'
+    assert keyword.last_tweet_at.isoformat() == '2024-12-10T09:00:00'
+
+def test_next_collection_stops_at_known_tweets(app, api_tweet):
+    keyword = Keyword(db=app.db, text='سلام').save()
+    collector, _ = make_collector(app, [page([api_tweet(102), api_tweet(101)])])
+    asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=100))
+    
+    keyword = Keyword.get_by_id(app.db, keyword.id)
+    pages = [
+        page([api_tweet(104, created_at='Tue Dec 10 10:00:00 +0000 2024'), api_tweet(103), api_tweet(102)], '1'),
+        page([api_tweet(50)])
+    ]
+    collector, queries = make_collector(app, pages)
+    saved = asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=100))
+    
+    assert saved == 2
+    assert len(queries) == 1
+    assert 'since:2024-12-10_07:00:30_UTC' in queries[0]['query']
+    assert Keyword.get_by_id(app.db, keyword.id).last_tweet_id == '104'
+
+def test_collection_stops_at_max_tweets(app, api_tweet):
+    keyword = Keyword(db=app.db, text='سلام').save()
+    pages = [page([api_tweet(i)], str(i + 1)) for i in range(5)]
+    collector, queries = make_collector(app, pages)
+    
+    saved = asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=2))
+    assert saved == 2
+    assert len(queries) == 2
+
+def test_collect_event_from_another_loop_runs_in_collector_loop(app, api_tweet):
+    keyword = Keyword(db=app.db, text='سلام').save()
+    collector, queries = make_collector(app, [page([api_tweet(1)])])
+    threads = []
+    collect = collector.collect_tweets_for_keyword
+    
+    async def recording_collect(keyword, max_tweets):
+        threads.append(threading.current_thread())
+        return await collect(keyword, max_tweets)
+    
+    collector.collect_tweets_for_keyword = recording_collect
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    collector.loop = loop
+    try:
+        # رویداد از loop دیگری (مانند سرور داشبورد) ارسال می‌شود
+        async def emit():
+            return collector._on_collect_tweets({'keyword': keyword, 'max_tweets': 10})
+        
+        future = asyncio.run(emit())
+        assert future.result(5) == 1
+        assert threads == [thread]
+        assert collector.twitter_api.loop is loop
+        asyncio.run_coroutine_threadsafe(collector.twitter_api.close(), loop).result(5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+def test_budget_cut_keeps_mark_and_resumes_the_gap(app, api_tweet):
+    keyword = Keyword(db=app.db, text='سلام').save()
+    collector, _ = make_collector(app, [page([api_tweet(100)])])
+    asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=100))
+    
+    # سقف توییت پیش از رسیدن به mark: mark ثابت می‌ماند و cursor ادامه ذخیره می‌شود
+    pages = [page([api_tweet(106), api_tweet(105)], '1'), page([api_tweet(104), api_tweet(103)], '2')]
+    collector, _ = make_collector(app, pages)
+    keyword = Keyword.get_by_id(app.db, keyword.id)
+    assert asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=2)) == 2
+    keyword = Keyword.get_by_id(app.db, keyword.id)
+    assert keyword.last_tweet_id == '100'
+    assert (keyword.resume_cursor, keyword.pending_tweet_id) == ('1', '106')
+    
+    # دور بعد: توییت‌های جدید، سپس پرش از توییت‌های دور قبل به cursor ذخیره شده تا رسیدن به mark
+    pages = {
+        0: page([api_tweet(107), api_tweet(106)], '5'),
+        1: page([api_tweet(104), api_tweet(103)], '2'),
+        2: page([api_tweet(102), api_tweet(101)], '3'),
+        3: page([api_tweet(100)])
+    }
+    collector, queries = make_collector(app, pages)
+    assert asyncio.run(collector.collect_tweets_for_keyword(keyword, max_tweets=100)) == 5
+    assert [query.get('cursor') for query in queries] == [None, '1', '2', '3']
+    
+    keyword = Keyword.get_by_id(app.db, keyword.id)
+    assert keyword.last_tweet_id == '107'
+    assert keyword.resume_cursor is None
+    stored = sorted(row[0] for row in app.db.read("SELECT twitter_id FROM tweets"))
+    assert stored == [str(i) for i in range(100, 108)]
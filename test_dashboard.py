@@ -0,0 +1,97 @@
+# tests/test_dashboard.py
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from models.export import TweetExport
+from models.tweet import Tweet
+from plugins.dashboard.dashboard import DashboardPlugin
+
+@pytest.fixture
+def dashboard(app, tmp_path, monkeypatch):
+    """پلاگین داشبورد بدون اجرای سرور uvicorn"""
+    monkeypatch.setattr(DashboardPlugin, '_run_server', lambda self, host, port: None)
+    plugin = DashboardPlugin(app)
+    plugin.static_dir = str(tmp_path)
+    plugin.initialize()
+    yield plugin
+    plugin.shutdown()
+
+@pytest.fixture
+def client(dashboard):
+    with TestClient(dashboard.fastapi_app) as client:
+        yield client
+
+def test_stats_are_cached_until_tweet_event(app, client, api_tweet):
+    Tweet.bulk_ingest(app.db, [api_tweet(i) for i in range(3)])
+    assert client.get('/api/stats').json()['total_tweets'] == 3
+    
+    Tweet.bulk_ingest(app.db, [api_tweet(3)])
+    assert client.get('/api/stats').json()['total_tweets'] == 3
+    
+    app.event_manager.emit('tweets_collected', results={}, cycle_stats={})
+    assert client.get('/api/stats').json()['total_tweets'] == 4
+    assert client.get('/api/cache').json()['hits'] == 1
+
+def test_adding_keyword_invalidates_keyword_results(client):
+    assert client.get('/api/stats').json()['active_keywords'] == 0
+    response = client.post('/keywords/add', data={'text': 'سلام'}, follow_redirects=False)
+    assert response.status_code == 303
+    assert client.get('/api/stats').json()['active_keywords'] == 1
+
+def test_published_tweets_reach_stream_clients(app, dashboard, api_tweet):
+    tweet_ids = Tweet.bulk_ingest(app.db, [api_tweet(i) for i in range(2)])['new_ids']
+    
+    async def run():
+        queue = dashboard.stream.connect()
+        await dashboard._publish_tweets('tweet_accepted', tweet_ids)
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        return messages
+    
+    messages = asyncio.run(run())
+    assert [message.split('\n')[1] for message in messages] == ['event: tweet_accepted'] * 2
+    data = json.loads(messages[0].split('data: ', 1)[1])
+    assert data['twitter_id'] == '0'
+    assert set(data) == set(DashboardPlugin.STREAM_COLUMNS)
+
+def test_stream_skips_queries_without_clients(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, '_publish_tweets', lambda event, tweet_ids: pytest.fail('queried without clients'))
+    dashboard._on_stream_accepted_tweets([{'tweet_id': 1}])
+
+def test_volume_chart_window_uses_utc_buckets(app, dashboard, api_tweet, monkeypatch):
+    # منطقه زمانی محلی دور از UTC تا جابجایی بازه‌ها آشکار شود
+    monkeypatch.setenv('TZ', 'Pacific/Kiritimati')
+    time.tzset()
+    try:
+        now = datetime.now(timezone.utc)
+        Tweet.bulk_ingest(app.db, [api_tweet(1, created_at=now.strftime('%a %b %d %H:%M:%S +0000 %Y'))])
+        chart = asyncio.run(dashboard._get_tweet_volume_data(days=1, granularity='hour'))
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
+    assert chart[-1] == {'date': now.strftime('%Y-%m-%d %H:00'), 'count': 1}
+
+def test_export_batches_are_read_on_one_thread(app, client, api_tweet, monkeypatch):
+    Tweet.bulk_ingest(app.db, [api_tweet(i) for i in range(5)])
+    execute = app.db.execute
+    threads = set()
+    
+    def recording_execute(query, params=None):
+        if 'FROM tweets AS t' in query:
+            threads.add(threading.current_thread().name)
+        return execute(query, params)
+    
+    monkeypatch.setattr(app.db, 'execute', recording_execute)
+    export = TweetExport.export
+    monkeypatch.setattr(TweetExport, 'export', lambda *args, **kwargs: export(*args, **kwargs, batch_size=2))
+    response = client.get('/api/export/tweets')
+    assert response.status_code == 200
+    assert [json.loads(line)['twitter_id'] for line in response.text.splitlines()] == ['0', '1', '2', '3', '4']
+    assert len(threads) == 1
+    assert threads.pop().startswith('export')
+    assert client.get('/api/export/users').status_code == 400
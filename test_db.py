@@ -0,0 +1,145 @@
+# tests/test_db.py
+import sqlite3
+import threading
+import time
+import pytest
+from models.keyword import Keyword
+
+def in_thread(func):
+    """اجرای تابع در یک thread جدا و برگرداندن نتیجه"""
+    result = {}
+    
+    def target():
+        result['value'] = func()
+    
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join(5)
+    return result['value']
+
+def count_keywords(db):
+    return db.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+
+def test_each_thread_reads_from_own_reader_connection(db):
+    main_reader = db.get_reader()
+    other_reader = in_thread(db.get_reader)
+    assert main_reader is db.get_reader()
+    assert other_reader is not main_reader
+    assert main_reader is not db.conn
+
+def test_reader_connections_are_read_only(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.get_reader().execute("INSERT INTO keywords (text) VALUES ('x')")
+
+def test_uncommitted_writes_visible_only_to_writer_thread(db):
+    db.execute("INSERT INTO keywords (text) VALUES ('a')")
+    assert db.owns_writer()
+    assert count_keywords(db) == 1
+    assert in_thread(lambda: count_keywords(db)) == 0
+    
+    db.commit()
+    assert not db.owns_writer()
+    assert in_thread(lambda: count_keywords(db)) == 1
+
+def test_second_writer_waits_for_commit(db):
+    db.execute("INSERT INTO keywords (text) VALUES ('a')")
+    started = threading.Event()
+    done = threading.Event()
+    
+    def write():
+        started.set()
+        db.execute("INSERT INTO keywords (text) VALUES ('b')")
+        db.commit()
+        done.set()
+    
+    thread = threading.Thread(target=write)
+    thread.start()
+    started.wait(5)
+    assert not done.wait(0.05)
+    
+    db.commit()
+    thread.join(5)
+    assert done.is_set()
+    assert count_keywords(db) == 2
+
+def test_read_snapshot_ignores_later_commits(db):
+    with db.read_snapshot():
+        before = count_keywords(db)
+        in_thread(lambda: Keyword(db=db, text='جدید').save())
+        assert count_keywords(db) == before
+    assert count_keywords(db) == before + 1
+    assert not db.get_reader().in_transaction
+
+def test_cursor_is_per_thread(db):
+    db.execute("INSERT INTO keywords (text) VALUES ('a')")
+    db.commit()
+    db.execute("SELECT text FROM keywords")
+    in_thread(lambda: db.execute("SELECT 1"))
+    assert db.fetch_one()['text'] == 'a'
+
+def test_failed_write_releases_writer_lock(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.execute("INSERT INTO missing_table VALUES (1)")
+    assert not db.owns_writer()
+    
+    def write():
+        db.execute("INSERT INTO keywords (text) VALUES ('b')")
+        db.commit()
+    
+    in_thread(write)
+    assert count_keywords(db) == 1
+
+def save_keyword(db, text):
+    return Keyword(db=db, text=text).save()
+
+def test_transaction_defers_model_commits(db):
+    with db.transaction():
+        save_keyword(db, 'a')
+        save_keyword(db, 'b')
+        assert db.in_transaction()
+        assert in_thread(lambda: count_keywords(db)) == 0
+    assert not db.owns_writer()
+    assert in_thread(lambda: count_keywords(db)) == 2
+
+def test_nested_transaction_rolls_back_inner_level_only(db):
+    with db.transaction():
+        save_keyword(db, 'outer')
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                save_keyword(db, 'inner')
+                raise RuntimeError('inner failure')
+        save_keyword(db, 'after')
+    texts = [row['text'] for row in db.read("SELECT text FROM keywords ORDER BY id")]
+    assert texts == ['outer', 'after']
+
+def test_transaction_error_rolls_back_everything(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            save_keyword(db, 'a')
+            raise RuntimeError('failure')
+    assert not db.owns_writer()
+    assert count_keywords(db) == 0
+
+def test_group_commit_flushes_after_max_writes(db):
+    db.configure_group_commit(max_writes=3, max_delay_ms=10000)
+    save_keyword(db, 'a')
+    save_keyword(db, 'b')
+    assert not db.owns_writer()
+    assert in_thread(lambda: count_keywords(db)) == 0
+    
+    save_keyword(db, 'c')
+    assert in_thread(lambda: count_keywords(db)) == 3
+
+def test_group_commit_flushes_after_delay(db):
+    db.configure_group_commit(max_writes=100, max_delay_ms=20)
+    save_keyword(db, 'a')
+    time.sleep(0.1)
+    assert in_thread(lambda: count_keywords(db)) == 1
+
+def test_group_commit_rollback_keeps_pending_writes_of_others(db):
+    db.configure_group_commit(max_writes=100, max_delay_ms=10000)
+    save_keyword(db, 'kept')
+    db.execute("INSERT INTO keywords (text) VALUES ('dropped')")
+    db.rollback()
+    db.flush()
+    assert [row['text'] for row in db.read("SELECT text FROM keywords")] == ['kept']
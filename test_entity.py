@@ -0,0 +1,85 @@
+# tests/test_entity.py
+import pytest
+import migrations.extract_entities as extract_migration
+from migrations.extract_entities import extract_entities
+from models.entity import TweetEntity
+from models.tweet import Tweet
+
+def texts(entities, entity_type):
+    return [entity['text'] for entity in entities if entity['entity_type'] == entity_type]
+
+def test_extract_from_text():
+    entities = TweetEntity.extract(None, (
+        'سلام #مهسا_امینی و #ایران‌ما #123 a#b &#39; @Ali_Reza hi@mail.com '
+        '$AAPL $5 https://x.com/a?b=1). «https://t.co/x»'
+    ))
+    assert texts(entities, 'hashtag') == ['مهسا_امینی', 'ایران‌ما']
+    assert texts(entities, 'mention') == ['ali_reza']
+    assert texts(entities, 'cashtag') == ['AAPL']
+    assert texts(entities, 'url') == ['https://x.com/a?b=1', 'https://t.co/x']
+    
+    mention = next(entity for entity in entities if entity['entity_type'] == 'mention')
+    assert mention['username'] == 'Ali_Reza'
+    assert (mention['start_index'], mention['end_index']) == (44, 53)
+
+def test_extract_prefers_api_entities_and_deduplicates():
+    tweet_data = {
+        'text': '#Tehran @Bob #TEHRAN #tehran',
+        'entities': {
+            'hashtags': [{'text': 'Tehran', 'indices': [0, 7]}],
+            'user_mentions': [{'id_str': 'u9', 'screen_name': 'Bob', 'indices': [8, 12]}],
+            'urls': []
+        }
+    }
+    entities = TweetEntity.extract(tweet_data)
+    assert [(entity['entity_type'], entity['text']) for entity in entities] == [('hashtag', 'tehran'), ('mention', 'bob')]
+    assert entities[1]['twitter_user_id'] == 'u9'
+    
+    entities = TweetEntity.extract(None, '#TEHRAN #tehran')
+    assert texts(entities, 'hashtag') == ['tehran']
+
+def test_ingest_links_mentions_once(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(9, text='من', author_id='u9', username='Bob')])
+    ids = Tweet.bulk_ingest(db, [
+        api_tweet(1, text='#Tehran @Bob', author_id='a', username='Amir'),
+        api_tweet(2, text='hi @Amir #TEHRAN $tsla', author_id='b', username='b')
+    ])['new_ids']
+    
+    mentions = {
+        entity.tweet_id: entity.mentioned_user_id
+        for tweet_id in ids for entity in TweetEntity.get_by_tweet_id(db, tweet_id)
+        if entity.entity_type == 'mention'
+    }
+    users = dict(db.read("SELECT username, id FROM twitter_users"))
+    assert mentions == {ids[0]: users['Bob'], ids[1]: users['Amir']}
+    assert TweetEntity.get_tweet_ids(db, 'hashtag', '#TeHRan') == ids[::-1]
+    assert TweetEntity.get_top(db, 'hashtag') == [{'text': 'tehran', 'count': 2}]
+    
+    Tweet.bulk_ingest(db, [api_tweet(2, text='hi @Amir #TEHRAN $tsla', author_id='b', username='b')])
+    assert [entity.text for entity in TweetEntity.get_by_tweet_id(db, ids[1])] == ['amir', 'tehran', 'TSLA']
+
+def test_backfill_resumes_after_failure(db, api_tweet, monkeypatch):
+    Tweet.bulk_ingest(db, [api_tweet(i, text=f"#tag{i % 3} @u{i % 2}") for i in range(10)])
+    db.execute("DELETE FROM tweet_entities")
+    db.commit()
+    
+    bulk_replace = TweetEntity.bulk_replace
+    calls = []
+    
+    def failing_replace(db, entities_by_tweet):
+        calls.append(None)
+        if len(calls) == 2:
+            raise RuntimeError('crash')
+        return bulk_replace(db, entities_by_tweet)
+    
+    monkeypatch.setattr(extract_migration.TweetEntity, 'bulk_replace', failing_replace)
+    with pytest.raises(RuntimeError):
+        extract_entities(db, batch_size=4)
+    assert extract_migration._get_progress(db) == 4
+    assert db.read("SELECT COUNT(*) FROM tweet_entities")[0][0] == 8
+    
+    monkeypatch.undo()
+    assert extract_entities(db, batch_size=4) == {'tweets': 6, 'entities': 12, 'last_id': 10}
+    assert extract_entities(db, batch_size=4)['tweets'] == 0
+    assert extract_entities(db, batch_size=4, restart=True)['tweets'] == 10
+    assert db.read("SELECT COUNT(*) FROM tweet_entities")[0][0] == 20
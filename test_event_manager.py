@@ -0,0 +1,194 @@
+# tests/test_event_manager.py
+import asyncio
+import threading
+from core.event_manager import EventManager
+
+def test_sync_events_dispatch_in_emitter_stack(logger):
+    events = EventManager(logger)
+    received = []
+    events.subscribe('tweet_accepted', lambda data: received.append(data['tweet_id']))
+    
+    events.emit('tweet_accepted', tweet_id=1)
+    assert received == [1]
+
+def test_async_event_is_queued_until_consumer_runs(logger):
+    events = EventManager(logger)
+    events.configure_async('new_tweet', queue_size=10)
+    received = []
+    events.subscribe('new_tweet', lambda data: received.append(data['tweet_id']))
+    
+    async def run():
+        for tweet_id in range(3):
+            events.emit('new_tweet', tweet_id=tweet_id)
+        queued = list(received)
+        await events.drain('new_tweet')
+        events.stop()
+        return queued
+    
+    assert asyncio.run(run()) == []
+    assert received == [0, 1, 2]
+
+def test_full_queue_drops_events_in_order(logger):
+    events = EventManager(logger)
+    events.configure_async('new_tweet', queue_size=2)
+    received = []
+    events.subscribe('new_tweet', lambda data: received.append(data['tweet_id']))
+    
+    async def run():
+        for tweet_id in range(4):
+            events.emit('new_tweet', tweet_id=tweet_id)
+        # رویدادهای صف پر خارج از ترتیب در پشته تولیدکننده پردازش نمی‌شوند
+        dispatched = list(received)
+        await events.drain('new_tweet')
+        events.stop()
+        return dispatched
+    
+    assert asyncio.run(run()) == []
+    assert received == [0, 1]
+    assert events.get_metrics()['new_tweet']['__dropped__'] == 2
+
+def test_emit_from_another_loop_uses_the_owner_queue(logger):
+    events = EventManager(logger)
+    events.configure_async('new_tweet', queue_size=10)
+    received = []
+    events.subscribe('new_tweet', lambda data: received.append((data['tweet_id'], threading.current_thread())))
+    
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def emit_in_owner():
+            events.emit('new_tweet', tweet_id=0)
+        
+        asyncio.run_coroutine_threadsafe(emit_in_owner(), loop).result(5)
+        
+        # انتشار از loop دیگر (مثلاً سرور داشبورد) صف را جایگزین نمی‌کند
+        async def emit_elsewhere():
+            events.emit('new_tweet', tweet_id=1)
+            await events.emit_async('new_tweet', tweet_id=2)
+        
+        asyncio.run(emit_elsewhere())
+        asyncio.run_coroutine_threadsafe(events.drain('new_tweet'), loop).result(5)
+        assert received == [(0, thread), (1, thread), (2, thread)]
+        assert events.queue_loops['new_tweet'] is loop
+    finally:
+        loop.call_soon_threadsafe(events.stop)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+def test_emit_async_waits_for_queue_space(logger):
+    events = EventManager(logger)
+    events.configure_async('new_tweet', queue_size=1)
+    received = []
+    
+    async def slow_handler(data):
+        await asyncio.sleep(0.01)
+        received.append(data['tweet_id'])
+    
+    events.subscribe('new_tweet', slow_handler)
+    
+    async def run():
+        for tweet_id in range(5):
+            await events.emit_async('new_tweet', tweet_id=tweet_id)
+            assert events.queues['new_tweet'].qsize() <= 1
+        await events.drain('new_tweet')
+        events.stop()
+    
+    asyncio.run(run())
+    assert received == [0, 1, 2, 3, 4]
+
+def test_consumers_process_queue_concurrently(logger):
+    events = EventManager(logger)
+    events.configure_async('new_tweet', queue_size=10, consumers=3)
+    state = {'running': 0, 'max_running': 0}
+    
+    async def handler(data):
+        state['running'] += 1
+        state['max_running'] = max(state['max_running'], state['running'])
+        await asyncio.sleep(0.01)
+        state['running'] -= 1
+    
+    events.subscribe('new_tweet', handler)
+    
+    async def run():
+        for tweet_id in range(6):
+            await events.emit_async('new_tweet', tweet_id=tweet_id)
+        await events.drain('new_tweet')
+        events.stop()
+    
+    asyncio.run(run())
+    assert state['max_running'] == 3
+
+def test_metrics_record_latency_and_errors(logger):
+    events = EventManager(logger)
+    
+    def failing(data):
+        raise RuntimeError('boom')
+    
+    def ok(data):
+        pass
+    
+    events.subscribe('tweet_accepted', failing)
+    events.subscribe('tweet_accepted', ok)
+    events.emit('tweet_accepted', tweet_id=1)
+    events.emit('tweet_accepted', tweet_id=2)
+    
+    metrics = events.get_metrics()['tweet_accepted']
+    assert metrics[failing.__qualname__]['errors'] == 2
+    assert metrics[ok.__qualname__]['calls'] == 2
+    assert metrics[ok.__qualname__]['errors'] == 0
+    assert metrics[ok.__qualname__]['avg_latency'] >= 0
+
+def test_batched_subscriber_receives_full_batches(logger):
+    events = EventManager(logger)
+    batches = []
+    single = []
+    events.subscribe('new_tweet', batches.append, batch_size=3, linger=10)
+    events.subscribe('new_tweet', lambda data: single.append(data['tweet_id']))
+    
+    async def run():
+        for tweet_id in range(7):
+            events.emit('new_tweet', tweet_id=tweet_id)
+        full = [[data['tweet_id'] for data in batch] for batch in batches]
+        events.flush_batches()
+        return full
+    
+    assert asyncio.run(run()) == [[0, 1, 2], [3, 4, 5]]
+    assert [data['tweet_id'] for data in batches[-1]] == [6]
+    assert single == list(range(7))
+
+def test_batch_is_flushed_after_linger(logger):
+    events = EventManager(logger)
+    batches = []
+    events.subscribe('new_tweet', batches.append, batch_size=100, linger=0.02)
+    
+    async def run():
+        events.emit('new_tweet', tweet_id=1)
+        events.emit('new_tweet', tweet_id=2)
+        assert batches == []
+        await asyncio.sleep(0.05)
+    
+    asyncio.run(run())
+    assert [[data['tweet_id'] for data in batch] for batch in batches] == [[1, 2]]
+
+def test_batch_without_event_loop_is_delivered_immediately(logger):
+    events = EventManager(logger)
+    batches = []
+    events.subscribe('new_tweet', batches.append, batch_size=100)
+    
+    events.emit('new_tweet', tweet_id=1)
+    assert batches == [[{'tweet_id': 1}]]
+
+def test_unsubscribe_flushes_pending_batch(logger):
+    events = EventManager(logger)
+    batches = []
+    events.subscribe('new_tweet', batches.append, batch_size=100, linger=10)
+    
+    async def run():
+        events.emit('new_tweet', tweet_id=1)
+        events.unsubscribe('new_tweet', batches.append)
+        events.emit('new_tweet', tweet_id=2)
+    
+    asyncio.run(run())
+    assert batches == [[{'tweet_id': 1}]]
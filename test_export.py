@@ -0,0 +1,115 @@
+# tests/test_export.py
+import csv
+from datetime import datetime
+import io
+import json
+import pytest
+from models.export import TweetExport
+from models.keyword import Keyword
+from models.tweet import Tweet
+
+@pytest.fixture
+def tweets(db, api_tweet):
+    """شش توییت در شش ثانیه متوالی؛ توییت‌های زوج به کلمه کلیدی دوم هم وصل‌اند"""
+    first = Keyword(db=db, text='اول').save()
+    second = Keyword(db=db, text='دوم').save()
+    data = [
+        api_tweet(i, text=f'متن، "{i}"\nخط دوم', created_at=f"Tue Dec 10 07:00:{i:02d} +0000 2024",
+                  author_id=str(1000 + i % 2), username=f"author{i % 2}")
+        for i in range(6)
+    ]
+    ids = Tweet.bulk_ingest(db, data, keyword_id=first.id)['new_ids']
+    Tweet.bulk_ingest(db, data[::2], keyword_id=second.id)
+    Tweet.bulk_update_filter_results(db, [(tweet_id, 'filtered_spam', 'rejected') for tweet_id in ids[::3]])
+    return ids
+
+def export_ndjson(db, table, **kwargs):
+    return [json.loads(line) for line in b''.join(TweetExport.export(db, table, **kwargs)).decode('utf-8').splitlines()]
+
+def test_ndjson_walks_all_rows_in_key_order(db, tweets):
+    rows = export_ndjson(db, 'tweets', batch_size=4)
+    assert [row['id'] for row in rows] == tweets
+    assert list(rows[0]) == list(Tweet.SUMMARY_COLUMNS)
+    
+    batches = list(TweetExport.iter_batches(db, 'tweets', batch_size=4))
+    assert [len(rows) for rows in batches] == [4, 2]
+
+def test_filters_combine(db, tweets):
+    rows = export_ndjson(db, 'tweets', keyword='دوم', start_at='2024-12-10T07:00:01')
+    assert [row['id'] for row in rows] == [tweets[2], tweets[4]]
+    
+    rows = export_ndjson(db, 'tweets', keyword=2, filter_result='rejected')
+    assert [row['id'] for row in rows] == [tweets[0]]
+    
+    rows = export_ndjson(db, 'tweets', end_at='2024-12-10T07:00:02')
+    assert [row['id'] for row in rows] == tweets[:2]
+    
+    links = export_ndjson(db, 'tweet_keywords', keyword=2, batch_size=2)
+    assert [row['tweet_id'] for row in links] == tweets[::2]
+    assert len(export_ndjson(db, 'tweet_keywords')) == 9
+
+def test_users_filtered_by_their_tweets_and_payload_decoded(db, tweets):
+    users = export_ndjson(db, 'twitter_users', include_payload=True)
+    assert [user['username'] for user in users] == ['author0', 'author1']
+    assert users[0]['profile_data']['userName'] == 'author0'
+    
+    users = export_ndjson(db, 'twitter_users', start_at='2024-12-10T07:00:05')
+    assert [user['username'] for user in users] == ['author1']
+
+def test_payload_author_reference_is_resolved(db, tweets):
+    rows = export_ndjson(db, 'tweets', include_payload=True, batch_size=4)
+    assert [row['tweet_data']['author']['userName'] for row in rows[:2]] == ['author0', 'author1']
+
+def test_csv_has_header_and_quotes_text(db, tweets):
+    data = b''.join(TweetExport.export(db, 'tweets', 'csv', batch_size=4)).decode('utf-8')
+    rows = list(csv.reader(io.StringIO(data)))
+    assert rows[0] == list(Tweet.SUMMARY_COLUMNS)
+    assert len(rows) == 7
+    content = rows[0].index('content')
+    assert rows[1][content] == 'متن، "0"\nخط دوم'
+    
+    empty = b''.join(TweetExport.export(db, 'tweets', 'csv', start_at='2030-01-01')).decode('utf-8')
+    assert empty == ','.join(Tweet.SUMMARY_COLUMNS) + '\r\n'
+
+def test_columnar_row_groups(db, tweets):
+    lines = [json.loads(line) for line in b''.join(
+        TweetExport.export(db, 'tweets', 'columnar', batch_size=4)
+    ).decode('utf-8').splitlines()]
+    assert lines[0] == {'table': 'tweets', 'columns': list(Tweet.SUMMARY_COLUMNS)}
+    assert [group['rows'] for group in lines[1:]] == [4, 2]
+    assert lines[1]['data']['id'] + lines[2]['data']['id'] == tweets
+
+def test_parquet_row_groups(db, tweets):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    data = b''.join(TweetExport.export(db, 'tweets', 'parquet', include_payload=True, batch_size=4))
+    table = parquet.read_table(io.BytesIO(data))
+    assert table.column('id').to_pylist() == tweets
+    assert parquet.ParquetFile(io.BytesIO(data)).num_row_groups == 2
+    assert json.loads(table.column('tweet_data')[0].as_py())['author']['userName'] == 'author0'
+
+def test_moved_partitions_are_exported_first(db, tweets, api_tweet, tmp_path):
+    recent = Tweet.bulk_ingest(db, [api_tweet(9, created_at='Sun Jun 01 07:00:30 +0000 2025')])['new_ids']
+    db.configure_partitions(str(tmp_path / 'partitions'))
+    db.partitions.apply_retention(hot_months=3, now=datetime(2025, 6, 15))
+    
+    rows = export_ndjson(db, 'tweets', batch_size=4)
+    assert [row['id'] for row in rows] == tweets + recent
+
+def test_export_reads_one_snapshot(db, tweets, api_tweet):
+    batches = TweetExport.iter_batches(db, 'tweets', batch_size=4)
+    first = next(batches)
+    # توییت جدید پس از شروع خروجی در دسته‌های بعدی دیده نمی‌شود
+    Tweet.bulk_ingest(db, [api_tweet(9, created_at='Sun Jun 01 07:00:30 +0000 2025')])
+    rest = [row for rows in batches for row in rows]
+    assert [row['id'] for row in first + rest] == tweets
+    assert not db.get_reader().in_transaction
+
+@pytest.mark.parametrize('kwargs', [
+    {'table': 'users'},
+    {'table': 'tweets', 'format': 'xml'},
+    {'table': 'tweets', 'keyword': 'ناموجود'},
+    {'table': 'tweets', 'start_at': 'دیروز'}
+])
+def test_invalid_parameters_raise_value_error(db, kwargs):
+    with pytest.raises(ValueError):
+        TweetExport.export(db, **kwargs)
@@ -0,0 +1,75 @@
+# tests/test_filter.py
+import asyncio
+from models.tweet import Tweet
+from plugins.filter.filter import FilterPlugin
+
+NORMAL_TEXT = 'یک توییت معمولی درباره اخبار امروز'
+SPAM_TEXT = 'Click HERE for a free offer right now'
+
+def ingest(db, api_tweet, texts):
+    result = Tweet.bulk_ingest(db, [api_tweet(i, text=text) for i, text in enumerate(texts)])
+    return result['new_ids']
+
+def test_new_tweet_batch_emits_tweet_accepted_per_tweet(app, api_tweet):
+    app.event_manager.configure_async('new_tweet')
+    plugin = FilterPlugin(app)
+    plugin.initialize()
+    accepted = []
+    app.event_manager.subscribe('tweet_accepted', lambda data: accepted.append(data['tweet_id']))
+    
+    tweet_ids = ingest(app.db, api_tweet, [NORMAL_TEXT, SPAM_TEXT, NORMAL_TEXT])
+    
+    async def run():
+        for tweet_id in tweet_ids:
+            await app.event_manager.emit_async('new_tweet', tweet_id=tweet_id)
+        await app.event_manager.drain('new_tweet')
+        app.event_manager.stop()
+    
+    asyncio.run(run())
+    assert accepted == [tweet_ids[0], tweet_ids[2]]
+    assert Tweet.get_by_id(app.db, tweet_ids[1]).processing_status == 'filtered_spam'
+
+def test_filter_batch_summary(app, api_tweet):
+    plugin = FilterPlugin(app)
+    tweet_ids = ingest(app.db, api_tweet, [NORMAL_TEXT, SPAM_TEXT, NORMAL_TEXT, 'کوتاه'])
+    
+    summary = plugin.filter_batch(tweet_ids, batch_size=2)
+    assert summary == {'filtered_accepted': 2, 'filtered_spam': 1, 'filtered_low_quality': 1}
+    assert plugin.filter_batch(tweet_ids) == {}
+
+def test_worker_pool_matches_in_process_classification(app):
+    texts = [NORMAL_TEXT, SPAM_TEXT, 'کوتاه', NORMAL_TEXT] * 3
+    plugin = FilterPlugin(app)
+    rows = [(i, text, 'fa') for i, text in enumerate(texts)]
+    expected = plugin._classify_rows(rows)
+    
+    plugin.workers = 2
+    try:
+        assert plugin._classify_rows(rows) == expected
+        assert asyncio.run(plugin._classify_rows_async(rows)) == expected
+    finally:
+        plugin.shutdown()
+
+def test_filter_batch_async_does_not_block_event_loop(app, api_tweet):
+    plugin = FilterPlugin(app)
+    plugin.workers = 2
+    tweet_ids = ingest(app.db, api_tweet, [NORMAL_TEXT, SPAM_TEXT] * 4)
+    statuses = []
+    
+    async def probe():
+        # اجرا در حین انتظار filter_batch_async برای پروسس‌های worker
+        await asyncio.sleep(0)
+        statuses.append(Tweet.get_by_id(app.db, tweet_ids[0]).processing_status)
+    
+    async def run():
+        coroutine = plugin._run_batch(tweet_ids)
+        assert asyncio.iscoroutine(coroutine)
+        summary, _ = await asyncio.gather(coroutine, probe())
+        return summary
+    
+    try:
+        summary = asyncio.run(run())
+    finally:
+        plugin.shutdown()
+    assert statuses == ['collected']
+    assert summary == {'filtered_accepted': 4, 'filtered_spam': 4}
@@ -0,0 +1,68 @@
+# tests/test_partitions.py
+from datetime import datetime
+import pytest
+from models.stats import StatsCounter
+from models.tweet import Tweet
+from plugins.retention.retention import RetentionPlugin
+
+NOW = datetime(2025, 6, 15)
+OLD = 'Tue Dec 10 07:00:30 +0000 2024'
+RECENT = 'Sun Jun 01 07:00:30 +0000 2025'
+
+@pytest.fixture
+def partitions(db, tmp_path):
+    """پارتیشن‌های ماهانه در دایرکتوری موقت"""
+    db.configure_partitions(str(tmp_path / 'partitions'))
+    return db.partitions
+
+def ingest(db, api_tweet, created_at, ids, **fields):
+    return Tweet.bulk_ingest(db, [api_tweet(i, created_at=created_at, **fields) for i in ids])
+
+def test_retention_is_opt_in(app, partitions, api_tweet):
+    ingest(app.db, api_tweet, OLD, range(3))
+    plugin = RetentionPlugin(app)
+    plugin.initialize()
+    assert not plugin.is_enabled()
+    assert plugin.retention_thread is None
+    
+    assert partitions.apply_retention(now=NOW) == {'moved': {}, 'archived': [], 'dropped': []}
+    assert app.db.read("SELECT COUNT(*) FROM tweets")[0][0] == 3
+
+def test_moved_month_stays_queryable_and_counted(db, partitions, api_tweet):
+    old_ids = ingest(db, api_tweet, OLD, range(3))['new_ids']
+    ingest(db, api_tweet, RECENT, range(3, 5))
+    summary = StatsCounter.get_summary(db)
+    
+    result = partitions.apply_retention(hot_months=3, now=NOW)
+    assert result['moved'] == {'2024-12': 3}
+    assert db.read("SELECT COUNT(*) FROM tweets")[0][0] == 2
+    assert StatsCounter.get_summary(db) == summary
+    
+    assert Tweet.get_by_id(db, old_ids[0]).twitter_id == '0'
+    assert Tweet.get_by_twitter_id(db, '1').id == old_ids[1]
+    page, has_more = Tweet.get_page(db, limit=10)
+    assert [tweet.twitter_id for tweet in page] == ['4', '3', '2', '1', '0']
+    assert not has_more
+
+def test_recollected_moved_tweets_are_not_inserted_again(db, partitions, api_tweet):
+    ingest(db, api_tweet, OLD, range(3))
+    partitions.apply_retention(hot_months=3, now=NOW)
+    
+    result = ingest(db, api_tweet, OLD, range(5), likeCount=9)
+    assert result['partitioned'] == 3
+    assert result['new'] == 2
+    assert sorted(row[0] for row in db.read("SELECT twitter_id FROM tweets")) == ['3', '4']
+
+def test_archived_month_is_not_reingested(db, partitions, api_tweet):
+    ingest(db, api_tweet, OLD, range(2))
+    result = partitions.apply_retention(hot_months=3, attached_months=4, now=NOW)
+    assert result['archived'] == ['2024-12']
+    assert StatsCounter.get_summary(db)['total_tweets'] == 0
+    
+    result = ingest(db, api_tweet, OLD, range(3))
+    assert result['partitioned'] == 3
+    assert db.read("SELECT COUNT(*) FROM tweets")[0][0] == 0
+    
+    partitions.restore('2024-12')
+    assert StatsCounter.get_summary(db)['total_tweets'] == 2
+    assert Tweet.get_by_twitter_id(db, '1') is not None
@@ -0,0 +1,74 @@
+# tests/test_payload_codec.py
+import json
+import pytest
+from core.payload_codec import MAGIC, PayloadCodec, decode_payload, zstd_available
+from migrations.compress_payloads import compress_payloads
+from models.tweet import Tweet
+
+PAYLOAD = {
+    'type': 'tweet', 'id': '42', 'text': 'سلام دنیا ' * 20, 'lang': 'fa',
+    'createdAt': 'Tue Dec 10 07:00:30 +0000 2024', 'likeCount': 3,
+    'author': {'id': '1001', 'userName': 'author', 'name': 'نویسنده'}
+}
+
+@pytest.mark.parametrize('algorithm, use_dictionary', [
+    ('zlib', True),
+    ('zlib', False),
+    pytest.param('zstd', True, marks=pytest.mark.skipif(not zstd_available(), reason='zstandard not installed')),
+])
+def test_compressed_round_trip(algorithm, use_dictionary):
+    encoded = PayloadCodec(algorithm, use_dictionary=use_dictionary).encode(PAYLOAD)
+    assert encoded.startswith(MAGIC)
+    assert len(encoded) < len(json.dumps(PAYLOAD, ensure_ascii=False).encode('utf-8'))
+    assert decode_payload(encoded) == PAYLOAD
+
+def test_dictionary_improves_small_payload_compression():
+    small = {'type': 'tweet', 'id': '42', 'text': 'سلام', 'lang': 'fa', 'likeCount': 0, 'retweetCount': 0}
+    with_dictionary = PayloadCodec('zlib', use_dictionary=True).encode(small)
+    without_dictionary = PayloadCodec('zlib', use_dictionary=False).encode(small)
+    assert len(with_dictionary) < len(without_dictionary)
+
+def test_plain_and_legacy_values():
+    codec = PayloadCodec('none')
+    assert decode_payload(codec.encode(PAYLOAD)) == PAYLOAD
+    assert PayloadCodec().encode({'id': '1'}) == '{"id":"1"}'
+    assert decode_payload(json.dumps(PAYLOAD)) == PAYLOAD
+    assert decode_payload(memoryview(PayloadCodec().encode(PAYLOAD))) == PAYLOAD
+    assert decode_payload(None) is None
+    assert decode_payload('') is None
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        PayloadCodec('lz4')
+    with pytest.raises(ValueError):
+        decode_payload(MAGIC + b'x\x00body')
+
+def test_ingest_stores_author_reference_and_expands_on_read(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(i, author_id='7', username='same') for i in range(3)])
+    stored = decode_payload(db.read("SELECT tweet_data FROM tweets LIMIT 1")[0][0])
+    assert stored['author'] == {'id': '7', **Tweet.AUTHOR_REF}
+    
+    tweet = Tweet.get_by_twitter_id(db, '0')
+    assert tweet.tweet_data['author']['userName'] == 'same'
+    assert tweet.tweet_data['author']['id'] == '7'
+
+def test_author_reference_expands_to_latest_profile(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(1, author={'id': '7', 'userName': 'old', 'followers': 10})])
+    Tweet.bulk_ingest(db, [api_tweet(2, author={'id': '7', 'userName': 'new', 'followers': 25})])
+    
+    author = Tweet.get_by_twitter_id(db, '1').tweet_data['author']
+    assert (author['userName'], author['followers']) == ('new', 25)
+    assert tuple(db.read("SELECT username, followers_count FROM twitter_users")[0]) == ('new', 25)
+
+def test_compress_payloads_rewrites_legacy_text(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(1, text='سلام دنیا ' * 20)])
+    tweet_data = decode_payload(db.read("SELECT tweet_data FROM tweets")[0][0])
+    tweet_data['author'] = {'id': '1001', 'userName': 'author'}
+    db.execute("UPDATE tweets SET tweet_data = ?", (json.dumps(tweet_data),))
+    db.commit()
+    
+    assert compress_payloads(db)['tweets'] == 1
+    stored = db.read("SELECT tweet_data FROM tweets")[0][0]
+    assert stored.startswith(MAGIC)
+    assert decode_payload(stored)['author'] == {'id': '1001', **Tweet.AUTHOR_REF}
+    assert compress_payloads(db)['tweets'] == 0
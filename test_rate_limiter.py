@@ -0,0 +1,82 @@
+# tests/test_rate_limiter.py
+import asyncio
+import time
+import pytest
+from plugins.collector.rate_limiter import TokenBucket, RateLimiter
+
+def test_bucket_refills_with_elapsed_time(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    bucket = TokenBucket(limit=60, window=60)
+    bucket.tokens = 0
+    
+    clock[0] += 30
+    bucket._refill()
+    assert bucket.tokens == pytest.approx(30)
+    
+    # سقف سطل از limit بیشتر نمی‌شود
+    clock[0] += 600
+    bucket._refill()
+    assert bucket.tokens == 60
+
+def test_acquire_waits_only_for_missing_token():
+    async def run():
+        bucket = TokenBucket(limit=20, window=1)
+        waits = [await bucket.acquire() for _ in range(20)]
+        started = time.monotonic()
+        extra_wait = await bucket.acquire()
+        return waits, extra_wait, time.monotonic() - started
+    
+    waits, extra_wait, elapsed = asyncio.run(run())
+    assert waits == [0] * 20
+    assert 0 < extra_wait <= 0.06
+    assert elapsed < 0.5
+
+def test_sync_from_headers_sets_remaining_and_blocks_when_exhausted():
+    rate_limits = {'search': {'limit': 60, 'remaining': 60, 'reset': 0}}
+    limiter = RateLimiter(rate_limits)
+    reset = int(time.time()) + 100
+    
+    limiter.sync_from_headers('search', {
+        'X-Rate-Limit-Limit': '30', 'X-Rate-Limit-Remaining': '12', 'X-Rate-Limit-Reset': str(reset)
+    })
+    bucket = limiter.get_bucket('search')
+    assert bucket.limit == 30
+    assert bucket.tokens == pytest.approx(12, abs=0.1)
+    assert rate_limits['search'] == {'limit': 30, 'remaining': 12, 'reset': reset}
+    assert bucket.blocked_until == 0
+    
+    limiter.sync_from_headers('search', {
+        'X-Rate-Limit-Limit': '30', 'X-Rate-Limit-Remaining': '0', 'X-Rate-Limit-Reset': str(reset)
+    })
+    assert bucket.blocked_until == reset + 1
+    
+    # پاسخ بدون هدرهای محدودیت نرخ وضعیت را تغییر نمی‌دهد
+    limiter.sync_from_headers('search', {})
+    assert rate_limits['search']['remaining'] == 0
+
+def test_new_window_restores_full_quota():
+    bucket = TokenBucket(limit=10, window=60)
+    bucket.sync(10, 1, time.time() - 1)
+    bucket._refill()
+    assert bucket.tokens == 10
+
+def test_block_for_delays_only_its_group():
+    async def run():
+        limiter = RateLimiter({})
+        limiter.block_for('search', 0.2)
+        started = time.monotonic()
+        await limiter.acquire('user_info')
+        other_group = time.monotonic() - started
+        await limiter.acquire('search')
+        return other_group, time.monotonic() - started
+    
+    other_group, blocked_group = asyncio.run(run())
+    assert other_group < 0.05
+    assert blocked_group >= 0.15
+
+def test_bucket_rejects_a_second_event_loop():
+    bucket = TokenBucket(10)
+    asyncio.run(bucket.acquire())
+    with pytest.raises(RuntimeError, match='another event loop'):
+        asyncio.run(bucket.acquire())
@@ -0,0 +1,51 @@
+# tests/test_rules.py
+import pytest
+from plugins.filter.rules import FilterRules, RuleEngine, classify_rows
+
+def classify_sequentially(text, language):
+    """مرجع: بررسی قواعد یکی پس از دیگری به ترتیب اولویت"""
+    if FilterRules.contains_spam_patterns(text):
+        return 'spam'
+    if FilterRules.contains_offensive_language(text, language):
+        return 'offensive'
+    if FilterRules.is_propaganda(text):
+        return 'propaganda'
+    if FilterRules.is_low_quality(text):
+        return 'low_quality'
+    return None
+
+SAMPLES = [
+    ('یک توییت معمولی درباره اخبار امروز', 'fa'),
+    ('Click HERE for a free offer right now', 'en'),
+    ('این متن کلمه_نامناسب1 دارد و طولانی است', 'fa'),
+    ('this has offensive_word1 inside a long sentence', 'en'),
+    ('لطفا رای_دهید_به نامزد ما در انتخابات', 'fa'),
+    ('رای_دهید_به ما و buy now از فروشگاه', 'fa'),
+    ('offensive_word1 then casino at the end of text', 'en'),
+    ('کوتاه', 'fa'),
+    ('aaaaaaaaaaaaaaaaaaaaaab', 'en'),
+    ('بله بله بله بله بله خوب', 'fa'),
+    ('see https://a.co/1 https://b.co/2 https://c.co/3 now', 'en'),
+    ('کلمه_نامناسب1 for an english reader with offensive_word2', 'en'),
+]
+
+@pytest.mark.parametrize('text, language', SAMPLES)
+def test_engine_matches_sequential_rules(text, language):
+    assert RuleEngine().classify(text, language) == classify_sequentially(text, language)
+
+def test_higher_priority_category_wins_regardless_of_position():
+    engine = FilterRules.engine()
+    assert engine.classify('رای_دهید_به ما و بعد buy now کنید', 'fa') == 'spam'
+    assert engine.classify('anything offensive_word1 and betting later', 'en') == 'spam'
+    assert engine.classify('offensive_word2 and فقط_یک_انتخاب here', 'en') == 'offensive'
+
+def test_offensive_words_match_whole_words_per_language():
+    engine = FilterRules.engine()
+    assert engine.classify('prefixoffensive_word1 is part of a longer word', 'en') is None
+    assert engine.classify('this sentence has kalame offensive_word1', 'fa') is None
+
+def test_classify_rows_reports_errors_per_row():
+    results = classify_rows([(1, 'buy now please, limited time', 'en'), (2, None, 'fa'), (3, 'یک توییت معمولی و کامل', 'fa')])
+    assert results[0] == (1, 'spam', None)
+    assert results[1][0] == 2 and results[1][1] is None and results[1][2]
+    assert results[2] == (3, None, None)
@@ -0,0 +1,79 @@
+# tests/test_scheduler.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+from models.keyword import Keyword
+from models.tweet import Tweet
+from plugins.collector.scheduler import CollectionScheduler
+
+class RecordingCollector:
+    """جمع‌آوری ساختگی: ثبت آرگومان‌ها و حداکثر تعداد اجرای همزمان"""
+    
+    def __init__(self, fail=()):
+        self.calls = {}
+        self.running = 0
+        self.max_running = 0
+        self.fail = set(fail)
+    
+    async def collect_tweets_for_keyword(self, keyword, max_tweets):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if keyword.text in self.fail:
+                raise RuntimeError('API error')
+            self.calls[keyword.text] = max_tweets
+            return max_tweets
+        finally:
+            self.running -= 1
+
+def make_keyword(db, text, **fields):
+    return Keyword(db=db, text=text, **fields).save()
+
+def test_order_keywords_by_priority_then_oldest_search(db):
+    now = datetime.now()
+    keywords = [
+        make_keyword(db, 'a', priority=5, last_search_at=now),
+        make_keyword(db, 'b', priority=9, last_search_at=now),
+        make_keyword(db, 'c', priority=5, last_search_at=now - timedelta(hours=1)),
+        make_keyword(db, 'd', priority=5)
+    ]
+    ordered = CollectionScheduler.order_keywords(keywords)
+    assert [keyword.text for keyword in ordered] == ['b', 'd', 'c', 'a']
+
+def test_run_cycle_bounds_concurrency(db, logger):
+    keywords = [make_keyword(db, f"k{i}") for i in range(6)]
+    collector = RecordingCollector()
+    scheduler = CollectionScheduler(collector, logger, concurrency=2)
+    
+    results = asyncio.run(scheduler.run_cycle(keywords, max_tweets_per_keyword=50))
+    assert results == {f"k{i}": 50 for i in range(6)}
+    assert collector.max_running == 2
+    assert scheduler.last_cycle_stats['keywords'] == 6
+    assert 0 < scheduler.last_cycle_stats['utilization'] <= 1
+    assert all(keyword.last_search_at for keyword in Keyword.get_all(db))
+
+def test_run_cycle_respects_daily_budget(db, logger, api_tweet):
+    spent = make_keyword(db, 'spent', max_tweets_per_day=3)
+    partial = make_keyword(db, 'partial', max_tweets_per_day=10)
+    # سهمیه روزانه توییت‌های امروز (زمان توییت به UTC) را می‌شمارد
+    today = datetime.now(timezone.utc).strftime('%a %b %d %H:%M:%S +0000 %Y')
+    Tweet.bulk_ingest(db, [api_tweet(i, created_at=today) for i in range(3)], keyword_id=spent.id)
+    Tweet.bulk_ingest(db, [api_tweet(i, created_at=today) for i in range(4)], keyword_id=partial.id)
+    Tweet.bulk_ingest(db, [api_tweet(9)], keyword_id=spent.id)
+    
+    collector = RecordingCollector()
+    scheduler = CollectionScheduler(collector, logger, concurrency=4)
+    results = asyncio.run(scheduler.run_cycle([spent, partial], max_tweets_per_keyword=100))
+    
+    assert results['spent'] == 0
+    assert 'spent' not in collector.calls
+    assert collector.calls['partial'] == 6
+    assert scheduler.last_cycle_stats['skipped'] == 1
+
+def test_run_cycle_isolates_keyword_errors(db, logger):
+    keywords = [make_keyword(db, 'ok'), make_keyword(db, 'broken')]
+    scheduler = CollectionScheduler(RecordingCollector(fail={'broken'}), logger, concurrency=2)
+    
+    results = asyncio.run(scheduler.run_cycle(keywords))
+    assert results == {'ok': 1000, 'broken': 0}
+    assert scheduler.last_cycle_stats['errors'] == 1
@@ -0,0 +1,69 @@
+# tests/test_search.py
+import pytest
+from models.keyword import Keyword
+from models.search import TweetSearch
+from models.tweet import Tweet
+
+def test_normalization_matches_arabic_and_persian_forms(db, api_tweet):
+    Tweet.bulk_ingest(db, [
+        api_tweet(1, text='كتاب علي را خواندم'),
+        api_tweet(2, text='کتاب‌ها روی میز است'),
+        api_tweet(3, text='موضوع دیگری است')
+    ])
+    rows, has_more = TweetSearch.search(db, 'کتاب')
+    assert sorted(row['twitter_id'] for row in rows) == ['1', '2']
+    assert not has_more
+    
+    rows, _ = TweetSearch.search(db, 'علی')
+    assert [row['twitter_id'] for row in rows] == ['1']
+    assert TweetSearch.normalize('۱۲۳ كِتاب') == '123 کتاب'
+
+def test_build_match_query_quotes_terms_and_keeps_prefix():
+    assert TweetSearch.build_match_query('سلام دنیا*') == '"سلام" "دنیا"*'
+    assert TweetSearch.build_match_query('a" OR b') == '"a" "OR" "b"'
+    with pytest.raises(ValueError):
+        TweetSearch.build_match_query('!!! ...')
+
+def test_search_pages_with_cursor(db, api_tweet):
+    Tweet.bulk_ingest(db, [
+        api_tweet(i, text=f"خبر شماره {i}", created_at=f"Tue Dec 10 07:00:{i:02d} +0000 2024")
+        for i in range(5)
+    ])
+    for sort in TweetSearch.SORTS:
+        seen = []
+        cursor = None
+        while True:
+            rows, has_more = TweetSearch.search(db, 'خبر', limit=2, sort=sort, cursor=cursor)
+            seen.extend(row['twitter_id'] for row in rows)
+            if not has_more:
+                break
+            cursor = TweetSearch.encode_cursor(rows[-1], sort)
+        assert sorted(seen) == [str(i) for i in range(5)]
+        if sort == 'recent':
+            assert seen == ['4', '3', '2', '1', '0']
+    
+    with pytest.raises(ValueError):
+        TweetSearch.search(db, 'خبر', sort='random')
+
+def test_match_ids_restricts_to_given_tweets(db, api_tweet):
+    ids = Tweet.bulk_ingest(db, [
+        api_tweet(1, text='بازار ارز امروز'),
+        api_tweet(2, text='قیمت طلا'),
+        api_tweet(3, text='بازار طلا')
+    ])['new_ids']
+    assert TweetSearch.match_ids(db, ['ارز', 'طلا']) == set(ids)
+    assert TweetSearch.match_ids(db, ['بازار'], tweet_ids=ids[1:]) == {ids[2]}
+    assert TweetSearch.match_ids(db, ['...']) == set()
+
+def test_backfill_links_with_tweet_time_outside_daily_budget(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(i, text=f"بازار ارز {i}") for i in range(3)])
+    Tweet.bulk_ingest(db, [api_tweet(9, text='موضوع دیگر')])
+    keyword = Keyword(db=db, text='ارز').save()
+    
+    assert TweetSearch.backfill_keyword(db, keyword.id, keyword.text) == 3
+    assert TweetSearch.backfill_keyword(db, keyword.id, keyword.text) == 0
+    rows = db.read("""
+        SELECT tk.created_at = t.created_at FROM tweet_keywords AS tk JOIN tweets AS t ON t.id = tk.tweet_id
+    """)
+    assert [row[0] for row in rows] == [1, 1, 1]
+    assert keyword.count_tweets_today() == 0
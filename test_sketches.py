@@ -0,0 +1,93 @@
+# tests/test_sketches.py
+import random
+from collections import Counter
+from plugins.trends.sketches import CountMinSketch, SpaceSaving, TrendTracker
+
+def zipf_stream(size, seed=7):
+    """جریان موارد با توزیع دم‌بلند"""
+    generator = random.Random(seed)
+    return [f"w{int(generator.paretovariate(1.1))}" for _ in range(size)]
+
+def reference_add(counters, capacity, item):
+    """Space-Saving مرجع با جستجوی خطی کمینه"""
+    if item in counters:
+        counters[item][0] += 1
+    elif len(counters) < capacity:
+        counters[item] = [1, 0]
+    else:
+        minimum = min(counter[0] for counter in counters.values())
+        victim = next(key for key, counter in counters.items() if counter[0] == minimum)
+        del counters[victim]
+        counters[item] = [minimum + 1, minimum]
+
+def test_count_min_never_underestimates_and_error_is_bounded():
+    stream = zipf_stream(20000)
+    truth = Counter(stream)
+    cms = CountMinSketch(width=1024, depth=4)
+    for item in stream:
+        cms.add(item)
+    
+    errors = [cms.estimate(item) - count for item, count in truth.items()]
+    assert min(errors) >= 0
+    # کران e/width × N با احتمال بالا
+    assert max(errors) <= 2.72 / 1024 * len(stream)
+    
+    restored = CountMinSketch.from_bytes(cms.to_bytes(), 1024, 4)
+    assert restored.counts == cms.counts
+    assert CountMinSketch.from_bytes(cms.to_bytes(), 512, 4) is None
+
+def test_space_saving_guarantees():
+    stream = zipf_stream(20000)
+    truth = Counter(stream)
+    topk = SpaceSaving(capacity=50)
+    for item in stream:
+        topk.add(item)
+    
+    assert len(topk.counters) == 50
+    assert sum(count for _, count, _ in topk.items()) == len(stream)
+    for item, count, error in topk.items():
+        assert count - error <= truth[item] <= count
+    # هر مورد با فراوانی بیش از N/capacity حتماً نگه داشته می‌شود
+    frequent = {item for item, count in truth.items() if count > len(stream) / 50}
+    assert frequent <= set(topk.counters)
+
+def test_space_saving_evicts_the_true_minimum():
+    stream = zipf_stream(5000, seed=3)
+    topk = SpaceSaving(capacity=20)
+    reference = {}
+    for item in stream:
+        topk.add(item)
+        reference_add(reference, 20, item)
+        assert sorted(counter[0] for counter in topk.counters.values()) == sorted(
+            counter[0] for counter in reference.values()
+        )
+    assert len(topk.heap) == len(topk.counters)
+
+def test_space_saving_restored_from_checkpoint_keeps_evicting_minimum():
+    topk = SpaceSaving(capacity=3)
+    for item in 'aaabbc':
+        topk.add(item)
+    restored = SpaceSaving.from_dict(topk.to_dict(), capacity=3)
+    restored.add('a')
+    restored.add('d')
+    assert restored.counters == {'a': [4, 0], 'b': [2, 0], 'd': [2, 1]}
+
+def test_tracker_scores_spike_against_baseline():
+    tracker = TrendTracker(bucket_seconds=3600, window_buckets=1, baseline_buckets=24, top_k=50, cms_width=1024)
+    now = 100 * 3600 + 1800
+    for hour in range(1, 25):
+        for _ in range(10):
+            tracker.add(now - 3600 * hour, 'hashtag', {'steady'}, now=now)
+    for _ in range(10):
+        tracker.add(now, 'hashtag', {'steady'}, now=now)
+    for _ in range(40):
+        tracker.add(now, 'hashtag', {'spike'}, scopes=('', '7'), now=now)
+    
+    trends = tracker.trends('hashtag', now=now)
+    assert [trend['item'] for trend in trends] == ['spike', 'steady']
+    assert trends[1]['baseline'] == 10
+    assert trends[1]['score'] == 0
+    assert [trend['item'] for trend in tracker.trends('hashtag', '7', now=now)] == ['spike']
+    
+    tracker.expire(now + 3600 * 30)
+    assert not tracker.buckets
@@ -0,0 +1,91 @@
+# tests/test_stats.py
+from datetime import timedelta
+from migrations.create_tables import rebuild_stats_counters, rebuild_volume_rollups
+from models.keyword import Keyword
+from models.stats import StatsCounter, VolumeRollup
+from models.tweet import Tweet
+
+def counted_summary(db):
+    """مرجع: شمارش مستقیم روی جداول اصلی"""
+    def group(column):
+        rows = db.read(f"SELECT {column} AS value, COUNT(*) AS n FROM tweets GROUP BY {column}")
+        return {row['value'] or '': row['n'] for row in rows}
+    
+    return {
+        'total_tweets': db.read("SELECT COUNT(*) FROM tweets")[0][0],
+        'total_keywords': db.read("SELECT COUNT(*) FROM keywords")[0][0],
+        'active_keywords': db.read("SELECT COUNT(*) FROM keywords WHERE is_active")[0][0],
+        'by_status': group('processing_status'),
+        'by_filter_result': group('filter_result')
+    }
+
+def test_counters_follow_inserts_updates_and_deletes(db, api_tweet):
+    ids = Tweet.bulk_ingest(db, [api_tweet(i) for i in range(5)])['new_ids']
+    Tweet.bulk_update_filter_results(db, [
+        (ids[0], 'filtered_accepted', 'accepted'),
+        (ids[1], 'filtered_spam', 'rejected'),
+        (ids[2], 'filtered_spam', 'rejected')
+    ])
+    db.execute("DELETE FROM tweets WHERE id = ?", (ids[1],))
+    db.commit()
+    
+    summary = StatsCounter.get_summary(db)
+    assert summary == counted_summary(db)
+    assert summary['total_tweets'] == 4
+    assert summary['by_status'] == {'collected': 2, 'filtered_accepted': 1, 'filtered_spam': 1}
+
+def test_keyword_counters_follow_activation(db):
+    first = Keyword(db=db, text='a').save()
+    Keyword(db=db, text='b').save()
+    Keyword(db=db, text='c', is_active=False).save()
+    first.is_active = False
+    first.save()
+    
+    summary = StatsCounter.get_summary(db)
+    assert (summary['total_keywords'], summary['active_keywords']) == (3, 1)
+    assert summary == counted_summary(db)
+
+def test_rebuild_matches_trigger_maintained_counters(db, api_tweet):
+    ids = Tweet.bulk_ingest(db, [api_tweet(i) for i in range(4)])['new_ids']
+    Tweet.bulk_update_filter_results(db, [(ids[0], 'filtered_low_quality', 'rejected')])
+    Keyword(db=db, text='a').save()
+    maintained = StatsCounter.get_all(db)
+    
+    rebuild_stats_counters(db)
+    rebuilt = StatsCounter.get_all(db)
+    assert {name: value for name, value in maintained.items() if value} == rebuilt
+
+def test_volume_rollups_follow_tweets_and_keyword_links(db, api_tweet):
+    keyword = Keyword(db=db, text='سلام').save()
+    tweets = [api_tweet(i) for i in range(3)]
+    tweets.append(api_tweet(3, created_at='Wed Dec 11 07:00:30 +0000 2024'))
+    ids = Tweet.bulk_ingest(db, tweets, keyword_id=keyword.id)['new_ids']
+    Tweet.bulk_update_filter_results(db, [(ids[0], 'filtered_spam', 'rejected')])
+    db.execute("DELETE FROM tweets WHERE id = ?", (ids[1],))
+    db.commit()
+    
+    first_day = Tweet.parse_api_created_at(tweets[0])
+    day = first_day.strftime('%Y-%m-%d')
+    
+    def series(**kwargs):
+        rows = VolumeRollup.get_series(db, first_day - timedelta(days=1), first_day + timedelta(days=2), **kwargs)
+        return {row['bucket']: row['count'] for row in rows}
+    
+    assert series()[day] == 2
+    assert sum(series().values()) == 3
+    assert sum(series(dimension='keyword', value=keyword.id).values()) == 3
+    assert series(dimension='filter_result', value='rejected') == {day: 1}
+    assert series(granularity='hour', dimension='language', value='fa') == {
+        first_day.strftime('%Y-%m-%d %H:00'): 2,
+        Tweet.parse_api_created_at(tweets[3]).strftime('%Y-%m-%d %H:00'): 1
+    }
+
+def test_rebuild_matches_trigger_maintained_rollups(db, api_tweet):
+    keyword = Keyword(db=db, text='سلام').save()
+    ids = Tweet.bulk_ingest(db, [api_tweet(i) for i in range(4)], keyword_id=keyword.id)['new_ids']
+    Tweet.bulk_update_filter_results(db, [(ids[0], 'filtered_accepted', 'accepted')])
+    query = "SELECT granularity, dimension, value, bucket, count FROM tweet_volume_rollups WHERE count > 0"
+    maintained = sorted(tuple(row) for row in db.read(query))
+    
+    rebuild_volume_rollups(db)
+    assert sorted(tuple(row) for row in db.read(query)) == maintained
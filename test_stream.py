@@ -0,0 +1,65 @@
+# tests/test_stream.py
+import asyncio
+import json
+from plugins.dashboard.stream import StreamBroadcaster
+
+def drain(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+def test_publish_serializes_once_for_all_clients():
+    async def run():
+        stream = StreamBroadcaster()
+        first, second = stream.connect(), stream.connect()
+        stream.publish('new_tweet', {'id': 1, 'content': 'سلام'})
+        return stream, drain(first), drain(second)
+    
+    stream, first, second = asyncio.run(run())
+    assert first == second
+    assert first[0] == 'id: 1\nevent: new_tweet\ndata: {"id": 1, "content": "سلام"}\n\n'
+    assert stream.get_stats()['delivered'] == 2
+
+def test_slow_client_is_dropped_without_affecting_others():
+    async def run():
+        stream = StreamBroadcaster(buffer_size=2)
+        slow, fast = stream.connect(), stream.connect()
+        for i in range(3):
+            stream.publish('new_tweet', {'id': i})
+            drain(fast)
+        return stream, drain(slow), fast
+    
+    stream, slow_messages, fast = asyncio.run(run())
+    assert slow_messages == [None]
+    assert stream.clients == {fast}
+    assert stream.get_stats()['dropped'] == 1
+
+def test_client_limit_is_enforced():
+    async def run():
+        stream = StreamBroadcaster(max_clients=1)
+        return stream, stream.connect(), stream.connect()
+    
+    stream, first, second = asyncio.run(run())
+    assert first is not None
+    assert second is None
+    assert stream.get_stats()['rejected'] == 1
+
+def test_stream_sends_heartbeat_messages_and_drop_notice():
+    async def run():
+        stream = StreamBroadcaster(heartbeat=0.01)
+        queue = stream.connect()
+        body = stream.stream(queue)
+        chunks = [await body.__anext__(), await body.__anext__()]
+        stream.publish('tweet_accepted', {'id': 7})
+        chunks.append(await body.__anext__())
+        stream._drop(queue)
+        chunks.extend([chunk async for chunk in body])
+        return stream, chunks
+    
+    stream, chunks = asyncio.run(run())
+    assert chunks[0].startswith('retry: ')
+    assert chunks[1] == ': keepalive\n\n'
+    assert json.loads(chunks[2].split('data: ', 1)[1]) == {'id': 7}
+    assert chunks[3] == 'event: dropped\ndata: {}\n\n'
+    assert not stream.clients
@@ -0,0 +1,69 @@
+# tests/test_trends.py
+import asyncio
+import threading
+from datetime import datetime, timezone
+import pytest
+from models.keyword import Keyword
+from models.tweet import Tweet
+from plugins.trends.trends import TrendsPlugin
+
+@pytest.fixture
+def trends(app):
+    """پلاگین روند با تنظیمات پیش‌فرض"""
+    plugin = TrendsPlugin(app)
+    plugin.initialize()
+    yield plugin
+    plugin.shutdown()
+
+@pytest.fixture
+def tweet_ids(db, api_tweet):
+    """توییت‌های همین لحظه با یک هشتگ مشترک، متصل به یک کلمه کلیدی"""
+    keyword = Keyword(db=db, text='انتخابات').save()
+    created_at = datetime.now(timezone.utc).strftime('%a %b %d %H:%M:%S +0000 %Y')
+    return Tweet.bulk_ingest(db, [
+        api_tweet(i, text=f"تحریم انتخابات #رای_نمی_دهم https://x.co/a @bob #Vote{i % 2}", created_at=created_at)
+        for i in range(6)
+    ], keyword_id=keyword.id)['new_ids']
+
+def test_extract_terms_skips_entities_and_stopwords():
+    terms = TrendsPlugin.extract_terms('سلام دنیا #انتخابات و این https://x.co/a @bob كتاب')
+    assert terms == {'سلام', 'دنیا', 'کتاب'}
+
+def test_process_tweets_and_checkpoint_restore(app, trends, tweet_ids):
+    trends.process_tweets(tweet_ids)
+    hashtags = trends.get_trends('hashtag')
+    assert hashtags[0]['item'] == 'رای_نمی_دهم'
+    assert hashtags[0]['count'] == 6
+    assert {trend['item'] for trend in trends.get_trends('term', keyword_id=1)} == {'تحریم', 'انتخابات'}
+    with pytest.raises(ValueError):
+        trends.get_trends('mention')
+    
+    assert trends.checkpoint() > 0
+    restored = TrendsPlugin(app)
+    restored.initialize()
+    try:
+        assert restored.get_trends('hashtag') == hashtags
+    finally:
+        restored.shutdown()
+
+def test_new_tweet_batches_are_processed_off_the_event_loop(trends, tweet_ids, monkeypatch):
+    process_tweets = trends.process_tweets
+    threads = []
+    
+    def recording_process(ids):
+        threads.append(threading.current_thread().name)
+        return process_tweets(ids)
+    
+    monkeypatch.setattr(trends, 'process_tweets', recording_process)
+    
+    async def run():
+        result = trends._on_new_tweets([{'tweet_id': tweet_id} for tweet_id in tweet_ids])
+        assert asyncio.iscoroutine(result)
+        await result
+    
+    asyncio.run(run())
+    assert threads[0].startswith('db-reader')
+    assert trends.get_trends('hashtag')[0]['count'] == 6
+    
+    trends._on_new_tweets([{'tweet_id': tweet_ids[0]}])
+    assert threads[1] == threading.current_thread().name
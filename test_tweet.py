@@ -0,0 +1,112 @@
+# tests/test_tweet.py
+import pytest
+from models.keyword import Keyword
+from models.tweet import Tweet
+
+def test_bulk_ingest_counts_new_and_updated(db, api_tweet):
+    result = Tweet.bulk_ingest(db, [api_tweet(1), api_tweet(2), api_tweet(2, likeCount=5)])
+    assert result['new'] == 2
+    assert result['updated'] == 0
+    assert len(result['new_ids']) == 2
+    
+    result = Tweet.bulk_ingest(db, [api_tweet(2, likeCount=9), api_tweet(3)])
+    assert result['new'] == 1
+    assert result['updated'] == 1
+    assert db.execute("SELECT COUNT(*) FROM tweets").fetchone()[0] == 3
+    assert Tweet.get_by_twitter_id(db, '2').like_count == 9
+
+def test_bulk_ingest_shares_authors(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(i, author_id='7', username='same') for i in range(5)])
+    assert db.execute("SELECT COUNT(*) FROM twitter_users").fetchone()[0] == 1
+    user_ids = {row[0] for row in db.execute("SELECT user_id FROM tweets").fetchall()}
+    assert user_ids == {db.execute("SELECT id FROM twitter_users").fetchone()[0]}
+
+def test_bulk_ingest_skips_tweets_without_stored_author(db, api_tweet):
+    result = Tweet.bulk_ingest(db, [api_tweet(1), api_tweet(2, author_id=None)])
+    assert result['new'] == 1
+    
+    # بدون نام کاربری ID کاربر موجود استفاده می‌شود و user_id نامعتبر نوشته نمی‌شود
+    result = Tweet.bulk_ingest(db, [api_tweet(1, likeCount=4, username=None), api_tweet(3, author_id='404', username=None)])
+    assert result['updated'] == 1
+    assert result['new'] == 0
+    dangling = db.execute("""
+        SELECT COUNT(*) FROM tweets WHERE user_id NOT IN (SELECT id FROM twitter_users)
+    """).fetchone()[0]
+    assert dangling == 0
+    assert Tweet.get_by_twitter_id(db, '1').like_count == 4
+
+
+def test_bulk_ingest_links_keyword(db, api_tweet):
+    db.execute("INSERT INTO keywords (text) VALUES ('سلام')")
+    db.commit()
+    result = Tweet.bulk_ingest(db, [api_tweet(i) for i in range(5)], keyword_id=1)
+    assert result['linked'] == 5
+    
+    result = Tweet.bulk_ingest(db, [api_tweet(i) for i in range(6)], keyword_id=1)
+    assert result['linked'] == 1
+    assert db.execute("SELECT COUNT(*) FROM tweet_keywords").fetchone()[0] == 6
+
+def test_get_page_walks_keyset_pages_with_ties(db, api_tweet):
+    # دو توییت در هر ثانیه تا ترتیب id برای مقادیر یکسان created_at بررسی شود
+    tweets = [api_tweet(i, created_at=f"Tue Dec 10 07:00:{i // 2:02d} +0000 2024") for i in range(7)]
+    Tweet.bulk_ingest(db, tweets)
+    expected = [row['id'] for row in db.read("SELECT id FROM tweets ORDER BY created_at DESC, id DESC")]
+    
+    seen = []
+    page, has_more = Tweet.get_page(db, limit=3)
+    seen.extend(tweet.id for tweet in page)
+    while has_more:
+        page, has_more = Tweet.get_page(db, limit=3, before=Tweet.encode_cursor(page[-1]))
+        seen.extend(tweet.id for tweet in page)
+    assert seen == expected
+    
+    # صفحه جدیدتر از cursor به ترتیب نزولی برگردانده می‌شود
+    oldest = Tweet.get_by_id(db, expected[-1])
+    page, has_more = Tweet.get_page(db, limit=2, after=Tweet.encode_cursor(oldest))
+    assert [tweet.id for tweet in page] == expected[-3:-1]
+    assert has_more
+
+def test_get_page_filters_status_and_rejects_bad_cursor(db, api_tweet):
+    ids = Tweet.bulk_ingest(db, [api_tweet(i) for i in range(3)])['new_ids']
+    Tweet.bulk_update_filter_results(db, [(ids[1], 'filtered_spam', 'rejected')])
+    
+    page, has_more = Tweet.get_page(db, status='collected')
+    assert sorted(tweet.id for tweet in page) == [ids[0], ids[2]]
+    assert not has_more
+    with pytest.raises(ValueError):
+        Tweet.get_page(db, before='not-a-cursor')
+
+def test_summary_queries_load_tweet_data_lazily(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(1, likeCount=3)])
+    tweet = Tweet.get_by_twitter_id(db, '1')
+    assert not tweet._tweet_data_loaded
+    assert tweet.tweet_data['likeCount'] == 3
+    assert tweet._tweet_data_loaded
+    
+    full = Tweet.get_by_twitter_id(db, '1', columns='*')
+    assert full._tweet_data_loaded
+    assert full.tweet_data == tweet.tweet_data
+
+def test_saving_summary_tweet_keeps_stored_tweet_data(db, api_tweet):
+    Tweet.bulk_ingest(db, [api_tweet(1, likeCount=3)])
+    stored = db.read("SELECT tweet_data FROM tweets")[0][0]
+    
+    tweet = Tweet.get_by_twitter_id(db, '1')
+    tweet.like_count = 8
+    tweet.save()
+    assert db.read("SELECT tweet_data FROM tweets")[0][0] == stored
+    assert Tweet.get_by_twitter_id(db, '1').like_count == 8
+
+def test_select_columns_rejects_unknown_columns():
+    assert Tweet.select_columns(('content',)) == 'id, content'
+    with pytest.raises(ValueError):
+        Tweet.select_columns(('content', 'password'))
+
+def test_keyword_links_use_tweet_time(db, api_tweet):
+    keyword = Keyword(db=db, text='سلام').save()
+    Tweet.bulk_ingest(db, [api_tweet(1)], keyword_id=keyword.id)
+    Tweet.bulk_ingest(db, [api_tweet(2, created_at='Wed Dec 11 08:00:00 +0000 2024')])
+    Tweet.get_by_twitter_id(db, '2').link_to_keyword(keyword.id)
+    
+    rows = db.read("SELECT created_at FROM tweet_keywords ORDER BY tweet_id")
+    assert [row[0] for row in rows] == ['2024-12-10T07:00:30', '2024-12-11T08:00:00']
@@ -0,0 +1,126 @@
+# tests/test_twitter_api.py
+import asyncio
+import json
+import threading
+from plugins.collector.twitter_api import TwitterAPI
+
+class MockAPIServer:
+    """سرور HTTP/1.1 محلی با keep-alive که اتصال‌های TCP پذیرفته شده را می‌شمارد"""
+    
+    def __init__(self, headers=None):
+        self.connections = 0
+        self.requests = []
+        self.headers = headers or {}
+        self.server = None
+        self.writers = []
+    
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+    
+    async def stop(self):
+        self.server.close()
+        for writer in self.writers:
+            writer.close()
+        await self.server.wait_closed()
+    
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self.writers.append(writer)
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                self.requests.append(request.split(b'\r\n', 1)[0].decode())
+                body = json.dumps({'tweets': [], 'has_next_page': False}).encode()
+                headers = ''.join(f"{name}: {value}\r\n" for name, value in self.headers.items())
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + headers.encode()
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+def test_requests_reuse_pooled_connection(logger):
+    async def run():
+        server = MockAPIServer()
+        api = TwitterAPI('key', logger, base_url=await server.start())
+        try:
+            for page in range(5):
+                await api.search_tweets('سلام', cursor=f"c{page}" if page else None)
+            stats = api.get_connection_stats()
+        finally:
+            await api.close()
+            await server.stop()
+        return server, stats, api
+    
+    server, stats, api = asyncio.run(run())
+    assert len(server.requests) == 5
+    assert server.connections == 1
+    assert stats['new_connections'] == 1
+    assert stats['reused_connections'] == 4
+    assert api.client is None
+
+def test_concurrent_requests_share_pool_limit(logger):
+    async def run():
+        server = MockAPIServer()
+        api = TwitterAPI('key', logger, base_url=await server.start(), max_connections=2)
+        try:
+            await asyncio.gather(*(api.search_tweets(f"q{i}") for i in range(8)))
+        finally:
+            await api.close()
+            await server.stop()
+        return server
+    
+    server = asyncio.run(run())
+    assert len(server.requests) == 8
+    assert server.connections <= 2
+
+def test_close_soon_closes_client_in_owning_loop(logger):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = MockAPIServer()
+    try:
+        base_url = asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+        api = TwitterAPI('key', logger, base_url=base_url)
+        asyncio.run_coroutine_threadsafe(api.search_tweets('سلام'), loop).result(5)
+        assert api.loop is loop
+        
+        # بستن از ترد دیگر در loop مالک اتصال‌ها انجام می‌شود
+        future = api.close_soon()
+        future.result(5)
+        assert api.client is None
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+def test_close_soon_keeps_task_in_running_loop(logger):
+    async def run():
+        server = MockAPIServer()
+        api = TwitterAPI('key', logger, base_url=await server.start())
+        await api.search_tweets('سلام')
+        task = api.close_soon()
+        assert isinstance(task, asyncio.Task)
+        await task
+        await server.stop()
+        return api
+    
+    assert asyncio.run(run()).client is None
+
+def test_close_soon_after_owning_loop_closed(logger):
+    async def run(api, server):
+        base_url = await server.start()
+        api.base_url = base_url
+        await api.search_tweets('سلام')
+        await server.stop()
+    
+    api = TwitterAPI('key', logger)
+    asyncio.run(run(api, MockAPIServer()))
+    assert api.close_soon() is None
+    assert api.client is None
@@ -0,0 +1,219 @@
+# plugins/trends/trends.py
+import asyncio
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from core.async_db import AsyncDatabase
+from plugins.base_plugin import BasePlugin
+from plugins.trends.sketches import TrendTracker, CountMinSketch, SpaceSaving
+from models.entity import TweetEntity
+from models.search import TweetSearch
+
+class TrendsPlugin(BasePlugin):
+    """پلاگین تشخیص هشتگ‌ها و کلمات در حال جهش با sketchهای جریانی (کل توییت‌ها و به تفکیک کلمه کلیدی)"""
+    
+    TABLE_NAME = 'trend_sketches'
+    KINDS = ('hashtag', 'term')
+    
+    # کلمات پرتکرار بی‌معنا در تشخیص روند (پس از یکسان‌سازی متن)
+    STOPWORDS = frozenset({
+        'این', 'برای', 'است', 'های', 'بود', 'اما', 'کرد', 'شده', 'کنند', 'نیز', 'باید', 'خود',
+        'شما', 'آنها', 'همه', 'کنیم', 'کند', 'دارد', 'دیگر', 'بین', 'ولی', 'روی', 'بعد', 'قبل',
+        'باشد', 'کرده', 'شود', 'شدن', 'خواهد', 'چون', 'حتی', 'همین', 'چند', 'هستند', 'نمی', 'میشه',
+        'the', 'and', 'for', 'that', 'this', 'with', 'you', 'are', 'was', 'but', 'not', 'have',
+        'has', 'from', 'they', 'will', 'what', 'all', 'just', 'your', 'can', 'about', 'amp', 'its',
+        'our', 'their', 'his', 'her', 'she', 'him', 'who', 'been', 'were', 'would', 'there', 'when',
+        'which', 'one', 'out', 'more', 'into', 'than', 'then', 'them', 'some', 'also', 'like', 'get'
+    })
+    _term_regex = re.compile(r'[^\W\d_]{3,}')
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self.tracker = None
+        self.async_db = None
+        self.checkpoint_interval = 300
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.checkpoint_thread = None
+    
+    def initialize(self):
+        """راه‌اندازی پلاگین"""
+        self.logger.info("Initializing Trends Plugin")
+        
+        self.tracker = TrendTracker(
+            bucket_seconds=self.config.getint('TRENDS', 'BUCKET_SECONDS', 3600),
+            window_buckets=self.config.getint('TRENDS', 'WINDOW_BUCKETS', 1),
+            baseline_buckets=self.config.getint('TRENDS', 'BASELINE_BUCKETS', 24),
+            top_k=self.config.getint('TRENDS', 'TOP_K', 100),
+            cms_width=self.config.getint('TRENDS', 'CMS_WIDTH', 8192),
+            cms_depth=self.config.getint('TRENDS', 'CMS_DEPTH', 4)
+        )
+        self.checkpoint_interval = self.config.getint('TRENDS', 'CHECKPOINT_INTERVAL', 300)
+        self.load_checkpoint()
+        
+        # کوئری‌های توییت‌های جدید در ترد worker اجرا می‌شوند تا event loop مسدود نشود
+        # (یک worker: دسته‌ها به ترتیب دریافت به sketchها اضافه می‌شوند)
+        self.async_db = AsyncDatabase(self.db, max_workers=1)
+        
+        # اشتراک در رویدادها (توییت‌های جدید به صورت دسته‌ای دریافت می‌شوند)
+        event_batch_size = self.config.getint('TRENDS', 'EVENT_BATCH_SIZE', 100)
+        event_linger_ms = self.config.getint('TRENDS', 'EVENT_LINGER_MS', 500)
+        self.event_manager.subscribe('new_tweet', self._on_new_tweets,
+                                     batch_size=event_batch_size, linger=event_linger_ms / 1000)
+        
+        # ذخیره دوره‌ای وضعیت sketchها در ترد پس‌زمینه
+        self.checkpoint_thread = threading.Thread(target=self._run_checkpoints, daemon=True)
+        self.checkpoint_thread.start()
+        
+        self.logger.info(f"Trends Plugin initialized ({len(self.tracker.buckets)} buckets restored)")
+    
+    def shutdown(self):
+        """توقف پلاگین"""
+        self.logger.info("Shutting down Trends Plugin")
+        self.stop_event.set()
+        if self.async_db:
+            self.async_db.close()
+        self.checkpoint()
+    
+    def _on_new_tweets(self, events):
+        """دسته رویدادهای توییت جدید"""
+        tweet_ids = [data['tweet_id'] for data in events if data.get('tweet_id')]
+        if tweet_ids:
+            return self._run_batch(tweet_ids)
+    
+    def _run_batch(self, tweet_ids):
+        """پردازش توییت‌های جدید؛ با event loop فعال، coroutine اجرای آن در ترد worker برگردانده می‌شود"""
+        if self.async_db is None:
+            return self.process_tweets(tweet_ids)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self.process_tweets(tweet_ids)
+        return self.async_db.run(self.process_tweets, tweet_ids)
+    
+    def _run_checkpoints(self):
+        """ذخیره وضعیت در فواصل تعیین شده"""
+        while not self.stop_event.wait(self.checkpoint_interval):
+            self.checkpoint()
+    
+    @classmethod
+    def extract_terms(cls, content):
+        """کلمات یکتای متن توییت بدون لینک، منشن، هشتگ و کلمات پرتکرار"""
+        for entity_type in ('url', 'mention', 'hashtag'):
+            content = TweetEntity.PATTERNS[entity_type].sub(' ', content or '')
+        content = TweetSearch.normalize(content).casefold()
+        return {term for term in cls._term_regex.findall(content) if term not in cls.STOPWORDS}
+    
+    def process_tweets(self, tweet_ids, chunk_size=500):
+        """به‌روزرسانی sketchها با هشتگ‌ها (از tweet_entities) و کلمات توییت‌های جدید"""
+        for i in range(0, len(tweet_ids), chunk_size):
+            chunk = tweet_ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            try:
+                tweets = self.db.execute(
+                    f"SELECT id, content, created_at FROM tweets WHERE id IN ({placeholders})", chunk
+                ).fetchall()
+                hashtags = {}
+                for row in self.db.execute(f"""
+                    SELECT tweet_id, text FROM tweet_entities
+                    WHERE entity_type = 'hashtag' AND tweet_id IN ({placeholders})
+                """, chunk).fetchall():
+                    hashtags.setdefault(row['tweet_id'], set()).add(row['text'])
+                scopes = {}
+                for row in self.db.execute(
+                    f"SELECT tweet_id, keyword_id FROM tweet_keywords WHERE tweet_id IN ({placeholders})", chunk
+                ).fetchall():
+                    scopes.setdefault(row['tweet_id'], ['']).append(str(row['keyword_id']))
+            except Exception as e:
+                self.logger.error(f"Error loading tweets for trends: {str(e)}")
+                continue
+            
+            with self.lock:
+                for tweet in tweets:
+                    timestamp = self._timestamp(tweet['created_at'])
+                    tweet_scopes = scopes.get(tweet['id'], [''])
+                    self.tracker.add(timestamp, 'hashtag', hashtags.get(tweet['id']), tweet_scopes)
+                    self.tracker.add(timestamp, 'term', self.extract_terms(tweet['content']), tweet_scopes)
+    
+    @staticmethod
+    def _timestamp(created_at):
+        """زمان ایجاد توییت (UTC ذخیره شده) به ثانیه"""
+        if not created_at:
+            return datetime.now(timezone.utc).timestamp()
+        return datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).timestamp()
+    
+    def get_trends(self, kind='hashtag', keyword_id=None, limit=20, min_count=2):
+        """موارد در حال جهش در پنجره فعلی"""
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown trend kind: {kind}")
+        scope = str(keyword_id) if keyword_id else ''
+        with self.lock:
+            return self.tracker.trends(kind, scope, limit=limit, min_count=min_count)
+    
+    def checkpoint(self):
+        """ذخیره بازه‌های تغییر کرده و حذف بازه‌های منقضی از دیتابیس"""
+        with self.lock:
+            self.tracker.expire()
+            buckets = sorted(self.tracker.dirty)
+            self.tracker.dirty.clear()
+            rows = []
+            for bucket in buckets:
+                state = self.tracker.buckets[bucket]
+                for kind, cms in state['cms'].items():
+                    rows.append((bucket, 'cms', kind, '', cms.to_bytes()))
+                for (kind, scope), topk in state['topk'].items():
+                    rows.append((bucket, 'topk', kind, scope, json.dumps(topk.to_dict(), ensure_ascii=False)))
+            horizon = self.tracker.horizon(self._now())
+            window_start = self.tracker.window_start(self._now())
+        
+        now = datetime.now().isoformat()
+        try:
+            with self.db.transaction():
+                self.db.execute_many(f"""
+                    INSERT INTO {self.TABLE_NAME} (bucket_start, sketch, kind, scope, data, updated_at)
+                    VALUES (:bucket_start, :sketch, :kind, :scope, :data, :updated_at)
+                    ON CONFLICT(bucket_start, sketch, kind, scope) DO UPDATE SET
+                        data = excluded.data, updated_at = excluded.updated_at
+                """, [
+                    {'bucket_start': bucket, 'sketch': sketch, 'kind': kind, 'scope': scope,
+                     'data': data, 'updated_at': now}
+                    for bucket, sketch, kind, scope, data in rows
+                ])
+                self.db.execute(f"""
+                    DELETE FROM {self.TABLE_NAME}
+                    WHERE bucket_start < :horizon OR (sketch = 'topk' AND bucket_start < :window_start)
+                """, {'horizon': horizon, 'window_start': window_start})
+        except Exception as e:
+            # بازه‌ها در checkpoint بعدی دوباره ذخیره می‌شوند
+            with self.lock:
+                self.tracker.dirty.update(bucket for bucket in buckets if bucket in self.tracker.buckets)
+            self.logger.error(f"Error saving trends checkpoint: {str(e)}")
+            return 0
+        
+        if rows:
+            self.logger.debug(f"Trends checkpoint saved ({len(buckets)} buckets, {len(rows)} sketches)")
+        return len(rows)
+    
+    def load_checkpoint(self):
+        """بازیابی sketchهای بازه‌های پنجره و مبنا از آخرین checkpoint"""
+        tracker = self.tracker
+        rows = self.db.execute(
+            f"SELECT bucket_start, sketch, kind, scope, data FROM {self.TABLE_NAME} WHERE bucket_start >= :horizon",
+            {'horizon': tracker.horizon(self._now())}
+        ).fetchall()
+        
+        window_start = tracker.window_start(self._now())
+        for row in rows:
+            state = tracker.buckets.setdefault(row['bucket_start'], {'cms': {}, 'topk': {}})
+            if row['sketch'] == 'cms':
+                cms = CountMinSketch.from_bytes(row['data'], tracker.cms_width, tracker.cms_depth)
+                if cms is not None:
+                    state['cms'][row['kind']] = cms
+            elif row['bucket_start'] >= window_start:
+                state['topk'][(row['kind'], row['scope'])] = SpaceSaving.from_dict(json.loads(row['data']), tracker.top_k)
+    
+    @staticmethod
+    def _now():
+        """زمان فعلی به ثانیه"""
+        return datetime.now(timezone.utc).timestamp()
@@ -1,12 +1,27 @@
 # models/tweet.py
-from datetime import datetime
+from datetime import datetime, timezone
 from models.base import BaseModel
+from models.user import TwitterUser
+from models.entity import TweetEntity
+from core.payload_codec import decode_payload
 
 class Tweet(BaseModel):
     """مدل توییت"""
     
     TABLE_NAME = 'tweets'
     
+    # ستون‌های فهرست‌ها (بدون بلاب JSON پاسخ خام API در tweet_data)
+    SUMMARY_COLUMNS = (
+        'id', 'twitter_id', 'user_id', 'content', 'created_at', 'collected_at',
+        'retweet_count', 'like_count', 'reply_count', 'quote_count', 'view_count',
+        'is_retweet', 'is_reply', 'is_quote', 'in_reply_to_id', 'language',
+        'is_sensitive', 'importance_score', 'importance_level', 'processing_status',
+        'filter_result', 'sentiment_score', 'content_category'
+    )
+    
+    # نشانگر ارجاع به پروفایل ذخیره شده در twitter_users به جای شیء کامل author
+    AUTHOR_REF = {'$ref': 'twitter_users'}
+    
     def __init__(self, db, id=None, twitter_id=None, user_id=None, content=None,
                  created_at=None, collected_at=None, retweet_count=0, like_count=0,
                  reply_count=0, quote_count=0, view_count=0, is_retweet=False,
@@ -40,6 +55,60 @@ class Tweet(BaseModel):
         self.content_category = content_category
         self.tweet_data = tweet_data or {}
     
+    @property
+    def tweet_data(self):
+        """داده خام API؛ فقط در اولین دسترسی خوانده، باز و از JSON تبدیل می‌شود"""
+        if not self._tweet_data_loaded:
+            self._tweet_data_raw = self._load_tweet_data()
+            self._tweet_data_loaded = True
+        if self._tweet_data is None:
+            self._tweet_data = self._expand_author(decode_payload(self._tweet_data_raw) or {})
+        return self._tweet_data
+    
+    @tweet_data.setter
+    def tweet_data(self, value):
+        self._set_tweet_data_raw(value)
+    
+    def _set_tweet_data_raw(self, raw, loaded=True):
+        """ثبت مقدار خام tweet_data (رشته JSON یا دیکشنری) بدون تبدیل"""
+        self._tweet_data_raw = raw
+        self._tweet_data = raw if isinstance(raw, dict) else None
+        self._tweet_data_loaded = loaded
+    
+    def _load_tweet_data(self):
+        """خواندن ستون tweet_data برای توییتی که بدون آن بارگذاری شده است"""
+        if not self.id:
+            return None
+        query = f"SELECT tweet_data FROM {self.TABLE_NAME} WHERE id = :id"
+        result = self._fetch_one(self.db, query, {'id': self.id}, tweet_id=self.id)
+        return result['tweet_data'] if result else None
+    
+    def _get_tweet_data_param(self):
+        """مقدار ذخیره tweet_data؛ مقدار خام تغییر نکرده بدون تبدیل مجدد نوشته می‌شود"""
+        if self._tweet_data is None:
+            if not self._tweet_data_loaded:
+                self._tweet_data_raw = self._load_tweet_data()
+                self._tweet_data_loaded = True
+            return self._tweet_data_raw
+        return self.db.payload_codec.encode(self.compact_tweet_data(self._tweet_data, self.user_id))
+    
+    @classmethod
+    def compact_tweet_data(cls, tweet_data, user_id):
+        """جایگزینی شیء author با ارجاع به پروفایل کاربر ذخیره شده (بدون تغییر دیکشنری ورودی)"""
+        author = tweet_data.get('author')
+        if not user_id or not isinstance(author, dict) or author.get('$ref'):
+            return tweet_data
+        compact = dict(tweet_data)
+        compact['author'] = {'id': author.get('id'), **cls.AUTHOR_REF}
+        return compact
+    
+    def _expand_author(self, tweet_data):
+        """جایگزینی ارجاع author با پروفایل ذخیره شده در twitter_users"""
+        author = tweet_data.get('author')
+        if isinstance(author, dict) and author.get('$ref') and self.user_id:
+            tweet_data['author'] = TwitterUser.get_profile_data(self.db, self.user_id) or {'id': author.get('id')}
+        return tweet_data
+    
     def save(self):
         """ذخیره توییت در دیتابیس"""
         if self.id:
@@ -76,7 +145,20 @@ class Tweet(BaseModel):
                  :filter_result, :sentiment_score, :content_category, :tweet_data)
             """
         
-        params = {
+        params = self._get_params()
+        
+        cursor = self.db.execute(query, params)
+        
+        if not self.id:
+            # دریافت ID ایجاد شده (از cursor همین دستور، نه cursor مشترک)
+            self.id = cursor.lastrowid
+        
+        self.db.commit()
+        return self
+    
+    def _get_params(self):
+        """پارامترهای ذخیره توییت در دیتابیس"""
+        return {
             'id': self.id,
             'twitter_id': self.twitter_id,
             'user_id': self.user_id,
@@ -100,17 +182,8 @@ class Tweet(BaseModel):
             'filter_result': self.filter_result,
             'sentiment_score': self.sentiment_score,
             'content_category': self.content_category,
-            'tweet_data': self.tweet_data
+            'tweet_data': self._get_tweet_data_param()
         }
-        
-        self.db.execute(query, params)
-        
-        if not self.id:
-            # دریافت ID ایجاد شده
-            self.id = self.db.cursor.lastrowid
-        
-        self.db.commit()
-        return self
     
     def update_stats(self, retweet_count=None, like_count=None, reply_count=None, 
                     quote_count=None, view_count=None):
@@ -195,39 +268,252 @@ class Tweet(BaseModel):
         self.db.commit()
         return self
     
+    def update_filter_result(self, status, filter_result):
+        """به‌روزرسانی وضعیت پردازش و نتیجه فیلتر با یک دستور"""
+        query = f"""
+            UPDATE {self.TABLE_NAME}
+            SET processing_status = :status, filter_result = :filter_result
+            WHERE id = :id
+        """
+        self.db.execute(query, {
+            'id': self.id,
+            'status': status,
+            'filter_result': filter_result
+        })
+        self.processing_status = status
+        self.filter_result = filter_result
+        self.db.commit()
+        return self
+    
+    @classmethod
+    def bulk_update_filter_results(cls, db, results):
+        """ثبت دسته‌ای نتایج فیلتر (لیست id, status, filter_result) در یک تراکنش"""
+        query = f"""
+            UPDATE {cls.TABLE_NAME}
+            SET processing_status = :status, filter_result = :filter_result
+            WHERE id = :id
+        """
+        with db.transaction():
+            db.execute_many(query, [
+                {'id': tweet_id, 'status': status, 'filter_result': filter_result}
+                for tweet_id, status, filter_result in results
+            ])
+    
+    @classmethod
+    def get_pending_for_filter(cls, db, tweet_ids=None, after_id=0, limit=1000):
+        """دریافت توییت‌های در انتظار فیلتر (فقط ستون‌های لازم برای فیلتر)"""
+        query = f"""
+            SELECT id, content, language FROM {cls.TABLE_NAME}
+            WHERE processing_status = 'collected' AND id > ?
+        """
+        params = [after_id]
+        if tweet_ids is not None:
+            query += f" AND id IN ({', '.join('?' for _ in tweet_ids)})"
+            params.extend(tweet_ids)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in db.execute(query, params).fetchall()]
+    
+    @classmethod
+    def select_columns(cls, columns=None):
+        """ستون‌های SELECT: پیش‌فرض ستون‌های خلاصه، '*' برای ردیف کامل یا لیستی از ستون‌ها"""
+        if columns == '*':
+            return '*'
+        columns = columns or cls.SUMMARY_COLUMNS
+        unknown = set(columns) - set(cls.SUMMARY_COLUMNS) - {'tweet_data'}
+        if unknown:
+            raise ValueError(f"Unknown tweet columns: {', '.join(sorted(unknown))}")
+        if 'id' not in columns:
+            # ID برای بارگذاری تنبل tweet_data لازم است
+            columns = ('id',) + tuple(columns)
+        return ', '.join(columns)
+    
     @classmethod
-    def get_by_id(cls, db, id):
+    def _fetch_one(cls, db, query, params, tweet_id=None):
+        """اجرای کوئری تک‌ردیفی روی جدول اصلی و در صورت نبود نتیجه روی پارتیشن‌های قدیمی"""
+        result = db.execute(query, params).fetchone()
+        if result is not None or db.partitions is None:
+            return result
+        
+        # با ID توییت فقط پارتیشن‌هایی که بازه ID آن‌ها شامل آن است بررسی می‌شوند
+        if tweet_id is not None:
+            keys = db.partitions.keys_for_tweet_id(tweet_id)
+        else:
+            keys = [partition['key'] for partition in db.partitions.candidates()]
+        for key in keys:
+            rows = db.partitions.read(key, query, params)
+            if rows:
+                return rows[0]
+        return None
+    
+    @classmethod
+    def get_by_id(cls, db, id, columns=None):
         """دریافت توییت با ID"""
-        query = f"SELECT * FROM {cls.TABLE_NAME} WHERE id = :id"
-        result = db.execute(query, {'id': id}).fetchone()
+        query = f"SELECT {cls.select_columns(columns)} FROM {cls.TABLE_NAME} WHERE id = :id"
+        result = cls._fetch_one(db, query, {'id': id}, tweet_id=id)
         if result:
             return cls.from_dict(dict(result), db)
         return None
     
     @classmethod
-    def get_by_twitter_id(cls, db, twitter_id):
+    def get_by_ids(cls, db, ids, columns=None, chunk_size=500):
+        """دریافت چند توییت با ID به همان ترتیب ورودی (توییت‌های ناموجود حذف می‌شوند)"""
+        ids = list(ids)
+        found = {}
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            query = f"SELECT {cls.select_columns(columns)} FROM {cls.TABLE_NAME} WHERE id IN ({placeholders})"
+            for row in db.execute(query, chunk).fetchall():
+                found[row['id']] = cls.from_dict(dict(row), db)
+        return [found[tweet_id] for tweet_id in ids if tweet_id in found]
+    
+    @classmethod
+    def get_by_twitter_id(cls, db, twitter_id, columns=None):
         """دریافت توییت با ID توییتر"""
-        query = f"SELECT * FROM {cls.TABLE_NAME} WHERE twitter_id = :twitter_id"
-        result = db.execute(query, {'twitter_id': twitter_id}).fetchone()
+        query = f"SELECT {cls.select_columns(columns)} FROM {cls.TABLE_NAME} WHERE twitter_id = :twitter_id"
+        result = cls._fetch_one(db, query, {'twitter_id': twitter_id})
         if result:
             return cls.from_dict(dict(result), db)
         return None
     
     @classmethod
-    def get_recent(cls, db, limit=10, offset=0):
+    def get_recent(cls, db, limit=10, offset=0, columns=None):
         """دریافت توییت‌های اخیر"""
         query = f"""
-            SELECT * FROM {cls.TABLE_NAME}
+            SELECT {cls.select_columns(columns)} FROM {cls.TABLE_NAME}
             ORDER BY created_at DESC
             LIMIT :limit OFFSET :offset
         """
         results = db.execute(query, {'limit': limit, 'offset': offset}).fetchall()
         return [cls.from_dict(dict(row), db) for row in results]
     
+    @classmethod
+    def get_page(cls, db, limit=50, status=None, before=None, after=None, columns=None):
+        """صفحه‌بندی keyset روی (created_at, id)؛ before صفحه قدیمی‌تر و after صفحه جدیدتر از cursor"""
+        conditions = []
+        params = {'limit': limit + 1}
+        
+        if status:
+            conditions.append("processing_status = :status")
+            params['status'] = status
+        
+        cursor = before or after
+        if cursor:
+            params['cursor_created_at'], params['cursor_id'] = cls.decode_cursor(cursor)
+            operator = '<' if before else '>'
+            conditions.append(f"(created_at, id) {operator} (:cursor_created_at, :cursor_id)")
+        
+        # برای صفحه جدیدتر به ترتیب صعودی خوانده و سپس معکوس می‌شود
+        order = 'ASC' if after and not before else 'DESC'
+        query = f"SELECT {cls.select_columns(columns)} FROM {cls.TABLE_NAME}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY created_at {order}, id {order} LIMIT :limit"
+        
+        rows = db.execute(query, params).fetchall()
+        if db.partitions is not None:
+            rows = cls._merge_partition_page(db, query, params, rows, limit, order,
+                                             params.get('cursor_created_at'))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if order == 'ASC':
+            rows.reverse()
+        
+        return [cls.from_dict(dict(row), db) for row in rows], has_more
+    
+    @classmethod
+    def _merge_partition_page(cls, db, query, params, rows, limit, order, cursor_created_at=None):
+        """ادغام نتایج keyset جدول اصلی با پارتیشن‌هایی که بازه زمانی‌شان می‌تواند در صفحه باشد"""
+        descending = order == 'DESC'
+        candidates = db.partitions.candidates(
+            descending=descending,
+            before=cursor_created_at if descending else None,
+            after=cursor_created_at if not descending else None
+        )
+        sort_key = lambda row: (row['created_at'], row['id'])
+        
+        for partition in candidates:
+            # صفحه کامل است و همه ردیف‌های این پارتیشن (و پارتیشن‌های بعدی) خارج از آن هستند
+            if len(rows) > limit:
+                boundary = rows[limit]['created_at']
+                if (boundary >= partition['end_at']) if descending else (boundary < partition['start_at']):
+                    break
+            rows = sorted(list(rows) + db.partitions.read(partition['key'], query, params),
+                          key=sort_key, reverse=descending)[:limit + 1]
+        return rows
+    
+    @staticmethod
+    def encode_cursor(tweet):
+        """ساخت cursor صفحه‌بندی از یک توییت"""
+        return f"{tweet.created_at.isoformat()}|{tweet.id}"
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """تبدیل cursor صفحه‌بندی به (created_at, id)"""
+        created_at, separator, tweet_id = cursor.rpartition('|')
+        if not separator or not created_at:
+            raise ValueError(f"Invalid pagination cursor: {cursor}")
+        return created_at, int(tweet_id)
+    
+    @classmethod
+    def get_ids_by_twitter_ids(cls, db, twitter_ids, chunk_size=500):
+        """دریافت نگاشت ID توییتر به ID داخلی برای چند توییت"""
+        ids = {}
+        for i in range(0, len(twitter_ids), chunk_size):
+            chunk = twitter_ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            query = f"SELECT id, twitter_id FROM {cls.TABLE_NAME} WHERE twitter_id IN ({placeholders})"
+            for row in db.execute(query, chunk).fetchall():
+                ids[row['twitter_id']] = row['id']
+        return ids
+    
+    @staticmethod
+    def _utc_now():
+        """زمان فعلی به UTC بدون منطقه زمانی (هم‌قالب created_at ذخیره شده)"""
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    
+    @classmethod
+    def parse_api_created_at(cls, tweet_data):
+        """تبدیل زمان ایجاد توییت در پاسخ API به datetime (UTC)"""
+        if 'createdAt' not in tweet_data:
+            return cls._utc_now()
+        
+        created_at = tweet_data.get('createdAt', '')
+        try:
+            # قالب API: Tue Dec 10 07:00:30 +0000 2024
+            parsed = datetime.strptime(created_at, '%a %b %d %H:%M:%S %z %Y')
+            return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        except ValueError:
+            return datetime.strptime(created_at.split('+')[0], '%a %b %d %H:%M:%S %Y')
+    
+    @classmethod
+    def from_api_data(cls, db, tweet_data, user_id):
+        """ایجاد مدل از داده خام API توییتر"""
+        return cls(
+            db=db,
+            twitter_id=tweet_data.get('id'),
+            user_id=user_id,
+            content=tweet_data.get('text', ''),
+            created_at=cls.parse_api_created_at(tweet_data),
+            retweet_count=tweet_data.get('retweetCount', 0),
+            like_count=tweet_data.get('likeCount', 0),
+            reply_count=tweet_data.get('replyCount', 0),
+            quote_count=tweet_data.get('quoteCount', 0),
+            view_count=tweet_data.get('viewCount', 0),
+            is_retweet='retweetedStatus' in tweet_data,
+            is_reply='inReplyToId' in tweet_data and tweet_data['inReplyToId'],
+            is_quote='quotedStatus' in tweet_data,
+            in_reply_to_id=tweet_data.get('inReplyToId'),
+            language=tweet_data.get('lang'),
+            is_sensitive=tweet_data.get('possiblySensitive', False),
+            tweet_data=tweet_data
+        )
+    
     @classmethod
     def from_dict(cls, data, db):
         """ایجاد مدل از دیکشنری"""
-        return cls(
+        tweet = cls(
             db=db,
             id=data.get('id'),
             twitter_id=data.get('twitter_id'),
@@ -251,9 +537,11 @@ class Tweet(BaseModel):
             processing_status=data.get('processing_status', 'collected'),
             filter_result=data.get('filter_result', 'pending'),
             sentiment_score=data.get('sentiment_score'),
-            content_category=data.get('content_category'),
-            tweet_data=data.get('tweet_data', {})
+            content_category=data.get('content_category')
         )
+        # tweet_data در صورت انتخاب نشدن در کوئری، هنگام دسترسی بارگذاری می‌شود
+        tweet._set_tweet_data_raw(data.get('tweet_data'), loaded='tweet_data' in data)
+        return tweet
     
     def to_dict(self):
         """تبدیل مدل به دیکشنری"""
@@ -285,7 +573,7 @@ class Tweet(BaseModel):
         }
         
     def link_to_keyword(self, keyword_id, relevance_score=1.0):
-        """ایجاد ارتباط با یک کلمه کلیدی"""
+        """ایجاد ارتباط با یک کلمه کلیدی (زمان ارتباط: زمان توییت به UTC)"""
         query = """
             INSERT OR IGNORE INTO tweet_keywords
             (tweet_id, keyword_id, relevance_score, created_at)
@@ -296,7 +584,125 @@ class Tweet(BaseModel):
             'tweet_id': self.id,
             'keyword_id': keyword_id,
             'relevance_score': relevance_score,
-            'created_at': datetime.now().isoformat()
+            'created_at': (self.created_at or self._utc_now()).isoformat()
         })
         self.db.commit()
-        return self
\ No newline at end of file
+        return self
+    
+    @classmethod
+    def _created_at_by_twitter_id(cls, page, existing_ids):
+        """زمان ایجاد توییت‌های صفحه که در جدول اصلی نیستند"""
+        created_at = {}
+        for twitter_id, tweet_data in page.items():
+            if twitter_id in existing_ids:
+                continue
+            try:
+                created_at[twitter_id] = cls.parse_api_created_at(tweet_data)
+            except ValueError:
+                continue
+        return created_at
+    
+    @classmethod
+    def bulk_ingest(cls, db, tweets_data, keyword_id=None, logger=None):
+        """ذخیره دسته‌ای یک صفحه نتایج جستجو در یک تراکنش"""
+        result = {'new': 0, 'updated': 0, 'linked': 0, 'entities': 0, 'partitioned': 0, 'new_ids': []}
+        
+        # حذف توییت‌های تکراری در یک صفحه (آخرین نسخه معتبر است)
+        page = {}
+        for tweet_data in tweets_data:
+            if tweet_data.get('id'):
+                page[tweet_data['id']] = tweet_data
+        
+        if not page:
+            return result
+        
+        # کاربران، توییت‌ها و ارتباط‌ها در یک واحد کار با یک commit ثبت می‌شوند
+        with db.transaction():
+            existing_ids = cls.get_ids_by_twitter_ids(db, list(page))
+            
+            # توییت‌هایی که سیاست نگهداری به پارتیشن ماهانه منتقل کرده دوباره در جدول اصلی درج نمی‌شوند
+            if db.partitions is not None:
+                moved = db.partitions.find_moved(cls._created_at_by_twitter_id(page, existing_ids))
+                for twitter_id in moved:
+                    del page[twitter_id]
+                result['partitioned'] = len(moved)
+            
+            # ایجاد کاربران جدید با یک دستور
+            user_ids = TwitterUser.bulk_get_or_create(
+                db, [tweet_data.get('author', {}) for tweet_data in page.values()]
+            )
+            
+            rows = []
+            for twitter_id, tweet_data in page.items():
+                try:
+                    author_id = tweet_data.get('author', {}).get('id')
+                    user_id = user_ids.get(author_id)
+                    if user_id is None:
+                        # توییت بدون کاربر ذخیره شده ارجاع نامعتبر می‌سازد و ذخیره نمی‌شود
+                        raise ValueError(f"Author {author_id} could not be stored")
+                    tweet = cls.from_api_data(db, tweet_data, user_id)
+                    rows.append(tweet._get_params())
+                except Exception as e:
+                    if logger:
+                        logger.error(f"Error processing tweet {twitter_id}: {str(e)}")
+            
+            # درج توییت‌های جدید و به‌روزرسانی آمار توییت‌های موجود
+            query = f"""
+                INSERT INTO {cls.TABLE_NAME}
+                (twitter_id, user_id, content, created_at, collected_at,
+                 retweet_count, like_count, reply_count, quote_count, view_count,
+                 is_retweet, is_reply, is_quote, in_reply_to_id, language,
+                 is_sensitive, importance_score, importance_level, processing_status,
+                 filter_result, sentiment_score, content_category, tweet_data)
+                VALUES
+                (:twitter_id, :user_id, :content, :created_at, :collected_at,
+                 :retweet_count, :like_count, :reply_count, :quote_count, :view_count,
+                 :is_retweet, :is_reply, :is_quote, :in_reply_to_id, :language,
+                 :is_sensitive, :importance_score, :importance_level, :processing_status,
+                 :filter_result, :sentiment_score, :content_category, :tweet_data)
+                ON CONFLICT(twitter_id) DO UPDATE SET
+                    retweet_count = excluded.retweet_count,
+                    like_count = excluded.like_count,
+                    reply_count = excluded.reply_count,
+                    quote_count = excluded.quote_count,
+                    view_count = excluded.view_count
+            """
+            db.execute_many(query, rows)
+            
+            stored_twitter_ids = [row['twitter_id'] for row in rows]
+            tweet_ids = cls.get_ids_by_twitter_ids(db, stored_twitter_ids)
+            
+            entities = {}
+            for twitter_id in stored_twitter_ids:
+                if twitter_id in existing_ids:
+                    result['updated'] += 1
+                elif twitter_id in tweet_ids:
+                    result['new_ids'].append(tweet_ids[twitter_id])
+                    entities[tweet_ids[twitter_id]] = TweetEntity.extract(page[twitter_id])
+            result['new'] = len(result['new_ids'])
+            
+            # موجودیت‌های توییت‌های جدید (هشتگ، منشن، لینک و کش‌تگ) در همان تراکنش
+            result['entities'] = TweetEntity.bulk_replace(db, entities)
+            
+            # ایجاد ارتباط با کلمه کلیدی؛ زمان ارتباط همان زمان توییت (UTC) است، مانند backfill از جستجو
+            if keyword_id:
+                created_at = {row['twitter_id']: row['created_at'] for row in rows}
+                now = cls._utc_now().isoformat()
+                # rowcount فقط ارتباط‌های درج شده را می‌شمارد (نه ردیف‌های نوشته شده توسط triggerها)
+                cursor = db.execute_many("""
+                    INSERT OR IGNORE INTO tweet_keywords
+                    (tweet_id, keyword_id, relevance_score, created_at)
+                    VALUES
+                    (:tweet_id, :keyword_id, :relevance_score, :created_at)
+                """, [
+                    {
+                        'tweet_id': tweet_id,
+                        'keyword_id': keyword_id,
+                        'relevance_score': 1.0,
+                        'created_at': created_at.get(twitter_id) or now
+                    }
+                    for twitter_id, tweet_id in tweet_ids.items()
+                ])
+                result['linked'] = cursor.rowcount
+        
+        return result
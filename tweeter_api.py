@@ -1,23 +1,138 @@
 # plugins/collector/twitter_api.py
-import time
+import asyncio
+import random
 import json
 import httpx
 from datetime import datetime, timedelta
+from plugins.collector.rate_limiter import RateLimiter
 
 class TwitterAPI:
     """کلاس ارتباط با Twitter API"""
     
-    def __init__(self, api_key, logger, timeout=30, max_retries=3):
+    # نگاشت endpointها به گروه‌های محدودیت نرخ در rate_limits
+    ENDPOINT_GROUPS = {
+        'tweet/advanced_search': 'search',
+        'twitter/user/info': 'user_info',
+    }
+    
+    def __init__(self, api_key, logger, timeout=30, max_retries=3, base_url=None,
+                 max_connections=20, max_keepalive_connections=10, keepalive_expiry=30,
+                 http2=False, transport=None, requests_per_minute=60, max_backoff=60):
         self.api_key = api_key
         self.logger = logger
         self.timeout = timeout
         self.max_retries = max_retries
-        self.base_url = "https://api.twitterapi.io/v1"
+        self.base_url = base_url or "https://api.twitterapi.io/v1"
+        self.max_backoff = max_backoff
         self.rate_limits = {
-            'search': {'limit': 60, 'remaining': 60, 'reset': 0},
-            'user_info': {'limit': 60, 'remaining': 60, 'reset': 0},
+            'search': {'limit': requests_per_minute, 'remaining': requests_per_minute, 'reset': 0},
+            'user_info': {'limit': requests_per_minute, 'remaining': requests_per_minute, 'reset': 0},
+        }
+        self.rate_limiter = RateLimiter(self.rate_limits)
+        
+        # تنظیمات کلاینت HTTP ماندگار
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self.transport = transport
+        self.client = None
+        # event loop مالک اتصال‌های pool (loop اولین درخواست)؛ بستن کلاینت باید در همین loop انجام شود
+        self.loop = None
+        self.connection_stats = {'requests': 0, 'new_connections': 0}
+    
+    def open(self):
+        """ایجاد کلاینت HTTP ماندگار با pool اتصال"""
+        if self.client is not None and not self.client.is_closed:
+            return self.client
+        
+        client_options = {
+            'timeout': self.timeout,
+            'limits': self.limits,
+            'transport': self.transport
+        }
+        try:
+            self.client = httpx.AsyncClient(http2=self.http2, **client_options)
+        except ImportError:
+            # پشتیبانی HTTP/2 نیازمند پکیج h2 است (httpx[http2])
+            self.logger.warning("HTTP/2 requested but the 'h2' package is not installed. Falling back to HTTP/1.1")
+            self.client = httpx.AsyncClient(**client_options)
+        self.loop = None
+        
+        self.logger.info(f"Twitter API client opened (http2={self.http2}, limits={self.limits})")
+        return self.client
+    
+    async def close(self):
+        """بستن کلاینت HTTP و اتصال‌های باز"""
+        if self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+            stats = self.get_connection_stats()
+            self.logger.info(
+                f"Twitter API client closed. Requests: {stats['requests']}, "
+                f"reused connections: {stats['reused_connections']}"
+            )
+        self.client = None
+        self.loop = None
+    
+    def close_soon(self):
+        """بستن کلاینت از کد همزمان در event loop مالک اتصال‌ها؛ تسک یا future بستن برگردانده می‌شود"""
+        if self.client is None or self.client.is_closed:
+            self.client = None
+            return None
+        
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        owner = self.loop or running
+        
+        if owner is None:
+            # کلاینت هنوز درخواستی نفرستاده و اتصالی در pool ندارد
+            asyncio.run(self.close())
+            return None
+        if owner.is_closed():
+            # اتصال‌ها همراه با loop مالک بسته شده‌اند و از loop دیگری قابل بستن نیستند
+            self.logger.warning("Event loop of the Twitter API client is already closed. Dropping the client")
+            self.client = None
+            self.loop = None
+            return None
+        if owner is running:
+            return owner.create_task(self.close())
+        if owner.is_running():
+            # loop مالک در ترد دیگری اجرا می‌شود
+            return asyncio.run_coroutine_threadsafe(self.close(), owner)
+        owner.run_until_complete(self.close())
+        return None
+    
+    def get_connection_stats(self):
+        """آمار استفاده مجدد از اتصال‌ها"""
+        requests = self.connection_stats['requests']
+        new_connections = self.connection_stats['new_connections']
+        return {
+            'requests': requests,
+            'new_connections': new_connections,
+            'reused_connections': max(0, requests - new_connections),
+            'reuse_ratio': (requests - new_connections) / requests if requests else 0
         }
     
+    async def _trace(self, event_name, info):
+        """شمارش اتصال‌های جدید از طریق trace در httpcore"""
+        if event_name == 'connection.connect_tcp.complete':
+            self.connection_stats['new_connections'] += 1
+    
+    def _get_endpoint_key(self, endpoint):
+        """تعیین گروه محدودیت نرخ یک endpoint"""
+        if endpoint in self.ENDPOINT_GROUPS:
+            return self.ENDPOINT_GROUPS[endpoint]
+        return endpoint.split('/')[0] if '/' in endpoint else endpoint
+    
+    def _backoff_delay(self, retries):
+        """تاخیر نمایی با jitter برای تلاش مجدد"""
+        base = min(self.max_backoff, 2 ** retries)
+        return base / 2 + random.uniform(0, base / 2)
+    
     async def _make_request(self, endpoint, params=None, method='GET'):
         """انجام یک درخواست به API توییتر"""
         url = f"{self.base_url}/{endpoint}"
@@ -26,43 +141,41 @@ class TwitterAPI:
             "Accept": "application/json"
         }
         
-        # بررسی محدودیت نرخ
-        endpoint_key = endpoint.split('/')[0] if '/' in endpoint else endpoint
-        if endpoint_key in self.rate_limits:
-            limit_data = self.rate_limits[endpoint_key]
-            
-            # اگر محدودیت به صفر رسیده و زمان ریست هنوز نرسیده
-            if limit_data['remaining'] <= 0 and limit_data['reset'] > time.time():
-                wait_time = limit_data['reset'] - time.time() + 1  # یک ثانیه اضافه برای اطمینان
-                self.logger.warning(f"Rate limit hit for {endpoint_key}. Waiting {wait_time:.1f} seconds.")
-                time.sleep(wait_time)
+        # گروه محدودیت نرخ این endpoint
+        endpoint_key = self._get_endpoint_key(endpoint)
         
         retries = 0
         while retries <= self.max_retries:
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    if method == 'GET':
-                        response = await client.get(url, headers=headers, params=params)
-                    elif method == 'POST':
-                        response = await client.post(url, headers=headers, json=params)
-                    
-                    # به‌روزرسانی محدودیت نرخ
-                    if 'X-Rate-Limit-Limit' in response.headers:
-                        self.rate_limits.setdefault(endpoint_key, {})
-                        self.rate_limits[endpoint_key]['limit'] = int(response.headers['X-Rate-Limit-Limit'])
-                        self.rate_limits[endpoint_key]['remaining'] = int(response.headers['X-Rate-Limit-Remaining'])
-                        self.rate_limits[endpoint_key]['reset'] = int(response.headers['X-Rate-Limit-Reset'])
-                    
-                    # بررسی خطاهای HTTP
-                    response.raise_for_status()
-                    
-                    return response.json()
-                    
+                # انتظار ناهمگام برای سهمیه؛ سایر endpointها متوقف نمی‌شوند
+                waited = await self.rate_limiter.acquire(endpoint_key)
+                if waited > 1:
+                    self.logger.warning(f"Rate limit hit for {endpoint_key}. Waited {waited:.1f} seconds.")
+                
+                client = self.open()
+                if self.loop is None:
+                    self.loop = asyncio.get_running_loop()
+                self.connection_stats['requests'] += 1
+                if method == 'GET':
+                    response = await client.get(url, headers=headers, params=params,
+                                                extensions={'trace': self._trace})
+                elif method == 'POST':
+                    response = await client.post(url, headers=headers, json=params,
+                                                 extensions={'trace': self._trace})
+                
+                # به‌روزرسانی محدودیت نرخ
+                self.rate_limiter.sync_from_headers(endpoint_key, response.headers)
+                
+                # بررسی خطاهای HTTP
+                response.raise_for_status()
+                
+                return response.json()
+                
             except httpx.TimeoutException:
                 retries += 1
                 if retries <= self.max_retries:
                     self.logger.warning(f"Request to {endpoint} timed out. Retrying ({retries}/{self.max_retries})...")
-                    time.sleep(2 ** retries)  # تاخیر نمایی
+                    await asyncio.sleep(self._backoff_delay(retries))  # تاخیر نمایی
                 else:
                     self.logger.error(f"Request to {endpoint} failed after {self.max_retries} retries due to timeout.")
                     raise
@@ -70,15 +183,19 @@ class TwitterAPI:
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 429:  # Too Many Requests
                     retries += 1
+                    if retries > self.max_retries:
+                        self.logger.error(f"Request to {endpoint} failed after {self.max_retries} retries due to rate limit.")
+                        raise
                     retry_after = int(e.response.headers.get('Retry-After', 60))
-                    self.logger.warning(f"Rate limit exceeded. Waiting {retry_after} seconds...")
-                    time.sleep(retry_after)
+                    self.logger.warning(f"Rate limit exceeded for {endpoint_key}. Waiting {retry_after} seconds...")
+                    # توقف فقط برای همین گروه؛ انتظار در acquire دور بعدی انجام می‌شود
+                    self.rate_limiter.block_for(endpoint_key, retry_after)
                 elif e.response.status_code >= 500:  # Server Error
                     retries += 1
                     if retries <= self.max_retries:
-                        wait_time = 2 ** retries
-                        self.logger.warning(f"Server error: {e}. Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
+                        wait_time = self._backoff_delay(retries)
+                        self.logger.warning(f"Server error: {e}. Retrying in {wait_time:.1f} seconds...")
+                        await asyncio.sleep(wait_time)
                     else:
                         self.logger.error(f"Request to {endpoint} failed after {self.max_retries} retries due to server error.")
                         raise
@@ -90,7 +207,8 @@ class TwitterAPI:
                 self.logger.error(f"Unexpected error: {e}")
                 raise
     
-    async def search_tweets(self, query, max_results=100, language=None, until=None, since=None):
+    async def search_tweets(self, query, max_results=100, language=None, until=None, since=None,
+                            cursor=None):
         """جستجوی توییت‌ها"""
         endpoint = "tweet/advanced_search"
         
@@ -115,6 +233,10 @@ class TwitterAPI:
             "queryType": "Latest"
         }
         
+        # صفحه بعدی نتایج (مقدار next_cursor پاسخ قبلی)
+        if cursor:
+            params["cursor"] = cursor
+        
         self.logger.info(f"Searching tweets with query: {advanced_query}")
         return await self._make_request(endpoint, params)
     
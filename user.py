@@ -1,6 +1,7 @@
 # models/user.py
 from datetime import datetime
 from models.base import BaseModel
+from core.payload_codec import decode_payload
 
 class TwitterUser(BaseModel):
     """مدل کاربر توییتر"""
@@ -60,19 +61,93 @@ class TwitterUser(BaseModel):
             'account_created_at': self.account_created_at.isoformat() if self.account_created_at else None,
             'is_verified': 1 if self.is_verified else 0,
             'importance_score': self.importance_score,
-            'profile_data': self.profile_data,
+            'profile_data': self.db.payload_codec.encode(self.profile_data),
             'last_updated_at': self.last_updated_at.isoformat()
         }
         
-        self.db.execute(query, params)
+        cursor = self.db.execute(query, params)
         
         if not self.id:
-            # دریافت ID ایجاد شده
-            self.id = self.db.cursor.lastrowid
+            # دریافت ID ایجاد شده (از cursor همین دستور، نه cursor مشترک)
+            self.id = cursor.lastrowid
         
         self.db.commit()
         return self
     
+    @classmethod
+    def bulk_get_or_create(cls, db, authors_data):
+        """ایجاد یا به‌روزرسانی دسته‌ای کاربران و دریافت ID همه کاربران بر اساس ID توییتر"""
+        authors = {}
+        author_ids = set()
+        for author_data in authors_data:
+            author_id = author_data.get('id')
+            if not author_id:
+                continue
+            author_ids.add(author_id)
+            # کاربران بدون نام کاربری قابل ذخیره نیستند (ولی ID کاربر ذخیره شده قبلی برگردانده می‌شود)
+            if author_data.get('userName') and author_id not in authors:
+                authors[author_id] = author_data
+        
+        if not author_ids:
+            return {}
+        
+        # پروفایل کاربران موجود با آخرین داده به‌روز می‌شود؛ توییت‌ها فقط ارجاع author دارند و
+        # پروفایل هنگام خواندن از همین ردیف باز می‌شود (bio و امتیاز اهمیت در مسیرهای دیگر تنظیم می‌شوند)
+        query = f"""
+            INSERT INTO {cls.TABLE_NAME}
+            (twitter_id, username, display_name, bio, followers_count, following_count,
+             account_created_at, is_verified, importance_score, profile_data, last_updated_at)
+            VALUES
+            (:twitter_id, :username, :display_name, :bio, :followers_count, :following_count,
+             :account_created_at, :is_verified, :importance_score, :profile_data, :last_updated_at)
+            ON CONFLICT(twitter_id) DO UPDATE SET
+                username = excluded.username,
+                display_name = excluded.display_name,
+                followers_count = excluded.followers_count,
+                following_count = excluded.following_count,
+                is_verified = excluded.is_verified,
+                profile_data = excluded.profile_data,
+                last_updated_at = excluded.last_updated_at
+        """
+        now = datetime.now().isoformat()
+        db.execute_many(query, [
+            {
+                'twitter_id': author_id,
+                'username': author_data.get('userName'),
+                'display_name': author_data.get('name'),
+                'bio': None,
+                'followers_count': author_data.get('followers', 0),
+                'following_count': author_data.get('following', 0),
+                'account_created_at': None,
+                'is_verified': 1 if author_data.get('isBlueVerified', False) else 0,
+                'importance_score': 0,
+                'profile_data': db.payload_codec.encode(author_data),
+                'last_updated_at': now
+            }
+            for author_id, author_data in authors.items()
+        ])
+        
+        return cls.get_ids_by_twitter_ids(db, sorted(author_ids))
+    
+    @classmethod
+    def get_ids_by_twitter_ids(cls, db, twitter_ids, chunk_size=500):
+        """دریافت نگاشت ID توییتر به ID داخلی برای چند کاربر"""
+        ids = {}
+        for i in range(0, len(twitter_ids), chunk_size):
+            chunk = twitter_ids[i:i + chunk_size]
+            placeholders = ', '.join('?' for _ in chunk)
+            query = f"SELECT id, twitter_id FROM {cls.TABLE_NAME} WHERE twitter_id IN ({placeholders})"
+            for row in db.execute(query, chunk).fetchall():
+                ids[row['twitter_id']] = row['id']
+        return ids
+    
+    @classmethod
+    def get_profile_data(cls, db, id):
+        """دریافت داده خام پروفایل یک کاربر (از بلاب فشرده یا متن JSON)"""
+        query = f"SELECT profile_data FROM {cls.TABLE_NAME} WHERE id = :id"
+        result = db.execute(query, {'id': id}).fetchone()
+        return decode_payload(result['profile_data']) if result else None
+    
     @classmethod
     def get_by_id(cls, db, id):
         """دریافت کاربر با ID"""
@@ -115,7 +190,7 @@ class TwitterUser(BaseModel):
             account_created_at=datetime.fromisoformat(data['account_created_at']) if data.get('account_created_at') else None,
             is_verified=bool(data.get('is_verified')),
             importance_score=data.get('importance_score', 0),
-            profile_data=data.get('profile_data', {}),
+            profile_data=decode_payload(data.get('profile_data')),
             last_updated_at=datetime.fromisoformat(data['last_updated_at']) if data.get('last_updated_at') else None
         )
     